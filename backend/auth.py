@@ -2,41 +2,185 @@ from fastapi import Header, HTTPException, Request, Depends
 from functools import wraps
 from typing import Optional
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import OrderedDict
+from pathlib import Path
+import math
+import sqlite3
 import time
 import threading
 
 from config import settings
 
 
+def _roll_window(state: list, now: float, window: float):
+    """Advance [window_start, current, previous, last_seen] to the window containing now."""
+    start = now - now % window
+    if start != state[0]:
+        state[2] = state[1] if start - state[0] == window else 0
+        state[1] = 0
+        state[0] = start
+
+
+def _window_estimate(state: list, now: float, window: float) -> float:
+    """Requests in the sliding window ending at now, with the previous window weighted by its overlap."""
+    return state[2] * (1 - (now - state[0]) / window) + state[1]
+
+
+def _window_retry_after(state: list, now: float, window: float, limit: int) -> int:
+    elapsed = now - state[0]
+    if state[1] < limit:
+        if state[2] == 0:
+            return 0
+        wait = window * (1 - (limit - state[1]) / state[2]) - elapsed
+    else:
+        wait = (window - elapsed) + window * (1 - limit / state[1])
+    return max(0, math.ceil(wait))
+
+
 class RateLimiter:
-    def __init__(self, requests_per_minute: int = 60):
+    """
+    Sliding-window counter. Each key keeps its request counts for the current
+    and previous fixed window, so a check is O(1) however busy the key is.
+    Keys are spread over lock stripes, and each stripe keeps its keys in
+    last-use order and drops those idle for two windows.
+    """
+
+    def __init__(self, requests_per_minute: int = 60, stripes: int = 64, window_seconds: float = 60.0):
         self.requests_per_minute = requests_per_minute
-        self.requests = defaultdict(list)
-        self.lock = threading.Lock()
+        self.window = window_seconds
+        self._stripes = [(threading.Lock(), OrderedDict()) for _ in range(max(1, stripes))]
 
-    def is_allowed(self, key: str) -> bool:
-        now = time.time()
-        minute_ago = now - 60
+    def _stripe(self, key: str) -> tuple:
+        return self._stripes[hash(key) % len(self._stripes)]
 
-        with self.lock:
-            self.requests[key] = [t for t in self.requests[key] if t > minute_ago]
+    def _evict_idle(self, keys: OrderedDict, now: float):
+        cutoff = now - 2 * self.window
+        while keys:
+            state = next(iter(keys.values()))
+            if state[3] >= cutoff:
+                break
+            keys.popitem(last=False)
 
-            if len(self.requests[key]) >= self.requests_per_minute:
+    def is_allowed(self, key: str) -> bool:
+        now = time.time()
+        lock, keys = self._stripe(key)
+        with lock:
+            self._evict_idle(keys, now)
+            state = keys.get(key)
+            if state is None:
+                state = keys[key] = [now - now % self.window, 0, 0, now]
+            else:
+                keys.move_to_end(key)
+                state[3] = now
+            _roll_window(state, now, self.window)
+            if _window_estimate(state, now, self.window) >= self.requests_per_minute:
                 return False
-
-            self.requests[key].append(now)
+            state[1] += 1
             return True
 
     def get_retry_after(self, key: str) -> int:
-        with self.lock:
-            if not self.requests[key]:
+        now = time.time()
+        lock, keys = self._stripe(key)
+        with lock:
+            state = keys.get(key)
+            if state is None:
                 return 0
-            oldest = min(self.requests[key])
-            return max(0, int(60 - (time.time() - oldest)))
+            state = list(state)
+        _roll_window(state, now, self.window)
+        return _window_retry_after(state, now, self.window, self.requests_per_minute)
+
+    def tracked_keys(self) -> int:
+        return sum(len(keys) for _, keys in self._stripes)
+
+
+class SQLiteRateLimiter:
+    """
+    The same sliding-window counter kept in a SQLite file, so every uvicorn
+    worker on the host enforces one shared limit. Each check is one short
+    BEGIN IMMEDIATE transaction; idle keys are deleted about once a window.
+    """
+
+    def __init__(self, path: Path, requests_per_minute: int = 60, window_seconds: float = 60.0):
+        self.path = path
+        self.requests_per_minute = requests_per_minute
+        self.window = window_seconds
+        self._local = threading.local()
+        self._next_sweep = 0.0
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                    key TEXT PRIMARY KEY,
+                    window_start REAL NOT NULL,
+                    current_count INTEGER NOT NULL,
+                    previous_count INTEGER NOT NULL,
+                    last_seen REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_rate_limits_last_seen ON rate_limits(last_seen)")
+            self._local.conn = conn
+        return conn
+
+    def _load(self, conn, key: str, now: float) -> list:
+        row = conn.execute(
+            "SELECT window_start, current_count, previous_count, last_seen FROM rate_limits WHERE key = ?",
+            (key,)
+        ).fetchone()
+        state = list(row) if row else [now - now % self.window, 0, 0, now]
+        _roll_window(state, now, self.window)
+        return state
+
+    def is_allowed(self, key: str) -> bool:
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            state = self._load(conn, key, now)
+            allowed = _window_estimate(state, now, self.window) < self.requests_per_minute
+            if allowed:
+                conn.execute(
+                    """INSERT INTO rate_limits (key, window_start, current_count, previous_count, last_seen)
+                       VALUES (?, ?, ?, ?, ?)
+                       ON CONFLICT(key) DO UPDATE SET window_start = excluded.window_start,
+                           current_count = excluded.current_count, previous_count = excluded.previous_count,
+                           last_seen = excluded.last_seen""",
+                    (key, state[0], state[1] + 1, state[2], now)
+                )
+            if now >= self._next_sweep:
+                conn.execute("DELETE FROM rate_limits WHERE last_seen < ?", (now - 2 * self.window,))
+                self._next_sweep = now + self.window
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed
+
+    def get_retry_after(self, key: str) -> int:
+        now = time.time()
+        state = self._load(self._conn(), key, now)
+        return _window_retry_after(state, now, self.window, self.requests_per_minute)
+
+    def tracked_keys(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+
+RATE_LIMIT_DEFAULT_PATH = Path(__file__).parent.parent / "data" / "rate_limits.db"
+
 
+def create_rate_limiter(backend: str = None):
+    backend = backend or settings.RATE_LIMIT_BACKEND
+    if backend == "sqlite":
+        path = Path(settings.RATE_LIMIT_SQLITE_PATH) if settings.RATE_LIMIT_SQLITE_PATH else RATE_LIMIT_DEFAULT_PATH
+        return SQLiteRateLimiter(path, requests_per_minute=settings.RATE_LIMIT_PER_MINUTE)
+    return RateLimiter(requests_per_minute=settings.RATE_LIMIT_PER_MINUTE, stripes=settings.RATE_LIMIT_STRIPES)
 
-rate_limiter = RateLimiter(requests_per_minute=settings.RATE_LIMIT_PER_MINUTE)
+rate_limiter = create_rate_limiter()
 
 
 def verify_api_key(x_api_key: Optional[str] = Header(default=None)) -> str:
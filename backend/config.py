@@ -10,12 +10,64 @@ class Settings:
     TASKFLOW_API_KEY: str = os.getenv("TASKFLOW_API_KEY", "pj-taskflow-dev-key-2026")
     REQUIRE_API_KEY_IN_DEV: bool = os.getenv("REQUIRE_API_KEY_IN_DEV", "false").lower() == "true"
     RATE_LIMIT_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_SQLITE_PATH: str = os.getenv("RATE_LIMIT_SQLITE_PATH", "")
+    RATE_LIMIT_STRIPES: int = int(os.getenv("RATE_LIMIT_STRIPES", "64"))
 
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
     SUPABASE_JWT_SECRET: str = os.getenv("SUPABASE_JWT_SECRET", "")
+    SUPABASE_TIMEOUT: float = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+    SUPABASE_CONNECT_TIMEOUT: float = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "3"))
+    SUPABASE_MAX_CONNECTIONS: int = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+    SUPABASE_BREAKER_THRESHOLD: int = int(os.getenv("SUPABASE_BREAKER_THRESHOLD", "5"))
+    SUPABASE_BREAKER_RESET_SECONDS: float = float(os.getenv("SUPABASE_BREAKER_RESET_SECONDS", "30"))
+    AUTH_TOKEN_CACHE_SIZE: int = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "1024"))
+    AUTH_TOKEN_CACHE_TTL: float = float(os.getenv("AUTH_TOKEN_CACHE_TTL", "60"))
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:5173")
 
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "16"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+
+    ANTHROPIC_BASE_URL: str = os.getenv("ANTHROPIC_BASE_URL", "")
+    ANTHROPIC_TIMEOUT: float = float(os.getenv("ANTHROPIC_TIMEOUT", "120"))
+    ANTHROPIC_CONNECT_TIMEOUT: float = float(os.getenv("ANTHROPIC_CONNECT_TIMEOUT", "10"))
+    ANTHROPIC_MAX_RETRIES: int = int(os.getenv("ANTHROPIC_MAX_RETRIES", "2"))
+    ANTHROPIC_MAX_CONCURRENCY: int = int(os.getenv("ANTHROPIC_MAX_CONCURRENCY", "8"))
+
+    WEBHOOK_TIMEOUT: float = float(os.getenv("WEBHOOK_TIMEOUT", "10"))
+    WEBHOOK_MAX_CONNECTIONS: int = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "20"))
+    WEBHOOK_ENDPOINT_CONCURRENCY: int = int(os.getenv("WEBHOOK_ENDPOINT_CONCURRENCY", "2"))
+    WEBHOOK_MAX_ATTEMPTS: int = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))
+    WEBHOOK_RETRY_BASE_DELAY: float = float(os.getenv("WEBHOOK_RETRY_BASE_DELAY", "2"))
+    WEBHOOK_RETRY_MAX_DELAY: float = float(os.getenv("WEBHOOK_RETRY_MAX_DELAY", "300"))
+    WEBHOOK_POLL_INTERVAL: float = float(os.getenv("WEBHOOK_POLL_INTERVAL", "5"))
+    WEBHOOK_LEASE_SECONDS: float = float(os.getenv("WEBHOOK_LEASE_SECONDS", "60"))
+
+    VALUATION_RECOMPUTE_CHUNK_SIZE: int = int(os.getenv("VALUATION_RECOMPUTE_CHUNK_SIZE", "500"))
+    VALUATION_RECOMPUTE_WORKERS: int = int(os.getenv("VALUATION_RECOMPUTE_WORKERS", "0"))
+    VALUATION_MAX_WORKERS: int = int(os.getenv("VALUATION_MAX_WORKERS", str(os.cpu_count() or 1)))
+    VALUATION_HISTORY_KEYFRAME_INTERVAL: int = int(os.getenv("VALUATION_HISTORY_KEYFRAME_INTERVAL", "10"))
+    PRODUCT_DOCUMENT_COMPRESS_MIN_BYTES: int = int(os.getenv("PRODUCT_DOCUMENT_COMPRESS_MIN_BYTES", "4096"))
+
+    SIMULATION_SAMPLES: int = int(os.getenv("SIMULATION_SAMPLES", "100000"))
+    SIMULATION_DEFAULT_SPREAD: float = float(os.getenv("SIMULATION_DEFAULT_SPREAD", "0.25"))
+    SIMULATION_WORKERS: int = int(os.getenv("SIMULATION_WORKERS", "0"))
+    SIMULATION_MAX_TOTAL_SAMPLES: int = int(os.getenv("SIMULATION_MAX_TOTAL_SAMPLES", "5000000"))
+    SIMULATION_CACHE_SIZE: int = int(os.getenv("SIMULATION_CACHE_SIZE", "256"))
+
+    CSV_IMPORT_BATCH_SIZE: int = int(os.getenv("CSV_IMPORT_BATCH_SIZE", "1000"))
+    TASK_BULK_MAX_ROWS: int = int(os.getenv("TASK_BULK_MAX_ROWS", "20000"))
+
+    LIST_DEFAULT_PAGE_SIZE: int = int(os.getenv("LIST_DEFAULT_PAGE_SIZE", "50"))
+    LIST_MAX_PAGE_SIZE: int = int(os.getenv("LIST_MAX_PAGE_SIZE", "500"))
+
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "128"))
+    DATA_VERSION_RECHECK_SECONDS: float = float(os.getenv("DATA_VERSION_RECHECK_SECONDS", "2"))
+    LEARN_CACHE_MAX_AGE: int = int(os.getenv("LEARN_CACHE_MAX_AGE", "86400"))
+
 
 settings = Settings()
 
@@ -1,21 +1,184 @@
 import sqlite3
+import threading
+import time
 from pathlib import Path
 from contextlib import contextmanager
 
+from config import settings
+
 DATABASE_PATH = Path(__file__).parent.parent / "data" / "jarvis.db"
 
 def get_db_path() -> Path:
     DATABASE_PATH.parent.mkdir(parents=True, exist_ok=True)
     return DATABASE_PATH
 
+
+def _open_connection() -> sqlite3.Connection:
+    conn = sqlite3.connect(get_db_path(), check_same_thread=False, timeout=settings.DB_POOL_TIMEOUT)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA mmap_size = {int(settings.SQLITE_MMAP_SIZE)}")
+    conn.execute(f"PRAGMA cache_size = -{int(settings.SQLITE_CACHE_SIZE_KB)}")
+    return conn
+
+
+class ConnectionPool:
+    """
+    Bounded pool of long-lived SQLite connections.
+
+    A thread that already holds a connection gets the same one back on nested
+    checkouts, and a released connection is preferentially handed back to the
+    thread that last used it so its page cache stays warm.
+    """
+
+    def __init__(self, max_size: int, timeout: float):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._local = threading.local()
+        self._in_use = 0
+        self._stats = {
+            "checkouts": 0,
+            "nested_checkouts": 0,
+            "thread_reuses": 0,
+            "connections_created": 0,
+            "waits": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+            "timeouts": 0,
+        }
+
+    def acquire(self) -> sqlite3.Connection:
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            self._local.depth += 1
+            with self._lock:
+                self._stats["nested_checkouts"] += 1
+            return held
+
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise sqlite3.OperationalError("Timed out waiting for a database connection")
+        wait_ms = (time.perf_counter() - started) * 1000
+
+        conn = None
+        last = getattr(self._local, "last", None)
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._in_use += 1
+            if wait_ms >= 1:
+                self._stats["waits"] += 1
+            self._stats["total_wait_ms"] += wait_ms
+            self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], wait_ms)
+            if last is not None and last in self._idle:
+                self._idle.remove(last)
+                conn = last
+                self._stats["thread_reuses"] += 1
+            elif self._idle:
+                conn = self._idle.pop()
+
+        if conn is None:
+            try:
+                conn = _open_connection()
+            except Exception:
+                with self._lock:
+                    self._in_use -= 1
+                self._slots.release()
+                raise
+            with self._lock:
+                self._stats["connections_created"] += 1
+
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+        self._local.conn = None
+        self._local.last = conn
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            conn = None
+        with self._lock:
+            self._in_use -= 1
+            if conn is not None:
+                self._idle.append(conn)
+        self._slots.release()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._in_use
+        stats["max_size"] = self.max_size
+        checkouts = stats["checkouts"] or 1
+        stats["avg_wait_ms"] = round(stats["total_wait_ms"] / checkouts, 3)
+        stats["total_wait_ms"] = round(stats["total_wait_ms"], 3)
+        stats["max_wait_ms"] = round(stats["max_wait_ms"], 3)
+        return stats
+
+
+pool = ConnectionPool(max_size=settings.DB_POOL_SIZE, timeout=settings.DB_POOL_TIMEOUT)
+
+
+def configure_database():
+    """Database-level settings that persist in the file; run once at startup."""
+    conn = pool.acquire()
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+    finally:
+        pool.release(conn)
+
+
+def get_pool_stats() -> dict:
+    return pool.stats()
+
+
 @contextmanager
 def get_connection():
-    conn = sqlite3.connect(get_db_path())
-    conn.row_factory = sqlite3.Row
+    conn = pool.acquire()
     try:
         yield conn
     finally:
-        conn.close()
+        pool.release(conn)
+
+
+@contextmanager
+def transaction():
+    """
+    A pooled connection inside BEGIN IMMEDIATE, committed when the block exits
+    and rolled back if it raises. Taking the write lock up front means reads
+    made inside the block cannot be invalidated by another writer before the
+    writes that depend on them. A block opened while this thread's connection
+    is already in a transaction joins that transaction.
+    """
+    with get_connection() as conn:
+        if conn.in_transaction:
+            # Nested in a caller's transaction on this thread: join it
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
 
 def init_db():
     with get_connection() as conn:
@@ -410,14 +573,6 @@ def init_db():
                 cursor.execute(f"ALTER TABLE product_valuations ADD COLUMN {col_name} {col_type}")
         
         new_product_doc_columns = [
-            ("raw_valuation_output", "TEXT"),
-            ("raw_valuation_output_updated_at", "TIMESTAMP"),
-            ("user_flow", "TEXT"),
-            ("user_flow_updated_at", "TIMESTAMP"),
-            ("specifications", "TEXT"),
-            ("specifications_updated_at", "TIMESTAMP"),
-            ("persona_feedback", "TEXT"),
-            ("persona_feedback_updated_at", "TIMESTAMP"),
             ("valuation_complete", "INTEGER DEFAULT 0"),
             ("valuation_type", "TEXT"),
             ("valuation_confidence", "TEXT DEFAULT 'Low'"),
@@ -430,10 +585,482 @@ def init_db():
 
         migrate_business_units(conn)
         seed_default_admin(conn)
+        run_migrations(conn)
 
         conn.commit()
 
 
+SECONDARY_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_tasks_product ON tasks(product_id)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_position ON tasks(position_id)",
+    "CREATE INDEX IF NOT EXISTS idx_service_tasks_service ON service_tasks(service_id)",
+    "CREATE INDEX IF NOT EXISTS idx_service_tasks_position ON service_tasks(position_id)",
+    "CREATE INDEX IF NOT EXISTS idx_psa_software ON product_software_allocations(software_id)",
+    "CREATE INDEX IF NOT EXISTS idx_ssa_software ON service_software_allocations(software_id)",
+    "CREATE INDEX IF NOT EXISTS idx_valuation_history_product ON valuation_history(product_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_users_invite_token ON users(invite_token)",
+    "CREATE INDEX IF NOT EXISTS idx_users_department ON users(department_id)",
+    "CREATE INDEX IF NOT EXISTS idx_products_requestor_bu ON products(requestor_business_unit_id, status)",
+    "CREATE INDEX IF NOT EXISTS idx_products_requestor ON products(requestor_id)",
+    "CREATE INDEX IF NOT EXISTS idx_services_business_unit ON services(business_unit_id)",
+    "CREATE INDEX IF NOT EXISTS idx_services_type ON services(service_type_id)",
+    "CREATE INDEX IF NOT EXISTS idx_service_types_department ON service_types(department_id)",
+    "CREATE INDEX IF NOT EXISTS idx_business_units_head ON business_units(head_position_id)",
+    "CREATE INDEX IF NOT EXISTS idx_business_unit_team_position ON business_unit_team(position_id)",
+    "CREATE INDEX IF NOT EXISTS idx_positions_department ON positions(department)",
+]
+
+
+def migrate_secondary_indexes(cursor):
+    for statement in SECONDARY_INDEXES:
+        cursor.execute(statement)
+
+
+VERSIONED_TABLES = [
+    "products",
+    "tasks",
+    "product_software_allocations",
+    "product_service_departments",
+    "product_valuations",
+    "positions",
+    "software_costs",
+    "service_departments",
+]
+
+
+def migrate_data_versions(cursor):
+    """
+    Per-table write counters, bumped by triggers so every write path
+    (routers, CSV imports, admin seeding) invalidates cached snapshots.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    for table in VERSIONED_TABLES:
+        add_version_triggers(cursor, table)
+
+
+def add_version_triggers(cursor, table: str):
+    cursor.execute("INSERT OR IGNORE INTO data_versions (table_name, version) VALUES (?, 0)", (table,))
+    for operation in ("INSERT", "UPDATE", "DELETE"):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_{operation.lower()}_version
+            AFTER {operation} ON {table}
+            BEGIN
+                UPDATE data_versions SET version = version + 1 WHERE table_name = '{table}';
+            END
+        """)
+
+
+def migrate_knowledge_versions(cursor):
+    add_version_triggers(cursor, "knowledge_base")
+
+
+def migrate_service_versions(cursor):
+    for table in ("services", "service_tasks", "service_software_allocations", "service_types",
+                  "business_units", "business_unit_team"):
+        add_version_triggers(cursor, table)
+
+
+def migrate_webhook_outbox(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS webhook_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            endpoint TEXT NOT NULL,
+            event TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'delivered', 'failed')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            delivered_at TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_webhook_outbox_due ON webhook_outbox(status, next_attempt_at)")
+
+
+COST_ROLLUPS = {
+    "product": {
+        "rollup_table": "product_cost_rollup",
+        "table": "products",
+        "tasks_table": "tasks",
+        "allocations_table": "product_software_allocations",
+        "foreign_key": "product_id",
+    },
+    "service": {
+        "rollup_table": "service_cost_rollup",
+        "table": "services",
+        "tasks_table": "service_tasks",
+        "allocations_table": "service_software_allocations",
+        "foreign_key": "service_id",
+    },
+}
+
+ROLLUP_COLUMNS = [
+    "task_count", "estimated_hours", "actual_hours", "labor_cost_min", "labor_cost_max",
+    "actual_cost_min", "actual_cost_max", "software_cost",
+]
+
+
+def cost_rollup_select(kind: str, where: str) -> str:
+    """
+    Fresh hours and cost totals for the entities matching where (a condition
+    on e.id). Sums run over each entity's tasks in rowid order, the same
+    order the reporting queries aggregate them in.
+    """
+    rollup = COST_ROLLUPS[kind]
+    fk = rollup["foreign_key"]
+    return f"""
+        SELECT
+            e.id as entity_id,
+            COUNT(pos.id) as task_count,
+            SUM(CASE WHEN pos.id IS NOT NULL THEN t.estimated_hours END) as estimated_hours,
+            SUM(CASE WHEN pos.id IS NOT NULL THEN COALESCE(t.actual_hours, 0) END) as actual_hours,
+            SUM(t.estimated_hours * pos.hourly_cost_min) as labor_cost_min,
+            SUM(t.estimated_hours * pos.hourly_cost_max) as labor_cost_max,
+            SUM(COALESCE(t.actual_hours, 0) * pos.hourly_cost_min) as actual_cost_min,
+            SUM(COALESCE(t.actual_hours, 0) * pos.hourly_cost_max) as actual_cost_max,
+            (SELECT SUM(sc.monthly_cost * a.allocation_percent / 100)
+             FROM {rollup['allocations_table']} a
+             JOIN software_costs sc ON a.software_id = sc.id
+             WHERE a.{fk} = e.id) as software_cost
+        FROM {rollup['table']} e
+        LEFT JOIN {rollup['tasks_table']} t ON t.{fk} = e.id
+        LEFT JOIN positions pos ON t.position_id = pos.id
+        WHERE {where}
+        GROUP BY e.id
+    """
+
+
+def _refresh_cost_rollup_sql(kind: str, where: str) -> str:
+    # DELETE then plain INSERT rather than INSERT OR REPLACE: inside a trigger,
+    # an OR IGNORE on the statement that fired it would override the REPLACE.
+    rollup = COST_ROLLUPS[kind]
+    fk = rollup["foreign_key"]
+    columns = ", ".join(ROLLUP_COLUMNS)
+    return f"""
+        DELETE FROM {rollup['rollup_table']} WHERE {fk} IN (SELECT e.id FROM {rollup['table']} e WHERE {where});
+        INSERT INTO {rollup['rollup_table']} ({fk}, {columns})
+        SELECT entity_id, {columns} FROM ({cost_rollup_select(kind, where)});
+    """
+
+
+def _cost_rollup_triggers(kind: str) -> dict:
+    """Trigger name -> (event, condition on e.id for the rows to refresh)."""
+    rollup = COST_ROLLUPS[kind]
+    fk = rollup["foreign_key"]
+    return {
+        f"trg_{rollup['tasks_table']}_insert_rollup": (
+            f"AFTER INSERT ON {rollup['tasks_table']}", f"e.id = NEW.{fk}"),
+        f"trg_{rollup['tasks_table']}_update_rollup": (
+            f"AFTER UPDATE OF {fk}, position_id, estimated_hours, actual_hours ON {rollup['tasks_table']}",
+            f"e.id IN (OLD.{fk}, NEW.{fk})"),
+        f"trg_{rollup['tasks_table']}_delete_rollup": (
+            f"AFTER DELETE ON {rollup['tasks_table']}", f"e.id = OLD.{fk}"),
+        f"trg_{rollup['allocations_table']}_insert_rollup": (
+            f"AFTER INSERT ON {rollup['allocations_table']}", f"e.id = NEW.{fk}"),
+        f"trg_{rollup['allocations_table']}_update_rollup": (
+            f"AFTER UPDATE OF {fk}, software_id, allocation_percent ON {rollup['allocations_table']}",
+            f"e.id IN (OLD.{fk}, NEW.{fk})"),
+        f"trg_{rollup['allocations_table']}_delete_rollup": (
+            f"AFTER DELETE ON {rollup['allocations_table']}", f"e.id = OLD.{fk}"),
+        f"trg_positions_rates_{kind}_rollup": (
+            "AFTER UPDATE OF hourly_cost_min, hourly_cost_max ON positions",
+            f"e.id IN (SELECT {fk} FROM {rollup['tasks_table']} WHERE position_id = NEW.id)"),
+        f"trg_software_costs_{kind}_rollup": (
+            "AFTER UPDATE OF monthly_cost ON software_costs",
+            f"e.id IN (SELECT {fk} FROM {rollup['allocations_table']} WHERE software_id = NEW.id)"),
+        # Foreign keys are not enforced, so deleting a position or software
+        # cost leaves its tasks and allocations behind; the reports' joins
+        # stop counting them, and so must the roll-ups.
+        f"trg_positions_delete_{kind}_rollup": (
+            "AFTER DELETE ON positions",
+            f"e.id IN (SELECT {fk} FROM {rollup['tasks_table']} WHERE position_id = OLD.id)"),
+        f"trg_software_costs_delete_{kind}_rollup": (
+            "AFTER DELETE ON software_costs",
+            f"e.id IN (SELECT {fk} FROM {rollup['allocations_table']} WHERE software_id = OLD.id)"),
+    }
+
+
+def migrate_cost_rollups(cursor):
+    """
+    Per-product and per-service hours/cost totals, kept current by triggers on
+    tasks, software allocations, and updates and deletes of positions and
+    software costs.
+    """
+    for kind, rollup in COST_ROLLUPS.items():
+        fk = rollup["foreign_key"]
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {rollup['rollup_table']} (
+                {fk} INTEGER PRIMARY KEY,
+                task_count INTEGER NOT NULL DEFAULT 0,
+                estimated_hours REAL,
+                actual_hours REAL,
+                labor_cost_min REAL,
+                labor_cost_max REAL,
+                actual_cost_min REAL,
+                actual_cost_max REAL,
+                software_cost REAL
+            )
+        """)
+        for name, (event, where) in _cost_rollup_triggers(kind).items():
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {name} {event}
+                BEGIN
+                    {_refresh_cost_rollup_sql(kind, where)}
+                END
+            """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{rollup['table']}_delete_rollup
+            AFTER DELETE ON {rollup['table']}
+            BEGIN
+                DELETE FROM {rollup['rollup_table']} WHERE {fk} = OLD.id;
+            END
+        """)
+    rebuild_cost_rollups(cursor)
+
+
+def rebuild_cost_rollups(cursor) -> dict:
+    """Recompute every roll-up row from scratch. Returns rows written per kind."""
+    written = {}
+    for kind, rollup in COST_ROLLUPS.items():
+        cursor.execute(f"DELETE FROM {rollup['rollup_table']}")
+        columns = ", ".join(ROLLUP_COLUMNS)
+        cursor.execute(f"""
+            INSERT INTO {rollup['rollup_table']} ({rollup['foreign_key']}, {columns})
+            SELECT entity_id, {columns} FROM ({cost_rollup_select(kind, "1 = 1")})
+        """)
+        written[kind] = cursor.rowcount
+    return written
+
+
+def migrate_deferrable_cost_rollups(cursor):
+    """
+    Recreate the roll-up triggers so they skip their refresh while a row
+    exists in cost_rollup_deferrals; see defer_cost_rollups().
+    """
+    cursor.execute("CREATE TABLE IF NOT EXISTS cost_rollup_deferrals (id INTEGER PRIMARY KEY)")
+    for kind in COST_ROLLUPS:
+        for name, (event, where) in _cost_rollup_triggers(kind).items():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"""
+                CREATE TRIGGER {name} {event}
+                WHEN NOT EXISTS (SELECT 1 FROM cost_rollup_deferrals)
+                BEGIN
+                    {_refresh_cost_rollup_sql(kind, where)}
+                END
+            """)
+
+
+@contextmanager
+def defer_cost_rollups(cursor):
+    """
+    Suspend the per-row roll-up triggers for bulk writes inside a transaction.
+    The caller refreshes the entities it touched with refresh_cost_rollups()
+    before the transaction commits; other connections never see the marker
+    row because it is removed in the same transaction.
+    """
+    cursor.execute("INSERT INTO cost_rollup_deferrals DEFAULT VALUES")
+    marker = cursor.lastrowid
+    try:
+        yield
+    finally:
+        cursor.execute("DELETE FROM cost_rollup_deferrals WHERE id = ?", (marker,))
+
+
+def refresh_cost_rollups(cursor, kind: str, entity_ids, chunk_size: int = 500):
+    entity_ids = list(entity_ids)
+    for start in range(0, len(entity_ids), chunk_size):
+        chunk = entity_ids[start:start + chunk_size]
+        where = f"e.id IN ({', '.join(str(int(entity_id)) for entity_id in chunk)})"
+        for statement in _refresh_cost_rollup_sql(kind, where).split(";"):
+            if statement.strip():
+                cursor.execute(statement)
+
+
+# Nullable sort columns are indexed as COALESCE(column, ''), the expression
+# services.pagination sorts and seeks on.
+LIST_ORDER_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_products_created_order ON products(COALESCE(created_at, '') DESC, id)",
+    "CREATE INDEX IF NOT EXISTS idx_services_created_order ON services(COALESCE(created_at, '') DESC, id)",
+    "CREATE INDEX IF NOT EXISTS idx_software_costs_name ON software_costs(name)",
+    "CREATE INDEX IF NOT EXISTS idx_positions_title ON positions(title)",
+    "CREATE INDEX IF NOT EXISTS idx_knowledge_updated_order ON knowledge_base(COALESCE(updated_at, '') DESC, id)",
+    "CREATE INDEX IF NOT EXISTS idx_valuation_history_order ON valuation_history(product_id, COALESCE(created_at, ''), id)",
+]
+
+
+def migrate_list_order_indexes(cursor):
+    """Indexes matching each list endpoint's sort key and tie-breaker, for keyset paging."""
+    for statement in LIST_ORDER_INDEXES:
+        cursor.execute(statement)
+
+
+def migrate_task_external_id_index(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_external_id ON tasks(external_id)")
+
+
+def migrate_valuation_history_deltas(cursor):
+    """
+    Store valuation_history snapshots as compressed keyframes and deltas
+    instead of full JSON text, and compact the existing rows.
+    """
+    from services.valuation_history import compact_history
+
+    cursor.execute("PRAGMA table_info(valuation_history)")
+    columns = [row[1] for row in cursor.fetchall()]
+    if 'snapshot_kind' not in columns:
+        cursor.execute("ALTER TABLE valuation_history ADD COLUMN snapshot_kind TEXT")
+    if 'snapshot_blob' not in columns:
+        cursor.execute("ALTER TABLE valuation_history ADD COLUMN snapshot_blob BLOB")
+    compact_history(cursor)
+
+
+def migrate_product_documents(cursor):
+    """
+    Move the document columns off products into product_documents, so
+    product lists stop reading them.
+    """
+    from services.product_documents import move_documents_out_of_products
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS product_documents (
+            product_id INTEGER NOT NULL,
+            doc_type TEXT NOT NULL,
+            content TEXT,
+            content_blob BLOB,
+            size_bytes INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP,
+            PRIMARY KEY (product_id, doc_type),
+            FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_product_documents_summary "
+        "ON product_documents(product_id, doc_type, updated_at, size_bytes)"
+    )
+    add_version_triggers(cursor, "product_documents")
+    move_documents_out_of_products(cursor)
+
+
+def migrate_product_document_cleanup(cursor):
+    """
+    Foreign keys are not enforced, so the table's ON DELETE CASCADE never
+    fires; a trigger removes a product's documents instead.
+    """
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_products_delete_documents
+        AFTER DELETE ON products
+        BEGIN
+            DELETE FROM product_documents WHERE product_id = OLD.id;
+        END
+    """)
+    cursor.execute("DELETE FROM product_documents WHERE product_id NOT IN (SELECT id FROM products)")
+
+
+def migrate_webhook_outbox_leases(cursor):
+    """
+    Add the 'sending' status and lease_expires_at, so a worker claims rows
+    before delivering them. SQLite cannot alter a CHECK constraint, so the
+    table is rebuilt.
+    """
+    cursor.execute("""
+        CREATE TABLE webhook_outbox_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            endpoint TEXT NOT NULL,
+            event TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'sending', 'delivered', 'failed')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            lease_expires_at REAL,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            delivered_at TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO webhook_outbox_new (id, endpoint, event, payload, status, attempts, next_attempt_at, last_error, created_at, delivered_at)
+        SELECT id, endpoint, event, payload, status, attempts, next_attempt_at, last_error, created_at, delivered_at
+        FROM webhook_outbox
+    """)
+    cursor.execute("DROP TABLE webhook_outbox")
+    cursor.execute("ALTER TABLE webhook_outbox_new RENAME TO webhook_outbox")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_webhook_outbox_due ON webhook_outbox(status, next_attempt_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_webhook_outbox_lease ON webhook_outbox(status, lease_expires_at)")
+
+
+def migrate_nullable_list_order(cursor):
+    """
+    Replace the list order indexes on nullable columns with the COALESCE
+    expression indexes services.pagination now sorts on.
+    """
+    for index in ("idx_products_created", "idx_services_created", "idx_knowledge_updated"):
+        cursor.execute(f"DROP INDEX IF EXISTS {index}")
+    for statement in LIST_ORDER_INDEXES:
+        cursor.execute(statement)
+
+
+def migrate_cost_rollup_reference_deletes(cursor):
+    """
+    Add the roll-up triggers for deleted positions and software costs, and
+    rebuild roll-ups left stale by deletes made before they existed.
+    """
+    migrate_deferrable_cost_rollups(cursor)
+    rebuild_cost_rollups(cursor)
+
+
+MIGRATIONS = [
+    (1, migrate_secondary_indexes),
+    (2, migrate_data_versions),
+    (3, migrate_knowledge_versions),
+    (4, migrate_webhook_outbox),
+    (5, migrate_cost_rollups),
+    (6, migrate_service_versions),
+    (7, migrate_valuation_history_deltas),
+    (8, migrate_list_order_indexes),
+    (9, migrate_task_external_id_index),
+    (10, migrate_deferrable_cost_rollups),
+    (11, migrate_product_documents),
+    (12, migrate_product_document_cleanup),
+    (13, migrate_webhook_outbox_leases),
+    (14, migrate_nullable_list_order),
+    (15, migrate_cost_rollup_reference_deletes),
+]
+
+
+def get_data_version(conn, tables: list) -> int:
+    """Combined write counter for tables; changes whenever any of them is written."""
+    placeholders = ", ".join("?" for _ in tables)
+    row = conn.execute(
+        f"SELECT COALESCE(SUM(version), 0) FROM data_versions WHERE table_name IN ({placeholders})",
+        tables
+    ).fetchone()
+    return row[0]
+
+
+def get_all_data_versions(conn) -> dict:
+    return {row[0]: row[1] for row in conn.execute("SELECT table_name, version FROM data_versions")}
+
+
+def run_migrations(conn):
+    """
+    Apply versioned migrations newer than the database's PRAGMA user_version.
+    """
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA user_version")
+    current_version = cursor.fetchone()[0]
+    for version, migrate in MIGRATIONS:
+        if version <= current_version:
+            continue
+        migrate(cursor)
+        cursor.execute(f"PRAGMA user_version = {version}")
+
+
 def seed_default_admin(conn):
     cursor = conn.cursor()
     cursor.execute("SELECT COUNT(*) FROM users")
@@ -1,6 +1,11 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database import init_db
+from database import init_db, configure_database, get_pool_stats, pool
+from services.llm_client import llm_clients
+from services.webhook_service import webhook_outbox
+from services.response_cache import ConditionalGetMiddleware, data_version_tracker, response_cache
+from services.auth_service import token_cache
+from services.supabase_client import supabase_client
 from routers import positions, products, calculator, learn, assistant, knowledge, valuations, software, service_departments, personas, services, reports, admin, business_units, auth_router
 from dotenv import load_dotenv
 import os
@@ -24,6 +29,9 @@ frontend_url = os.getenv("FRONTEND_URL")
 if frontend_url:
     allowed_origins.append(frontend_url)
 
+# Registered before CORS so CORS headers are also added to 304 responses
+app.add_middleware(ConditionalGetMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
@@ -33,8 +41,17 @@ app.add_middleware(
 )
 
 @app.on_event("startup")
-def startup():
+async def startup():
+    configure_database()
     init_db()
+    await webhook_outbox.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await webhook_outbox.stop()
+    await llm_clients.close()
+    await supabase_client.close()
+    pool.close_all()
 
 app.include_router(positions.router)
 app.include_router(products.router)
@@ -61,3 +78,27 @@ def root():
 @app.get("/health")
 def health():
     return {"success": True, "data": {"status": "healthy"}, "error": None}
+
+@app.get("/health/db")
+def health_db():
+    return {"success": True, "data": {"pool": get_pool_stats()}, "error": None}
+
+@app.get("/health/webhooks")
+def health_webhooks():
+    return {"success": True, "data": {"outbox": webhook_outbox.stats()}, "error": None}
+
+@app.get("/health/auth")
+def health_auth():
+    return {"success": True, "data": {"supabase": supabase_client.stats()}, "error": None}
+
+@app.get("/health/cache")
+def health_cache():
+    return {
+        "success": True,
+        "data": {
+            "responses": response_cache.stats(),
+            "data_versions": data_version_tracker.stats(),
+            "auth_tokens": token_cache.stats(),
+        },
+        "error": None
+    }
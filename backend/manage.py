@@ -0,0 +1,129 @@
+import argparse
+import sys
+
+from database import get_connection, init_db
+
+
+def check_query_plans_command(args) -> int:
+    from services.query_plans import check_query_plans
+
+    with get_connection() as conn:
+        report = check_query_plans(conn, min_rows=args.min_rows)
+
+    for error in report["errors"]:
+        print(f"ERROR {error['file']}:{error['line']}: {error['error']}")
+    for violation in report["violations"]:
+        for scan in violation["scans"]:
+            print(f"FULL SCAN {violation['file']}:{violation['line']}: {scan['table']} ({scan['rows']} rows) - {scan['detail']}")
+    print(f"Checked {report['checked']} statements: {len(report['violations'])} with full scans on tables over {report['min_rows']} rows, {len(report['errors'])} errors")
+    return 1 if report["violations"] or report["errors"] else 0
+
+
+def rebuild_rollups_command(args) -> int:
+    from services.cost_rollups import rebuild_all_cost_rollups
+
+    with get_connection() as conn:
+        written = rebuild_all_cost_rollups(conn)
+
+    for kind, rows in written.items():
+        print(f"Rebuilt {rows} {kind} cost roll-up rows")
+    return 0
+
+
+def verify_rollups_command(args) -> int:
+    from services.cost_rollups import verify_cost_rollups
+
+    with get_connection() as conn:
+        report = verify_cost_rollups(conn)
+
+    failed = False
+    for kind, result in report.items():
+        for mismatch in result["mismatches"]:
+            print(f"MISMATCH {kind} {mismatch['id']} {mismatch['column']}: stored {mismatch['stored']!r}, expected {mismatch['expected']!r}")
+        print(f"Checked {result['checked']} {kind} roll-ups: {len(result['mismatches'])} mismatches")
+        failed = failed or bool(result["mismatches"])
+    return 1 if failed else 0
+
+
+def recompute_valuations_command(args) -> int:
+    from routers.valuations import recompute_all_valuations
+
+    result = recompute_all_valuations(chunk_size=args.chunk_size, workers=args.workers)
+    print(
+        f"Recomputed {result['rows']} valuations ({result['updated']} changed) "
+        f"in {result['seconds']}s, {result['rows_per_sec']} rows/sec"
+    )
+    return 0
+
+
+def bench_rate_limiter_command(args) -> int:
+    import random
+    import tempfile
+    import threading
+    import time
+    from pathlib import Path
+    from auth import RateLimiter, SQLiteRateLimiter
+    from config import settings
+
+    if args.backend == "sqlite":
+        # A scratch file, so the fake keys never land in the live rate_limits.db
+        scratch = tempfile.TemporaryDirectory()
+        limiter = SQLiteRateLimiter(Path(scratch.name) / "rate_limits.db", requests_per_minute=settings.RATE_LIMIT_PER_MINUTE)
+    else:
+        limiter = RateLimiter(requests_per_minute=settings.RATE_LIMIT_PER_MINUTE, stripes=settings.RATE_LIMIT_STRIPES)
+    keys = [f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}" for i in range(args.keys)]
+    per_thread = args.checks // args.threads
+
+    def run(seed: int):
+        rng = random.Random(seed)
+        for _ in range(per_thread):
+            limiter.is_allowed(rng.choice(keys))
+
+    threads = [threading.Thread(target=run, args=(seed,)) for seed in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+    checks = per_thread * args.threads
+    print(
+        f"{args.backend} limiter: {checks} checks over {args.keys} keys on {args.threads} thread(s) "
+        f"in {seconds:.3f}s, {checks / seconds:,.0f} checks/sec, {limiter.tracked_keys()} keys tracked"
+    )
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Product Jarvis maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    plans = subparsers.add_parser("check-query-plans", help="EXPLAIN every SQL statement executed in routers/ and services/ and fail on full table scans")
+    plans.add_argument("--min-rows", type=int, default=1000, help="Only flag scans of tables with more than this many rows")
+    plans.set_defaults(func=check_query_plans_command)
+
+    rebuild = subparsers.add_parser("rebuild-rollups", help="Recompute the product and service cost roll-up tables")
+    rebuild.set_defaults(func=rebuild_rollups_command)
+
+    verify = subparsers.add_parser("verify-rollups", help="Compare the cost roll-up tables with freshly computed totals")
+    verify.set_defaults(func=verify_rollups_command)
+
+    recompute = subparsers.add_parser("recompute-valuations", help="Re-run the valuation calculator over every stored valuation")
+    recompute.add_argument("--chunk-size", type=int, default=None, help="Valuations read and evaluated per chunk")
+    recompute.add_argument("--workers", type=int, default=None, help="Process-pool workers, capped at VALUATION_MAX_WORKERS; 0 or 1 evaluates in-process")
+    recompute.set_defaults(func=recompute_valuations_command)
+
+    bench = subparsers.add_parser("bench-rate-limiter", help="Measure rate limiter checks/sec across many distinct keys")
+    bench.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    bench.add_argument("--keys", type=int, default=10000, help="Distinct client keys")
+    bench.add_argument("--checks", type=int, default=200000, help="Total is_allowed() calls")
+    bench.add_argument("--threads", type=int, default=1)
+    bench.set_defaults(func=bench_rate_limiter_command)
+
+    args = parser.parse_args(argv)
+    init_db()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
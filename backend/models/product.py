@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from typing import Dict, Optional, Literal
 from datetime import datetime
 
 ProductStatus = Literal["Draft", "Ideation", "Approved", "Backlog", "Kill", "In Development", "Live", "Deprecated"]
@@ -42,18 +42,15 @@ class ProductUpdate(BaseModel):
     valuation_confidence: Optional[str] = None
     quick_estimate_inputs: Optional[str] = None
 
+class ProductDocumentSummary(BaseModel):
+    updated_at: Optional[datetime] = None
+    size_bytes: int = 0
+
 class Product(ProductBase):
     id: int
     created_at: datetime
     updated_at: datetime
-    raw_valuation_output: Optional[str] = None
-    raw_valuation_output_updated_at: Optional[datetime] = None
-    user_flow: Optional[str] = None
-    user_flow_updated_at: Optional[datetime] = None
-    specifications: Optional[str] = None
-    specifications_updated_at: Optional[datetime] = None
-    persona_feedback: Optional[str] = None
-    persona_feedback_updated_at: Optional[datetime] = None
+    documents: Dict[str, ProductDocumentSummary] = Field(default_factory=dict)
     valuation_complete: bool = False
 
     class Config:
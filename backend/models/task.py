@@ -27,6 +27,21 @@ class TaskUpdate(BaseModel):
     class Config:
         extra = "ignore"
 
+class TaskUpsert(BaseModel):
+    """One row of a bulk import, matched to an existing task by external_id."""
+    external_id: str = Field(..., min_length=1, max_length=100)
+    product_id: int
+    name: Optional[str] = Field(None, min_length=1, max_length=200)
+    position_id: Optional[int] = None
+    estimated_hours: Optional[float] = Field(None, gt=0)
+    actual_hours: Optional[float] = Field(None, ge=0)
+    status: Optional[TaskStatus] = None
+    assignee_name: Optional[str] = Field(None, max_length=200)
+    due_date: Optional[date] = None
+
+    class Config:
+        extra = "ignore"
+
 class Task(TaskBase):
     id: int
     product_id: int
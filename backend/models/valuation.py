@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from typing import Dict, Optional, Literal
 from datetime import date, datetime
+from config import settings
 
 ConfidenceLevel = Literal["High", "Medium", "Low", "Speculative"]
 PricingModel = Literal["One-time", "Monthly", "Annual", "Usage-based", "Per-seat"]
@@ -119,3 +120,20 @@ class ValuationHistory(BaseModel):
 
     class Config:
         from_attributes = True
+
+class InputRange(BaseModel):
+    low: float
+    high: float
+    mode: Optional[float] = None
+
+class PortfolioSimulationRequest(BaseModel):
+    samples: Optional[int] = Field(None, ge=100, le=1_000_000)
+    seed: Optional[int] = None
+    spread: Optional[float] = Field(None, ge=0, le=1)
+    workers: Optional[int] = Field(None, ge=0, le=settings.VALUATION_MAX_WORKERS)
+
+class ValuationSimulationRequest(BaseModel):
+    samples: Optional[int] = Field(None, ge=100, le=1_000_000)
+    seed: Optional[int] = None
+    spread: Optional[float] = Field(None, ge=0, le=1)
+    ranges: Dict[str, InputRange] = {}
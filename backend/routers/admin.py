@@ -1,5 +1,6 @@
 from fastapi import APIRouter
 from database import get_connection
+from services.auth_service import token_cache
 from datetime import datetime
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
@@ -352,18 +353,23 @@ def clear_all_data():
             "valuation_history",
             "product_valuations",
             "tasks",
+            "product_documents",
             "products",
             "software_costs",
             "service_departments",
             "positions",
             "knowledge_base",
         ]
+
+        cursor.execute("UPDATE users SET department_id = NULL")
+        cursor.execute("UPDATE business_units SET head_position_id = NULL")
         
         for table in tables:
             cursor.execute(f"DELETE FROM {table}")
             cursor.execute(f"DELETE FROM sqlite_sequence WHERE name='{table}'")
         
         conn.commit()
+        token_cache.clear()
     
     return {
         "success": True,
@@ -1,8 +1,14 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
 import os
+import json
 from database import get_connection
+from services.snapshot_cache import VersionedSnapshot
+from services.product_documents import read_all_contents
+from services.lessons import lesson_index
+from services.llm_client import ANTHROPIC_AVAILABLE, create_message, stream_message_text, cached_system_blocks, prompt_metrics
 
 router = APIRouter(prefix="/api/assistant", tags=["assistant"])
 
@@ -27,36 +33,49 @@ def get_portfolio_data() -> dict:
         cursor.execute("SELECT * FROM service_departments ORDER BY name")
         dept_rows = cursor.fetchall()
         
+        cursor.execute("""
+            SELECT t.*, p.title as position_title, p.department as position_department,
+                   p.hourly_cost_min, p.hourly_cost_max
+            FROM tasks t
+            JOIN positions p ON t.position_id = p.id
+            ORDER BY t.product_id, t.id
+        """)
+        tasks_by_product = {}
+        for row in cursor.fetchall():
+            tasks_by_product.setdefault(row["product_id"], []).append(row)
+        
+        cursor.execute("""
+            SELECT psa.*, sc.name as software_name, sc.monthly_cost
+            FROM product_software_allocations psa
+            JOIN software_costs sc ON psa.software_id = sc.id
+            ORDER BY psa.product_id, psa.software_id
+        """)
+        software_allocs_by_product = {}
+        for row in cursor.fetchall():
+            software_allocs_by_product.setdefault(row["product_id"], []).append(row)
+        
+        cursor.execute("""
+            SELECT psd.*, sd.name as department_name
+            FROM product_service_departments psd
+            JOIN service_departments sd ON psd.department_id = sd.id
+            ORDER BY psd.product_id, psd.role DESC, sd.name
+        """)
+        dept_assigns_by_product = {}
+        for row in cursor.fetchall():
+            dept_assigns_by_product.setdefault(row["product_id"], []).append(row)
+        
+        cursor.execute("SELECT * FROM product_valuations")
+        valuations_by_product = {row["product_id"]: row for row in cursor.fetchall()}
+        
+        documents_by_product = read_all_contents(cursor)
+        
         products = []
         for prod in product_rows:
-            cursor.execute("""
-                SELECT t.*, p.title as position_title, p.department as position_department,
-                       p.hourly_cost_min, p.hourly_cost_max
-                FROM tasks t
-                JOIN positions p ON t.position_id = p.id
-                WHERE t.product_id = ?
-            """, (prod["id"],))
-            task_rows = cursor.fetchall()
-            
-            cursor.execute("""
-                SELECT psa.*, sc.name as software_name, sc.monthly_cost
-                FROM product_software_allocations psa
-                JOIN software_costs sc ON psa.software_id = sc.id
-                WHERE psa.product_id = ?
-            """, (prod["id"],))
-            software_alloc_rows = cursor.fetchall()
-            
-            cursor.execute("""
-                SELECT psd.*, sd.name as department_name
-                FROM product_service_departments psd
-                JOIN service_departments sd ON psd.department_id = sd.id
-                WHERE psd.product_id = ?
-                ORDER BY psd.role DESC, sd.name
-            """, (prod["id"],))
-            dept_assign_rows = cursor.fetchall()
-            
-            cursor.execute("SELECT * FROM product_valuations WHERE product_id = ?", (prod["id"],))
-            valuation_row = cursor.fetchone()
+            task_rows = tasks_by_product.get(prod["id"], [])
+            software_alloc_rows = software_allocs_by_product.get(prod["id"], [])
+            dept_assign_rows = dept_assigns_by_product.get(prod["id"], [])
+            valuation_row = valuations_by_product.get(prod["id"])
+            documents = documents_by_product.get(prod["id"], {})
             
             labor_cost_min = sum(t["estimated_hours"] * t["hourly_cost_min"] for t in task_rows)
             labor_cost_max = sum(t["estimated_hours"] * t["hourly_cost_max"] for t in task_rows)
@@ -200,10 +219,10 @@ def get_portfolio_data() -> dict:
                 "tasks": tasks,
                 "software_allocations": software_allocations,
                 "valuation": valuation,
-                "raw_valuation_output": safe_prod_get("raw_valuation_output"),
-                "user_flow": safe_prod_get("user_flow"),
-                "specifications": safe_prod_get("specifications"),
-                "persona_feedback": safe_prod_get("persona_feedback"),
+                "raw_valuation_output": documents.get("raw_valuation_output"),
+                "user_flow": documents.get("user_flow"),
+                "specifications": documents.get("specifications"),
+                "persona_feedback": documents.get("persona_feedback"),
                 "valuation_type": safe_prod_get("valuation_type"),
                 "valuation_confidence": safe_prod_get("valuation_confidence")
             })
@@ -259,6 +278,13 @@ def get_portfolio_data() -> dict:
             "service_departments": departments
         }
 
+PORTFOLIO_TABLES = [
+    "products", "tasks", "product_software_allocations", "product_service_departments",
+    "product_valuations", "positions", "software_costs", "service_departments", "product_documents",
+]
+
+portfolio_snapshot = VersionedSnapshot(PORTFOLIO_TABLES, get_portfolio_data)
+
 def format_portfolio_for_ai(data: dict) -> str:
     lines = ["=== CURRENT PORTFOLIO DATA ===\n"]
     
@@ -439,8 +465,7 @@ def get_knowledge_base() -> list:
         } for row in rows]
 
 def get_lessons() -> list:
-    from routers.learn import LESSONS
-    return LESSONS
+    return lesson_index.lessons()
 
 def format_knowledge_for_ai(entries: list, lessons: list = None) -> str:
     lines = []
@@ -466,11 +491,14 @@ def format_knowledge_for_ai(entries: list, lessons: list = None) -> str:
     
     return "\n".join(lines) if lines else ""
 
-try:
-    from anthropic import Anthropic
-    ANTHROPIC_AVAILABLE = True
-except ImportError:
-    ANTHROPIC_AVAILABLE = False
+portfolio_context_cache = VersionedSnapshot(
+    PORTFOLIO_TABLES, lambda: format_portfolio_for_ai(portfolio_snapshot.get())
+)
+
+knowledge_context_cache = VersionedSnapshot(
+    ["knowledge_base"], lambda: format_knowledge_for_ai(get_knowledge_base(), get_lessons())
+)
+
 
 BASE_SYSTEM_PROMPT = """You are a senior Head of Product with 15+ years of experience at top tech companies. You serve as the Product Strategy Expert for Product Jarvis, a decision-support system for product evaluation.
 
@@ -575,92 +603,120 @@ class ChatResponse(BaseModel):
     response: str
     framework_refs: List[str] = []
 
+FRAMEWORK_KEYWORDS = {
+    "MVS": ["mvs", "minimum viable segment"],
+    "BACK": ["back matrix", "back", "critical", "blatant", "latent"],
+    "4 U's": ["4 u's", "four u's", "unworkable", "unavoidable", "urgent", "underserved"],
+    "Gain/Pain": ["gain/pain", "gain pain", "value ratio"],
+    "RICE": ["rice", "reach", "impact", "confidence", "effort"],
+    "ROI": ["roi", "return on investment"],
+    "Build/Buy/Kill": ["build", "buy", "kill", "defer"],
+    "RACI": ["raci", "responsible", "accountable", "consulted", "informed"]
+}
+
 def extract_framework_refs(text: str) -> List[str]:
     frameworks = []
-    keywords = {
-        "MVS": ["mvs", "minimum viable segment"],
-        "BACK": ["back matrix", "back", "critical", "blatant", "latent"],
-        "4 U's": ["4 u's", "four u's", "unworkable", "unavoidable", "urgent", "underserved"],
-        "Gain/Pain": ["gain/pain", "gain pain", "value ratio"],
-        "RICE": ["rice", "reach", "impact", "confidence", "effort"],
-        "ROI": ["roi", "return on investment"],
-        "Build/Buy/Kill": ["build", "buy", "kill", "defer"],
-        "RACI": ["raci", "responsible", "accountable", "consulted", "informed"]
-    }
     text_lower = text.lower()
-    for framework, terms in keywords.items():
+    for framework, terms in FRAMEWORK_KEYWORDS.items():
         if any(term in text_lower for term in terms):
             frameworks.append(framework)
     return frameworks
 
+class FrameworkRefTracker:
+    """
+    extract_framework_refs over text that arrives in chunks. Only a tail long
+    enough to catch a term split across chunks is kept, not the whole text.
+    """
+    def __init__(self):
+        self.found = set()
+        self.tail = ""
+        self.overlap = max(len(term) for terms in FRAMEWORK_KEYWORDS.values() for term in terms) - 1
+    
+    def feed(self, chunk: str):
+        window = self.tail + chunk.lower()
+        for framework, terms in FRAMEWORK_KEYWORDS.items():
+            if framework not in self.found and any(term in window for term in terms):
+                self.found.add(framework)
+        self.tail = window[-self.overlap:]
+    
+    def refs(self) -> List[str]:
+        return [framework for framework in FRAMEWORK_KEYWORDS if framework in self.found]
+
+CHAT_MODEL = "claude-sonnet-4-20250514"
+CHAT_MAX_TOKENS = 2048
+
+def get_unavailable_message(api_key: Optional[str]) -> Optional[str]:
+    if not ANTHROPIC_AVAILABLE:
+        return "The Anthropic SDK is not installed. Please run: pip install anthropic"
+    if not api_key:
+        return "No API key configured. To enable the AI assistant, set ANTHROPIC_API_KEY environment variable."
+    return None
+
+def build_chat_prompt(request: ChatRequest) -> tuple:
+    """
+    System blocks and messages for a chat turn. The instructions and the
+    knowledge block only change when the knowledge base does, so they form
+    the system prefix marked for prompt caching; the portfolio and question
+    stay in the user message.
+    """
+    messages = []
+    for msg in request.history:
+        messages.append({"role": msg.role, "content": msg.content})
+    
+    user_message = request.message
+    if request.context:
+        user_message = f"Context: {request.context}\n\nQuestion: {request.message}"
+    
+    context_parts = []
+    
+    if request.include_data:
+        portfolio_context = portfolio_context_cache.get()
+        context_parts.append(portfolio_context)
+    
+    if context_parts:
+        user_message = "\n\n".join(context_parts) + f"\n\n---\nUSER QUESTION: {user_message}"
+    
+    messages.append({"role": "user", "content": user_message})
+    
+    system_prompt = BASE_SYSTEM_PROMPT
+    if request.mode == "problem_solving":
+        system_prompt = BASE_SYSTEM_PROMPT + PROBLEM_SOLVING_PROMPT
+    
+    if request.include_data:
+        system_prompt += "\n\nYou have access to the user's current portfolio data (products, tasks, positions, software costs, service departments, ROI calculations). Use this data to provide specific, personalized advice. Reference specific products by name when relevant."
+    
+    if request.include_knowledge:
+        system_prompt += "\n\nYou have access to detailed product management frameworks from the Learn page (MVS, BACK Matrix, 4 U's, Gain/Pain, RICE, ROI, Build/Buy/Kill, Internal vs External) plus any custom knowledge the user has added. Use these frameworks with their full detail, examples, and scoring criteria when answering questions."
+    
+    system_parts = [system_prompt]
+    if request.include_knowledge:
+        system_parts.append(knowledge_context_cache.get())
+    
+    return cached_system_blocks(system_parts), messages
+
 @router.post("")
 async def chat(request: ChatRequest):
     api_key = os.environ.get("ANTHROPIC_API_KEY")
     
-    if not ANTHROPIC_AVAILABLE:
-        return {
-            "success": True,
-            "data": {
-                "response": "The Anthropic SDK is not installed. Please run: pip install anthropic",
-                "framework_refs": []
-            },
-            "error": None
-        }
-    
-    if not api_key:
+    unavailable_message = get_unavailable_message(api_key)
+    if unavailable_message:
         return {
             "success": True,
             "data": {
-                "response": "No API key configured. To enable the AI assistant, set ANTHROPIC_API_KEY environment variable.",
+                "response": unavailable_message,
                 "framework_refs": []
             },
             "error": None
         }
     
     try:
-        client = Anthropic(api_key=api_key)
-        
-        messages = []
-        for msg in request.history:
-            messages.append({"role": msg.role, "content": msg.content})
-        
-        user_message = request.message
-        if request.context:
-            user_message = f"Context: {request.context}\n\nQuestion: {request.message}"
-        
-        context_parts = []
-        
-        if request.include_data:
-            portfolio_data = get_portfolio_data()
-            portfolio_context = format_portfolio_for_ai(portfolio_data)
-            context_parts.append(portfolio_context)
-        
-        if request.include_knowledge:
-            knowledge_entries = get_knowledge_base()
-            lessons = get_lessons()
-            knowledge_context = format_knowledge_for_ai(knowledge_entries, lessons)
-            if knowledge_context:
-                context_parts.append(knowledge_context)
-        
-        if context_parts:
-            user_message = "\n\n".join(context_parts) + f"\n\n---\nUSER QUESTION: {user_message}"
+        system_blocks, messages = build_chat_prompt(request)
         
-        messages.append({"role": "user", "content": user_message})
-        
-        system_prompt = BASE_SYSTEM_PROMPT
-        if request.mode == "problem_solving":
-            system_prompt = BASE_SYSTEM_PROMPT + PROBLEM_SOLVING_PROMPT
-        
-        if request.include_data:
-            system_prompt += "\n\nYou have access to the user's current portfolio data (products, tasks, positions, software costs, service departments, ROI calculations). Use this data to provide specific, personalized advice. Reference specific products by name when relevant."
-        
-        if request.include_knowledge:
-            system_prompt += "\n\nYou have access to detailed product management frameworks from the Learn page (MVS, BACK Matrix, 4 U's, Gain/Pain, RICE, ROI, Build/Buy/Kill, Internal vs External) plus any custom knowledge the user has added. Use these frameworks with their full detail, examples, and scoring criteria when answering questions."
-        
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=2048,
-            system=system_prompt,
+        response = await create_message(
+            api_key,
+            model=CHAT_MODEL,
+            max_tokens=CHAT_MAX_TOKENS,
+            system=system_blocks,
             messages=messages
         )
         
@@ -683,6 +739,46 @@ async def chat(request: ChatRequest):
             "error": str(e)
         }
 
+def sse_event(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+@router.post("/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Same as chat, but sends the reply as Server-Sent Events: "text" events
+    with each chunk, then "done" with the framework refs (or "error").
+    """
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    unavailable_message = get_unavailable_message(api_key)
+    
+    async def events():
+        if unavailable_message:
+            yield sse_event({"type": "text", "text": unavailable_message})
+            yield sse_event({"type": "done", "framework_refs": []})
+            return
+        
+        tracker = FrameworkRefTracker()
+        try:
+            system_blocks, messages = build_chat_prompt(request)
+            async for text in stream_message_text(
+                api_key,
+                model=CHAT_MODEL,
+                max_tokens=CHAT_MAX_TOKENS,
+                system=system_blocks,
+                messages=messages
+            ):
+                tracker.feed(text)
+                yield sse_event({"type": "text", "text": text})
+            yield sse_event({"type": "done", "framework_refs": tracker.refs()})
+        except Exception as e:
+            yield sse_event({"type": "error", "error": str(e)})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/status")
 def get_status():
     api_key = os.environ.get("ANTHROPIC_API_KEY")
@@ -695,3 +791,15 @@ def get_status():
         },
         "error": None
     }
+
+@router.get("/context-cache")
+def get_context_cache_stats():
+    return {
+        "success": True,
+        "data": {
+            "portfolio": portfolio_context_cache.stats(),
+            "knowledge": knowledge_context_cache.stats(),
+            "prompt_prefix": prompt_metrics.stats()
+        },
+        "error": None
+    }
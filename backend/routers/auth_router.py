@@ -8,7 +8,8 @@ from schemas.auth import (
     AcceptInviteRequest, AcceptInviteResponse,
     InviteUserResponse, AuthModeResponse
 )
-from services.auth_service import auth_service, generate_invite_token, AuthUser
+from services.auth_service import auth_service, generate_invite_token, token_cache, AuthUser
+from services.supabase_client import SupabaseUnavailable
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -18,19 +19,9 @@ def get_current_user(
     x_user_id: Optional[int] = Header(default=None, alias="X-User-Id"),
 ) -> AuthUser:
     if settings.AUTH_MODE == "dev":
-        user_id = x_user_id or 1
-        with get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-            row = cursor.fetchone()
-            if row:
-                return AuthUser(
-                    id=row["id"],
-                    name=row["name"],
-                    email=row["email"],
-                    role=row["role"],
-                    department_id=row["department_id"] if "department_id" in row.keys() else None,
-                )
+        user = auth_service.validate_token(str(x_user_id or 1))
+        if user:
+            return user
         raise HTTPException(status_code=401, detail="Invalid user")
 
     if not authorization:
@@ -54,7 +45,10 @@ async def get_auth_mode():
 
 @router.post("/login", response_model=LoginResponse)
 async def login(request: LoginRequest):
-    result = auth_service.login(request.email, request.password)
+    try:
+        result = await auth_service.login(request.email, request.password)
+    except SupabaseUnavailable:
+        raise HTTPException(status_code=503, detail="Authentication service unavailable, try again shortly")
     if not result:
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
@@ -96,7 +90,10 @@ async def accept_invite(request: AcceptInviteRequest):
     if len(request.password) < 8:
         raise HTTPException(status_code=400, detail="Password must be at least 8 characters")
 
-    success = auth_service.set_password(user_id, request.password)
+    try:
+        success = await auth_service.set_password(user_id, request.password)
+    except SupabaseUnavailable:
+        raise HTTPException(status_code=503, detail="Authentication service unavailable, try again shortly")
     if not success:
         raise HTTPException(status_code=500, detail="Failed to set password")
 
@@ -148,6 +145,7 @@ async def invite_user(
             (token, user_id)
         )
         conn.commit()
+    token_cache.invalidate_user(user_id)
 
     invite_url = f"{settings.FRONTEND_URL}/accept-invite?token={token}"
 
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException
 from datetime import datetime
 from typing import List
 from models.business_unit import (
@@ -125,7 +125,7 @@ def get_business_unit(bu_id: int):
 
 
 @router.post("", response_model=dict, status_code=201)
-async def create_business_unit(bu: BusinessUnitCreate, background_tasks: BackgroundTasks):
+async def create_business_unit(bu: BusinessUnitCreate):
     now = datetime.now().isoformat()
     with get_connection() as conn:
         cursor = conn.cursor()
@@ -156,8 +156,7 @@ async def create_business_unit(bu: BusinessUnitCreate, background_tasks: Backgro
             raise
 
     result = row_to_business_unit(row, team=[], head_position_title=row["head_position_title"])
-    background_tasks.add_task(
-        _send_business_unit_webhook_async,
+    await _send_business_unit_webhook_async(
         bu_id,
         result["name"],
         "business_unit.created",
@@ -168,7 +167,7 @@ async def create_business_unit(bu: BusinessUnitCreate, background_tasks: Backgro
 
 
 @router.put("/{bu_id}", response_model=dict)
-async def update_business_unit(bu_id: int, bu: BusinessUnitUpdate, background_tasks: BackgroundTasks):
+async def update_business_unit(bu_id: int, bu: BusinessUnitUpdate):
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM business_units WHERE id = ?", (bu_id,))
@@ -211,8 +210,7 @@ async def update_business_unit(bu_id: int, bu: BusinessUnitUpdate, background_ta
         team = get_team_members(cursor, bu_id)
 
     result = row_to_business_unit(row, team=team, head_position_title=row["head_position_title"])
-    background_tasks.add_task(
-        _send_business_unit_webhook_async,
+    await _send_business_unit_webhook_async(
         bu_id,
         result["name"],
         "business_unit.updated",
@@ -260,7 +258,7 @@ def get_business_unit_team(bu_id: int):
 
 
 @router.put("/{bu_id}/team", response_model=dict)
-async def update_business_unit_team(bu_id: int, team_update: BusinessUnitTeamUpdate, background_tasks: BackgroundTasks):
+async def update_business_unit_team(bu_id: int, team_update: BusinessUnitTeamUpdate):
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT id FROM business_units WHERE id = ?", (bu_id,))
@@ -289,8 +287,7 @@ async def update_business_unit_team(bu_id: int, team_update: BusinessUnitTeamUpd
             for m in team
         ]
 
-    background_tasks.add_task(
-        _send_business_unit_team_webhook_async,
+    await _send_business_unit_team_webhook_async(
         bu_id,
         positions_for_webhook
     )
@@ -317,19 +314,10 @@ def get_business_unit_dashboard(bu_id: int):
 
         cursor.execute("""
             SELECT p.*,
-                   COALESCE(
-                       (SELECT SUM(t.estimated_hours * pos.hourly_cost_min)
-                        FROM tasks t
-                        JOIN positions pos ON t.position_id = pos.id
-                        WHERE t.product_id = p.id), 0
-                   ) as cost_min,
-                   COALESCE(
-                       (SELECT SUM(t.estimated_hours * pos.hourly_cost_max)
-                        FROM tasks t
-                        JOIN positions pos ON t.position_id = pos.id
-                        WHERE t.product_id = p.id), 0
-                   ) as cost_max
+                   COALESCE(r.labor_cost_min, 0) as cost_min,
+                   COALESCE(r.labor_cost_max, 0) as cost_max
             FROM products p
+            LEFT JOIN product_cost_rollup r ON r.product_id = p.id
             WHERE p.requestor_business_unit_id = ?
             ORDER BY p.created_at DESC
         """, (bu_id,))
@@ -349,21 +337,12 @@ def get_business_unit_dashboard(bu_id: int):
 
         cursor.execute("""
             SELECT s.*, sd.name as department_name, st.name as service_type_name,
-                   COALESCE(
-                       (SELECT SUM(stk.estimated_hours * pos.hourly_cost_min)
-                        FROM service_tasks stk
-                        JOIN positions pos ON stk.position_id = pos.id
-                        WHERE stk.service_id = s.id), 0
-                   ) as cost_min,
-                   COALESCE(
-                       (SELECT SUM(stk.estimated_hours * pos.hourly_cost_max)
-                        FROM service_tasks stk
-                        JOIN positions pos ON stk.position_id = pos.id
-                        WHERE stk.service_id = s.id), 0
-                   ) as cost_max
+                   COALESCE(r.labor_cost_min, 0) as cost_min,
+                   COALESCE(r.labor_cost_max, 0) as cost_max
             FROM services s
             JOIN service_departments sd ON s.service_department_id = sd.id
             JOIN service_types st ON s.service_type_id = st.id
+            LEFT JOIN service_cost_rollup r ON r.service_id = s.id
             WHERE s.business_unit_id = ?
             ORDER BY s.created_at DESC
         """, (bu_id,))
@@ -387,19 +366,10 @@ def get_business_unit_dashboard(bu_id: int):
 
         cursor.execute("""
             SELECT p.*,
-                   COALESCE(
-                       (SELECT SUM(t.estimated_hours * pos.hourly_cost_min)
-                        FROM tasks t
-                        JOIN positions pos ON t.position_id = pos.id
-                        WHERE t.product_id = p.id), 0
-                   ) as cost_min,
-                   COALESCE(
-                       (SELECT SUM(t.estimated_hours * pos.hourly_cost_max)
-                        FROM tasks t
-                        JOIN positions pos ON t.position_id = pos.id
-                        WHERE t.product_id = p.id), 0
-                   ) as cost_max
+                   COALESCE(r.labor_cost_min, 0) as cost_min,
+                   COALESCE(r.labor_cost_max, 0) as cost_max
             FROM products p
+            LEFT JOIN product_cost_rollup r ON r.product_id = p.id
             WHERE p.requestor_business_unit_id = ?
             AND p.bu_approval_status = 'pending'
             ORDER BY p.created_at DESC
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from datetime import datetime
-from models.task import TaskCreate, TaskUpdate, TaskWithPosition
-from database import get_connection
+from models.task import TaskCreate, TaskUpdate, TaskUpsert, TaskWithPosition
+from database import get_connection, transaction, defer_cost_rollups, refresh_cost_rollups
+from config import settings
 from services.calculation_service import (
     calculate_hours_status,
     calculate_hours_progress,
@@ -10,10 +13,11 @@ from services.calculation_service import (
     calculate_roi,
     calculate_gain_pain,
     get_recommendation,
-    get_health_from_roi,
     process_task_row
 )
+from services.portfolio_metrics import calculate_portfolio_metrics
 from auth import verify_api_key, rate_limit
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -268,6 +272,194 @@ def delete_task(task_id: int, _api_key: str = Depends(verify_api_key), _rate: st
         conn.commit()
     return {"success": True, "data": {"deleted": task_id}, "error": None}
 
+TASK_UPSERT_FIELDS = ["name", "position_id", "estimated_hours", "actual_hours", "status", "assignee_name", "due_date"]
+TASK_CREATE_REQUIRED = ["name", "position_id", "estimated_hours"]
+
+TASK_BULK_INSERT_SQL = f"""INSERT INTO tasks (product_id, external_id, {', '.join(TASK_UPSERT_FIELDS)}, created_at, updated_at)
+               VALUES ({', '.join('?' for _ in range(len(TASK_UPSERT_FIELDS) + 4))})"""
+
+TASK_BULK_UPDATE_SQL = f"""UPDATE tasks SET {', '.join(f'{field} = COALESCE(?, {field})' for field in TASK_UPSERT_FIELDS)},
+               updated_at = ? WHERE id = ?"""
+
+def _select_in(cursor, sql: str, values, chunk_size: int = 500) -> list:
+    """Run sql, whose IN list is written as {ids}, over values in chunks."""
+    values = list(values)
+    rows = []
+    for start in range(0, len(values), chunk_size):
+        chunk = values[start:start + chunk_size]
+        cursor.execute(sql.format(ids=", ".join("?" for _ in chunk)), chunk)
+        rows.extend(cursor.fetchall())
+    return rows
+
+def upsert_tasks(rows: list) -> dict:
+    """
+    Apply task upserts keyed by external_id in one transaction.
+
+    rows holds a TaskUpsert, or an error message for a row that failed to
+    parse. Rows for the same external_id are merged in order, later values
+    winning; when that creates a task, the first row reports "created" and
+    the later ones "updated". Products, positions and existing tasks are
+    each looked up with one query, writes go through executemany with the
+    cost roll-up triggers deferred, each touched product's roll-up is
+    refreshed once, and a product whose first hours were logged moves from
+    Approved to In Development once.
+
+    Unlike create_task, which takes no actual_hours, a new task may arrive
+    with hours already logged; that counts as the product's first hours and
+    triggers the same transition update_task makes.
+    """
+    merged = {}
+    for index, row in enumerate(rows):
+        if isinstance(row, str):
+            continue
+        values = row.model_dump(exclude_none=True)
+        if "due_date" in values:
+            values["due_date"] = values["due_date"].isoformat()
+        entry = merged.setdefault(row.external_id, {"indexes": [], "values": {}})
+        entry["indexes"].append(index)
+        entry["values"].update(values)
+
+    now = datetime.now().isoformat()
+    outcomes = {}
+    transitioned = []
+    with transaction() as conn:
+        cursor = conn.cursor()
+        existing = {}
+        for task in _select_in(cursor, "SELECT id, external_id, product_id, actual_hours FROM tasks WHERE external_id IN ({ids})", merged):
+            existing.setdefault(task["external_id"], []).append(task)
+        products = {r["id"] for r in _select_in(
+            cursor, "SELECT id FROM products WHERE id IN ({ids})",
+            {entry["values"]["product_id"] for entry in merged.values()}
+        )}
+        positions = {r["id"] for r in _select_in(
+            cursor, "SELECT id FROM positions WHERE id IN ({ids})",
+            {entry["values"]["position_id"] for entry in merged.values() if "position_id" in entry["values"]}
+        )}
+
+        inserts = []
+        updates = []
+        started_products = set()
+        for external_id, entry in merged.items():
+            values = entry["values"]
+            matches = existing.get(external_id, [])
+            missing = [field for field in TASK_CREATE_REQUIRED if field not in values]
+            if values["product_id"] not in products:
+                outcomes[external_id] = ("error", None, "Product not found")
+            elif "position_id" in values and values["position_id"] not in positions:
+                outcomes[external_id] = ("error", None, "Position not found")
+            elif len(matches) > 1:
+                outcomes[external_id] = ("error", None, "external_id matches more than one task")
+            elif matches and matches[0]["product_id"] != values["product_id"]:
+                outcomes[external_id] = ("error", matches[0]["id"], f"external_id belongs to product {matches[0]['product_id']}")
+            elif not matches and missing:
+                outcomes[external_id] = ("error", None, f"Missing fields for a new task: {', '.join(missing)}")
+            elif matches:
+                updates.append([values.get(field) for field in TASK_UPSERT_FIELDS] + [now, matches[0]["id"]])
+                outcomes[external_id] = ("updated", matches[0]["id"], None)
+                if values.get("actual_hours", 0) > 0 and not matches[0]["actual_hours"]:
+                    started_products.add(values["product_id"])
+            else:
+                values.setdefault("status", "open")
+                inserts.append([values["product_id"], external_id] + [values.get(field) for field in TASK_UPSERT_FIELDS] + [now, now])
+                outcomes[external_id] = ("created", None, None)
+                if values.get("actual_hours", 0) > 0:
+                    started_products.add(values["product_id"])
+
+        with defer_cost_rollups(cursor):
+            cursor.executemany(TASK_BULK_INSERT_SQL, inserts)
+            cursor.executemany(TASK_BULK_UPDATE_SQL, updates)
+        refresh_cost_rollups(cursor, "product", {
+            merged[external_id]["values"]["product_id"]
+            for external_id, outcome in outcomes.items() if outcome[0] != "error"
+        })
+        created = [external_id for external_id, outcome in outcomes.items() if outcome[0] == "created"]
+        for task in _select_in(cursor, "SELECT id, external_id FROM tasks WHERE external_id IN ({ids})", created):
+            outcomes[task["external_id"]] = ("created", task["id"], None)
+
+        transitioned = [r["id"] for r in _select_in(
+            cursor, "SELECT id FROM products WHERE status = 'Approved' AND id IN ({ids})", started_products
+        )]
+        cursor.executemany(
+            "UPDATE products SET status = 'In Development', updated_at = ? WHERE id = ?",
+            [(now, product_id) for product_id in transitioned]
+        )
+    for product_id in transitioned:
+        logger.info(f"Product {product_id} auto-transitioned from 'Approved' to 'In Development' (first hours logged)")
+
+    results = []
+    reported = set()
+    for index, row in enumerate(rows):
+        if isinstance(row, str):
+            results.append({"index": index, "external_id": None, "action": "error", "id": None, "error": row})
+            continue
+        action, task_id, error = outcomes[row.external_id]
+        if action == "created" and row.external_id in reported:
+            action = "updated"
+        reported.add(row.external_id)
+        results.append({"index": index, "external_id": row.external_id, "action": action, "id": task_id, "error": error})
+    return {
+        "created": sum(1 for r in results if r["action"] == "created"),
+        "updated": sum(1 for r in results if r["action"] == "updated"),
+        "failed": sum(1 for r in results if r["action"] == "error"),
+        "transitioned_products": transitioned,
+        "results": results,
+    }
+
+def _parse_task_upsert(item) -> TaskUpsert | str:
+    try:
+        return TaskUpsert.model_validate(item)
+    except ValidationError as e:
+        return "; ".join(f"{'.'.join(str(loc) for loc in err['loc']) or 'row'}: {err['msg']}" for err in e.errors())
+
+async def _read_task_upserts(request: Request) -> list:
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        rows = []
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    rows.append(_parse_ndjson_line(line))
+            if len(rows) > settings.TASK_BULK_MAX_ROWS:
+                raise HTTPException(status_code=413, detail=f"At most {settings.TASK_BULK_MAX_ROWS} rows per request")
+        if buffer.strip():
+            rows.append(_parse_ndjson_line(buffer))
+        return rows
+
+    try:
+        items = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    return [_parse_task_upsert(item) for item in items]
+
+def _parse_ndjson_line(line: bytes) -> TaskUpsert | str:
+    try:
+        item = json.loads(line)
+    except ValueError:
+        return "Invalid JSON"
+    return _parse_task_upsert(item)
+
+@router.post("/api/tasks/bulk", response_model=dict)
+async def bulk_upsert_tasks(request: Request, _api_key: str = Depends(verify_api_key), _rate: str = Depends(rate_limit)):
+    """
+    Create or update many product tasks in one request, matched by
+    external_id. The body is a JSON array or NDJSON (Content-Type
+    application/x-ndjson); each row carries external_id and product_id, plus
+    name, position_id and estimated_hours when the task is new. Invalid rows
+    are reported in the per-row results without blocking the others. A new
+    task with actual_hours moves its Approved product to In Development,
+    which POST /api/products/{id}/tasks never does.
+    """
+    rows = await _read_task_upserts(request)
+    if len(rows) > settings.TASK_BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.TASK_BULK_MAX_ROWS} rows per request")
+    data = await run_in_threadpool(upsert_tasks, rows)
+    return {"success": True, "data": data, "error": None}
+
 @router.get("/api/calculator/{product_id}", response_model=dict)
 def calculate_product_cost(product_id: int):
     with get_connection() as conn:
@@ -465,30 +657,19 @@ def get_dashboard():
         product_rows = cursor.fetchall()
         
         cursor.execute("""
-            SELECT 
-                t.product_id,
-                SUM(t.estimated_hours * pos.hourly_cost_min) as cost_min,
-                SUM(t.estimated_hours * pos.hourly_cost_max) as cost_max,
-                SUM(t.estimated_hours) as total_estimated,
-                SUM(COALESCE(t.actual_hours, 0)) as total_actual,
-                SUM(COALESCE(t.actual_hours, 0) * pos.hourly_cost_min) as actual_cost_min,
-                SUM(COALESCE(t.actual_hours, 0) * pos.hourly_cost_max) as actual_cost_max
-            FROM tasks t
-            JOIN positions pos ON t.position_id = pos.id
-            GROUP BY t.product_id
+            SELECT
+                product_id,
+                labor_cost_min as cost_min,
+                labor_cost_max as cost_max,
+                estimated_hours as total_estimated,
+                actual_hours as total_actual,
+                actual_cost_min,
+                actual_cost_max,
+                software_cost
+            FROM product_cost_rollup
         """)
         task_costs = {row["product_id"]: dict(row) for row in cursor.fetchall()}
         
-        cursor.execute("""
-            SELECT 
-                a.product_id,
-                SUM(s.monthly_cost * a.allocation_percent / 100) as software_cost
-            FROM product_software_allocations a
-            JOIN software_costs s ON a.software_id = s.id
-            GROUP BY a.product_id
-        """)
-        software_costs = {row["product_id"]: row["software_cost"] for row in cursor.fetchall()}
-        
         cursor.execute("SELECT DISTINCT business_unit FROM products WHERE business_unit IS NOT NULL AND business_unit != ''")
         business_units = [row["business_unit"] for row in cursor.fetchall()]
         
@@ -522,34 +703,35 @@ def get_dashboard():
         total_value = 0
         roi_values = []
         
+        rows = []
         for prod in product_rows:
-            prod_id = prod["id"]
-            tc = task_costs.get(prod_id, {})
-            labor_cost_min = tc.get("cost_min") or 0
-            labor_cost_max = tc.get("cost_max") or 0
-            total_estimated_hours = tc.get("total_estimated") or 0
-            total_actual_hours = tc.get("total_actual") or 0
-            actual_labor_cost_min = tc.get("actual_cost_min") or 0
-            actual_labor_cost_max = tc.get("actual_cost_max") or 0
-            
-            software_cost = software_costs.get(prod_id, 0) or 0
-            
-            total_cost_min = labor_cost_min + software_cost
-            total_cost_max = labor_cost_max + software_cost
-            
-            hours_progress = calculate_hours_progress(total_actual_hours, total_estimated_hours)
-            hours_status = calculate_hours_status(total_actual_hours, total_estimated_hours)
-            
+            tc = task_costs.get(prod["id"], {})
+            software_cost = tc.get("software_cost") or 0
+            rows.append({
+                "labor_cost_min": tc.get("cost_min") or 0,
+                "labor_cost_max": tc.get("cost_max") or 0,
+                "actual_labor_cost_min": tc.get("actual_cost_min") or 0,
+                "actual_labor_cost_max": tc.get("actual_cost_max") or 0,
+                "software_cost": software_cost,
+                "total_cost_min": (tc.get("cost_min") or 0) + software_cost,
+                "total_cost_max": (tc.get("cost_max") or 0) + software_cost,
+                "estimated_hours": tc.get("total_estimated") or 0,
+                "actual_hours": tc.get("total_actual") or 0,
+            })
+        
+        metrics = calculate_portfolio_metrics(
+            [prod["estimated_value"] for prod in product_rows],
+            [row["total_cost_min"] for row in rows],
+            [row["total_cost_max"] for row in rows],
+            [row["actual_hours"] for row in rows],
+            [row["estimated_hours"] for row in rows],
+        )
+        
+        for i, (prod, row) in enumerate(zip(product_rows, rows)):
             estimated_value = prod["estimated_value"]
-            roi = calculate_roi(estimated_value, total_cost_min, total_cost_max)
-            
-            roi_mid = None
-            if roi["roi_low"] != float('inf') and roi["roi_high"] != float('inf'):
-                roi_mid = (roi["roi_low"] + roi["roi_high"]) / 2
-            elif roi["roi_low"] != float('inf'):
-                roi_mid = roi["roi_low"]
-            
-            health, recommendation = get_health_from_roi(roi_mid)
+            roi_low = metrics["roi_low"][i]
+            roi_high = metrics["roi_high"][i]
+            roi_mid = metrics["roi_mid"][i]
             
             requestor_type = prod["requestor_type"] if "requestor_type" in prod.keys() else None
             requestor_id = prod["requestor_id"] if "requestor_id" in prod.keys() else None
@@ -567,26 +749,18 @@ def get_dashboard():
                 "service_departments": all_depts,
                 "status": prod["status"],
                 "product_type": prod["product_type"],
-                "labor_cost_min": labor_cost_min,
-                "labor_cost_max": labor_cost_max,
-                "actual_labor_cost_min": actual_labor_cost_min,
-                "actual_labor_cost_max": actual_labor_cost_max,
-                "software_cost": software_cost,
-                "total_cost_min": total_cost_min,
-                "total_cost_max": total_cost_max,
-                "estimated_hours": total_estimated_hours,
-                "actual_hours": total_actual_hours,
-                "hours_progress": hours_progress,
-                "hours_status": hours_status,
+                **row,
+                "hours_progress": metrics["hours_progress"][i],
+                "hours_status": metrics["hours_status"][i],
                 "estimated_value": estimated_value,
-                "roi_low": roi["roi_low"] if roi["roi_low"] != float('inf') else None,
-                "roi_high": roi["roi_high"] if roi["roi_high"] != float('inf') else None,
-                "health": health,
-                "recommendation": recommendation
+                "roi_low": roi_low if roi_low != float('inf') else None,
+                "roi_high": roi_high if roi_high != float('inf') else None,
+                "health": metrics["health"][i],
+                "recommendation": metrics["recommendation"][i]
             })
             
-            total_investment_min += total_cost_min
-            total_investment_max += total_cost_max
+            total_investment_min += row["total_cost_min"]
+            total_investment_max += row["total_cost_max"]
             total_value += estimated_value
             if roi_mid is not None:
                 roi_values.append(roi_mid)
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
 from database import get_connection
+from services.pagination import PageParams, list_rows
 
 router = APIRouter(prefix="/api/knowledge", tags=["knowledge"])
 
@@ -27,12 +28,12 @@ def row_to_knowledge(row) -> dict:
     }
 
 @router.get("", response_model=dict)
-def list_knowledge():
+def list_knowledge(page: PageParams = Depends()):
     with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM knowledge_base ORDER BY updated_at DESC")
-        rows = cursor.fetchall()
-        items = [row_to_knowledge(row) for row in rows]
+        items = list_rows(
+            conn.cursor(), "SELECT * FROM knowledge_base",
+            [("updated_at", "updated_at", True, ""), ("id", "id", False)], row_to_knowledge, page
+        )
     return {"success": True, "data": items, "error": None}
 
 @router.get("/categories", response_model=dict)
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Literal, Optional
 from datetime import datetime
-import csv
-import io
 from models.position import Position, PositionCreate, PositionUpdate
 from database import get_connection
+from services.pagination import PageParams, list_rows
+from services.csv_import import CsvFormatError, import_csv
 from services.webhook_service import send_position_webhook
 import logging
 
@@ -24,12 +25,13 @@ def row_to_position(row) -> dict:
     }
 
 @router.get("", response_model=dict)
-def list_positions():
+def list_positions(page: PageParams = Depends(), department: Optional[str] = None):
     with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM positions ORDER BY title")
-        rows = cursor.fetchall()
-        positions = [row_to_position(row) for row in rows]
+        positions = list_rows(
+            conn.cursor(), "SELECT * FROM positions",
+            [("title", "title", False), ("id", "id", False)], row_to_position, page,
+            filters={"department": department}
+        )
     return {"success": True, "data": positions, "error": None}
 
 @router.get("/{position_id}", response_model=dict)
@@ -43,7 +45,7 @@ def get_position(position_id: int):
     return {"success": True, "data": row_to_position(row), "error": None}
 
 @router.post("", response_model=dict, status_code=201)
-async def create_position(position: PositionCreate, background_tasks: BackgroundTasks):
+async def create_position(position: PositionCreate):
     now = datetime.now().isoformat()
     with get_connection() as conn:
         cursor = conn.cursor()
@@ -63,8 +65,7 @@ async def create_position(position: PositionCreate, background_tasks: Background
 
     result = row_to_position(row)
     if dept_id:
-        background_tasks.add_task(
-            _send_position_webhook_async,
+        await _send_position_webhook_async(
             position_id,
             result["title"],
             dept_id,
@@ -73,7 +74,7 @@ async def create_position(position: PositionCreate, background_tasks: Background
     return {"success": True, "data": result, "error": None}
 
 @router.put("/{position_id}", response_model=dict)
-async def update_position(position_id: int, position: PositionUpdate, background_tasks: BackgroundTasks):
+async def update_position(position_id: int, position: PositionUpdate):
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM positions WHERE id = ?", (position_id,))
@@ -107,8 +108,7 @@ async def update_position(position_id: int, position: PositionUpdate, background
 
     result = row_to_position(row)
     if dept_id:
-        background_tasks.add_task(
-            _send_position_webhook_async,
+        await _send_position_webhook_async(
             position_id,
             result["title"],
             dept_id,
@@ -134,75 +134,42 @@ def delete_position(position_id: int):
         conn.commit()
     return {"success": True, "data": {"deleted": position_id}, "error": None}
 
+def parse_position_csv_row(row: dict, field_map: dict):
+    title = row[field_map.get('title', '')].strip()
+    department = row[field_map.get('department', '')].strip()
+    min_str = row[field_map.get('hourly_cost_min', '')].strip()
+    max_str = row[field_map.get('hourly_cost_max', '')].strip()
+    min_str = min_str.replace('$', '').replace(',', '')
+    max_str = max_str.replace('$', '').replace(',', '')
+    hourly_cost_min = float(min_str)
+    hourly_cost_max = float(max_str)
+    
+    if not title or not department:
+        return "Missing required field"
+    
+    if hourly_cost_max < hourly_cost_min:
+        return "Max cost must be >= min cost"
+    
+    return {"title": title, "department": department, "hourly_cost_min": hourly_cost_min, "hourly_cost_max": hourly_cost_max}
+
+POSITIONS_CSV_IMPORT = {
+    "table": "positions",
+    "key": "title",
+    "columns": ["title", "department", "hourly_cost_min", "hourly_cost_max"],
+    "required": {'title', 'department', 'hourly_cost_min', 'hourly_cost_max'},
+    "header_error": "CSV must have columns: Title, Department, Hourly Cost Min, Hourly Cost Max",
+    "parse_row": parse_position_csv_row,
+}
+
 @router.post("/upload-csv", response_model=dict)
-async def upload_positions_csv(file: UploadFile = File(...)):
+async def upload_positions_csv(file: UploadFile = File(...), mode: Literal["insert", "upsert"] = "insert"):
+    """mode=upsert updates positions whose title already exists instead of adding a duplicate."""
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="File must be a CSV")
     
-    content = await file.read()
     try:
-        decoded = content.decode('utf-8-sig')
-    except UnicodeDecodeError:
-        decoded = content.decode('latin-1')
-    
-    reader = csv.DictReader(io.StringIO(decoded))
-    
-    def normalize(s):
-        return s.lower().strip().replace(' ', '_')
-    
-    required_fields = {'title', 'department', 'hourly_cost_min', 'hourly_cost_max'}
-    fieldnames_normalized = set(normalize(f) for f in reader.fieldnames)
-    if not required_fields.issubset(fieldnames_normalized):
-        raise HTTPException(
-            status_code=400, 
-            detail=f"CSV must have columns: Title, Department, Hourly Cost Min, Hourly Cost Max"
-        )
-    
-    field_map = {normalize(f): f for f in reader.fieldnames}
-    
-    now = datetime.now().isoformat()
-    created = []
-    errors = []
-    
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        for i, row in enumerate(reader, start=2):
-            try:
-                title = row[field_map.get('title', '')].strip()
-                department = row[field_map.get('department', '')].strip()
-                min_str = row[field_map.get('hourly_cost_min', '')].strip()
-                max_str = row[field_map.get('hourly_cost_max', '')].strip()
-                min_str = min_str.replace('$', '').replace(',', '')
-                max_str = max_str.replace('$', '').replace(',', '')
-                hourly_cost_min = float(min_str)
-                hourly_cost_max = float(max_str)
-                
-                if not title or not department:
-                    errors.append(f"Row {i}: Missing required field")
-                    continue
-                
-                if hourly_cost_max < hourly_cost_min:
-                    errors.append(f"Row {i}: Max cost must be >= min cost")
-                    continue
-                
-                cursor.execute(
-                    """INSERT INTO positions (title, department, hourly_cost_min, hourly_cost_max, created_at, updated_at)
-                       VALUES (?, ?, ?, ?, ?, ?)""",
-                    (title, department, hourly_cost_min, hourly_cost_max, now, now)
-                )
-                created.append({"title": title, "department": department, "hourly_cost_min": hourly_cost_min, "hourly_cost_max": hourly_cost_max})
-            except (ValueError, KeyError) as e:
-                errors.append(f"Row {i}: {str(e)}")
-        
-        conn.commit()
+        data = await run_in_threadpool(import_csv, file.file, POSITIONS_CSV_IMPORT, mode == "upsert")
+    except CsvFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return {
-        "success": True,
-        "data": {
-            "created_count": len(created),
-            "created": created,
-            "error_count": len(errors),
-            "errors": errors
-        },
-        "error": None
-    }
+    return {"success": True, "data": data, "error": None}
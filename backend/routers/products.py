@@ -1,20 +1,25 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends
+from typing import Optional
 from datetime import datetime
 from models.product import Product, ProductCreate, ProductUpdate, ProductDocumentUpdate, ProductDocument
 from database import get_connection
 from services.webhook_service import send_product_webhook
+from services.pagination import PageParams, list_rows
+from services.product_documents import DOC_TYPES, DOCUMENT_SUMMARY_SQL, parse_summary, read_document, write_document
 import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
-VALID_DOC_TYPES = ['raw-valuation-output', 'user-flow', 'specifications', 'persona-feedback']
-DOC_TYPE_MAP = {
-    'raw-valuation-output': ('raw_valuation_output', 'raw_valuation_output_updated_at'),
-    'user-flow': ('user_flow', 'user_flow_updated_at'),
-    'specifications': ('specifications', 'specifications_updated_at'),
-    'persona-feedback': ('persona_feedback', 'persona_feedback_updated_at'),
-}
+VALID_DOC_TYPES = DOC_TYPES
+
+PRODUCT_SELECT_SQL = f"""SELECT p.*, sd.name as requestor_department_name, {DOCUMENT_SUMMARY_SQL}
+            FROM products p
+            LEFT JOIN service_departments sd ON p.requestor_type = 'service_department' AND p.requestor_id = sd.id"""
+
+# Products a department is assigned to, lead or supporting, by department name.
+DEPARTMENT_FILTER_SQL = """EXISTS (SELECT 1 FROM product_service_departments psd
+            JOIN service_departments d ON d.id = psd.department_id WHERE psd.product_id = p.id AND d.name = ?)"""
 
 router = APIRouter(prefix="/api/products", tags=["products"])
 
@@ -40,14 +45,7 @@ def row_to_product(row) -> dict:
         "fee_percent": row["fee_percent"] if "fee_percent" in keys else 0,
         "created_at": row["created_at"],
         "updated_at": row["updated_at"],
-        "raw_valuation_output": row["raw_valuation_output"] if "raw_valuation_output" in keys else None,
-        "raw_valuation_output_updated_at": row["raw_valuation_output_updated_at"] if "raw_valuation_output_updated_at" in keys else None,
-        "user_flow": row["user_flow"] if "user_flow" in keys else None,
-        "user_flow_updated_at": row["user_flow_updated_at"] if "user_flow_updated_at" in keys else None,
-        "specifications": row["specifications"] if "specifications" in keys else None,
-        "specifications_updated_at": row["specifications_updated_at"] if "specifications_updated_at" in keys else None,
-        "persona_feedback": row["persona_feedback"] if "persona_feedback" in keys else None,
-        "persona_feedback_updated_at": row["persona_feedback_updated_at"] if "persona_feedback_updated_at" in keys else None,
+        "documents": parse_summary(row["documents_json"]) if "documents_json" in keys else {},
         "valuation_complete": bool(row["valuation_complete"]) if "valuation_complete" in keys and row["valuation_complete"] else False,
         "valuation_type": row["valuation_type"] if "valuation_type" in keys else None,
         "valuation_confidence": row["valuation_confidence"] if "valuation_confidence" in keys else "Low",
@@ -55,33 +53,33 @@ def row_to_product(row) -> dict:
     }
 
 @router.get("", response_model=dict)
-def list_products():
+def list_products(
+    page: PageParams = Depends(),
+    status: Optional[str] = None,
+    business_unit: Optional[str] = None,
+    department: Optional[str] = None,
+):
+    def to_product(row):
+        product = row_to_product(row)
+        product["requestor_name"] = row["requestor_department_name"] if row["requestor_type"] == "service_department" else row["business_unit"]
+        return product
+
     with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT p.*, sd.name as requestor_department_name
-            FROM products p
-            LEFT JOIN service_departments sd ON p.requestor_type = 'service_department' AND p.requestor_id = sd.id
-            ORDER BY p.created_at DESC
-        """)
-        rows = cursor.fetchall()
-        products = []
-        for row in rows:
-            product = row_to_product(row)
-            product["requestor_name"] = row["requestor_department_name"] if row["requestor_type"] == "service_department" else row["business_unit"]
-            products.append(product)
+        products = list_rows(
+            conn.cursor(),
+            PRODUCT_SELECT_SQL,
+            [("p.created_at", "created_at", True, ""), ("p.id", "id", False)],
+            to_product,
+            page,
+            filters={"p.status": status, "p.business_unit": business_unit, DEPARTMENT_FILTER_SQL: department},
+        )
     return {"success": True, "data": products, "error": None}
 
 @router.get("/{product_id}", response_model=dict)
 def get_product(product_id: int):
     with get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT p.*, sd.name as requestor_department_name
-            FROM products p
-            LEFT JOIN service_departments sd ON p.requestor_type = 'service_department' AND p.requestor_id = sd.id
-            WHERE p.id = ?
-        """, (product_id,))
+        cursor.execute(PRODUCT_SELECT_SQL + " WHERE p.id = ?", (product_id,))
         row = cursor.fetchone()
     if not row:
         raise HTTPException(status_code=404, detail="Product not found")
@@ -104,19 +102,14 @@ def create_product(product: ProductCreate):
         )
         conn.commit()
         product_id = cursor.lastrowid
-        cursor.execute("""
-            SELECT p.*, sd.name as requestor_department_name
-            FROM products p
-            LEFT JOIN service_departments sd ON p.requestor_type = 'service_department' AND p.requestor_id = sd.id
-            WHERE p.id = ?
-        """, (product_id,))
+        cursor.execute(PRODUCT_SELECT_SQL + " WHERE p.id = ?", (product_id,))
         row = cursor.fetchone()
     result = row_to_product(row)
     result["requestor_name"] = row["requestor_department_name"] if row["requestor_type"] == "service_department" else row["business_unit"]
     return {"success": True, "data": result, "error": None}
 
 @router.put("/{product_id}", response_model=dict)
-async def update_product(product_id: int, product: ProductUpdate, background_tasks: BackgroundTasks):
+async def update_product(product_id: int, product: ProductUpdate):
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
@@ -163,12 +156,7 @@ async def update_product(product_id: int, product: ProductUpdate, background_tas
             cursor.execute(f"UPDATE products SET {set_clause} WHERE id = ?", values)
             conn.commit()
 
-        cursor.execute("""
-            SELECT p.*, sd.name as requestor_department_name
-            FROM products p
-            LEFT JOIN service_departments sd ON p.requestor_type = 'service_department' AND p.requestor_id = sd.id
-            WHERE p.id = ?
-        """, (product_id,))
+        cursor.execute(PRODUCT_SELECT_SQL + " WHERE p.id = ?", (product_id,))
         row = cursor.fetchone()
 
     result = row_to_product(row)
@@ -177,8 +165,7 @@ async def update_product(product_id: int, product: ProductUpdate, background_tas
     new_status = result["status"]
     if old_status != "Approved" and new_status == "Approved":
         logger.info(f"Product {product_id} moved to 'Approved', triggering TF webhook")
-        background_tasks.add_task(
-            _send_webhook_async,
+        await _send_webhook_async(
             product_id,
             result["name"],
             result["description"],
@@ -210,19 +197,15 @@ def get_document(product_id: int, doc_type: str):
     if doc_type not in VALID_DOC_TYPES:
         raise HTTPException(status_code=400, detail=f"Invalid doc_type. Must be one of: {VALID_DOC_TYPES}")
     
-    content_col, updated_col = DOC_TYPE_MAP[doc_type]
-    
     with get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
+        cursor.execute("SELECT valuation_complete FROM products WHERE id = ?", (product_id,))
         row = cursor.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Product not found")
         
-        keys = row.keys()
-        valuation_complete = bool(row["valuation_complete"]) if "valuation_complete" in keys and row["valuation_complete"] else False
-        content = row[content_col] if content_col in keys else None
-        updated_at = row[updated_col] if updated_col in keys else None
+        valuation_complete = bool(row["valuation_complete"])
+        document = read_document(cursor, product_id, doc_type) or {"content": None, "updated_at": None}
         
         locked = False
         lock_reason = None
@@ -233,8 +216,8 @@ def get_document(product_id: int, doc_type: str):
     return {
         "success": True,
         "data": {
-            "content": content,
-            "updated_at": updated_at,
+            "content": document["content"],
+            "updated_at": document["updated_at"],
             "locked": locked,
             "lock_reason": lock_reason
         },
@@ -246,46 +229,35 @@ def update_document(product_id: int, doc_type: str, data: ProductDocumentUpdate)
     if doc_type not in VALID_DOC_TYPES:
         raise HTTPException(status_code=400, detail=f"Invalid doc_type. Must be one of: {VALID_DOC_TYPES}")
     
-    content_col, updated_col = DOC_TYPE_MAP[doc_type]
-    
     with get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
+        cursor.execute("SELECT valuation_complete FROM products WHERE id = ?", (product_id,))
         row = cursor.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Product not found")
         
-        keys = row.keys()
-        valuation_complete = bool(row["valuation_complete"]) if "valuation_complete" in keys and row["valuation_complete"] else False
+        valuation_complete = bool(row["valuation_complete"])
         
         if doc_type != 'raw-valuation-output' and not valuation_complete:
             raise HTTPException(status_code=403, detail="Complete Raw Valuation Output first")
         
         now = datetime.now().isoformat()
         
+        write_document(cursor, product_id, doc_type, data.content, now)
         if doc_type == 'raw-valuation-output' and data.content and data.content.strip():
             cursor.execute(
-                f"UPDATE products SET {content_col} = ?, {updated_col} = ?, valuation_complete = 1, updated_at = ? WHERE id = ?",
-                (data.content, now, now, product_id)
+                "UPDATE products SET valuation_complete = 1, updated_at = ? WHERE id = ?",
+                (now, product_id)
             )
         else:
-            cursor.execute(
-                f"UPDATE products SET {content_col} = ?, {updated_col} = ?, updated_at = ? WHERE id = ?",
-                (data.content, now, now, product_id)
-            )
+            cursor.execute("UPDATE products SET updated_at = ? WHERE id = ?", (now, product_id))
         conn.commit()
-        
-        cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
-        row = cursor.fetchone()
-        keys = row.keys()
-        content = row[content_col] if content_col in keys else None
-        updated_at = row[updated_col] if updated_col in keys else None
     
     return {
         "success": True,
         "data": {
-            "content": content,
-            "updated_at": updated_at,
+            "content": data.content,
+            "updated_at": now,
             "locked": False,
             "lock_reason": None
         },
@@ -1,19 +1,10 @@
 from fastapi import APIRouter, HTTPException
 from datetime import datetime, timedelta
 from database import get_connection
+from services.report_rollups import get_hours_status, load_entity_rollups, load_position_rollups, empty_rollup
 
 router = APIRouter(tags=["reports"])
 
-def get_hours_status(actual, estimated):
-    if actual == 0:
-        return "not_started"
-    elif actual < estimated * 0.9:
-        return "under"
-    elif actual <= estimated * 1.1:
-        return "on_track"
-    else:
-        return "over"
-
 @router.get("/api/reports/products", response_model=dict)
 def get_products_report(period: str = "30"):
     days = 7 if period == "7" else 30
@@ -31,6 +22,8 @@ def get_products_report(period: str = "30"):
         """)
         product_rows = cursor.fetchall()
         
+        rollups = load_entity_rollups(cursor, "product")
+        
         products = []
         total_estimated_hours = 0
         total_actual_hours = 0
@@ -38,59 +31,7 @@ def get_products_report(period: str = "30"):
         total_overhead_max = 0
         
         for prod in product_rows:
-            cursor.execute("""
-                SELECT 
-                    SUM(t.estimated_hours) as total_estimated,
-                    SUM(COALESCE(t.actual_hours, 0)) as total_actual,
-                    SUM(t.estimated_hours * p.hourly_cost_min) as cost_min,
-                    SUM(t.estimated_hours * p.hourly_cost_max) as cost_max
-                FROM tasks t
-                JOIN positions p ON t.position_id = p.id
-                WHERE t.product_id = ?
-            """, (prod["id"],))
-            task_row = cursor.fetchone()
-            
-            estimated = task_row["total_estimated"] or 0
-            actual = task_row["total_actual"] or 0
-            cost_min = task_row["cost_min"] or 0
-            cost_max = task_row["cost_max"] or 0
-            
-            cursor.execute("""
-                SELECT SUM(s.monthly_cost * a.allocation_percent / 100) as software_cost
-                FROM product_software_allocations a
-                JOIN software_costs s ON a.software_id = s.id
-                WHERE a.product_id = ?
-            """, (prod["id"],))
-            sw_row = cursor.fetchone()
-            software_cost = sw_row["software_cost"] or 0
-            
-            overhead_min = cost_min + software_cost
-            overhead_max = cost_max + software_cost
-            
-            progress = (actual / estimated * 100) if estimated > 0 else 0
-            status = get_hours_status(actual, estimated)
-            
-            cursor.execute("""
-                SELECT t.name, t.estimated_hours, COALESCE(t.actual_hours, 0) as actual_hours, 
-                       p.title as position_title
-                FROM tasks t
-                JOIN positions p ON t.position_id = p.id
-                WHERE t.product_id = ?
-                ORDER BY t.estimated_hours DESC
-            """, (prod["id"],))
-            task_details = []
-            for t in cursor.fetchall():
-                t_progress = (t["actual_hours"] / t["estimated_hours"] * 100) if t["estimated_hours"] > 0 else 0
-                t_status = get_hours_status(t["actual_hours"], t["estimated_hours"])
-                task_details.append({
-                    "name": t["name"],
-                    "position_title": t["position_title"],
-                    "estimated_hours": t["estimated_hours"],
-                    "actual_hours": t["actual_hours"],
-                    "progress": round(t_progress, 1),
-                    "status": t_status
-                })
-            
+            rollup = rollups.get(prod["id"]) or empty_rollup()
             requestor = prod["requestor_department_name"] if prod["requestor_type"] == "service_department" else prod["business_unit"]
             
             products.append({
@@ -99,44 +40,21 @@ def get_products_report(period: str = "30"):
                 "status": prod["status"],
                 "requestor": requestor,
                 "business_unit": prod["business_unit"],
-                "estimated_hours": estimated,
-                "actual_hours": actual,
-                "progress": round(progress, 1),
-                "hours_status": status,
-                "overhead_min": overhead_min,
-                "overhead_max": overhead_max,
-                "tasks": task_details
+                "estimated_hours": rollup["estimated_hours"],
+                "actual_hours": rollup["actual_hours"],
+                "progress": rollup["progress"],
+                "hours_status": rollup["hours_status"],
+                "overhead_min": rollup["overhead_min"],
+                "overhead_max": rollup["overhead_max"],
+                "tasks": rollup["tasks"]
             })
             
-            total_estimated_hours += estimated
-            total_actual_hours += actual
-            total_overhead_min += overhead_min
-            total_overhead_max += overhead_max
+            total_estimated_hours += rollup["estimated_hours"]
+            total_actual_hours += rollup["actual_hours"]
+            total_overhead_min += rollup["overhead_min"]
+            total_overhead_max += rollup["overhead_max"]
         
-        cursor.execute("""
-            SELECT p.title, 
-                   SUM(t.estimated_hours) as estimated,
-                   SUM(COALESCE(t.actual_hours, 0)) as actual
-            FROM tasks t
-            JOIN positions p ON t.position_id = p.id
-            JOIN products pr ON t.product_id = pr.id
-            WHERE pr.status IN ('Ideation', 'Approved', 'In Development')
-            GROUP BY p.id, p.title
-            ORDER BY estimated DESC
-        """)
-        position_rows = cursor.fetchall()
-        by_position = []
-        for pos in position_rows:
-            est = pos["estimated"] or 0
-            act = pos["actual"] or 0
-            prog = (act / est * 100) if est > 0 else 0
-            by_position.append({
-                "position_title": pos["title"],
-                "estimated_hours": est,
-                "actual_hours": act,
-                "progress": round(prog, 1),
-                "status": get_hours_status(act, est)
-            })
+        by_position = load_position_rollups(cursor, "product")
         
         overall_progress = (total_actual_hours / total_estimated_hours * 100) if total_estimated_hours > 0 else 0
         
@@ -176,6 +94,8 @@ def get_services_report(period: str = "30"):
         """)
         service_rows = cursor.fetchall()
         
+        rollups = load_entity_rollups(cursor, "service")
+        
         services = []
         total_estimated_hours = 0
         total_actual_hours = 0
@@ -185,34 +105,9 @@ def get_services_report(period: str = "30"):
         total_with_fees_max = 0
         
         for svc in service_rows:
-            cursor.execute("""
-                SELECT 
-                    SUM(t.estimated_hours) as total_estimated,
-                    SUM(COALESCE(t.actual_hours, 0)) as total_actual,
-                    SUM(t.estimated_hours * p.hourly_cost_min) as cost_min,
-                    SUM(t.estimated_hours * p.hourly_cost_max) as cost_max
-                FROM service_tasks t
-                JOIN positions p ON t.position_id = p.id
-                WHERE t.service_id = ?
-            """, (svc["id"],))
-            task_row = cursor.fetchone()
-            
-            estimated = task_row["total_estimated"] or 0
-            actual = task_row["total_actual"] or 0
-            cost_min = task_row["cost_min"] or 0
-            cost_max = task_row["cost_max"] or 0
-            
-            cursor.execute("""
-                SELECT SUM(sc.monthly_cost * a.allocation_percent / 100) as software_cost
-                FROM service_software_allocations a
-                JOIN software_costs sc ON a.software_id = sc.id
-                WHERE a.service_id = ?
-            """, (svc["id"],))
-            sw_row = cursor.fetchone()
-            software_cost = sw_row["software_cost"] or 0
-            
-            overhead_min = cost_min + software_cost
-            overhead_max = cost_max + software_cost
+            rollup = rollups.get(svc["id"]) or empty_rollup()
+            overhead_min = rollup["overhead_min"]
+            overhead_max = rollup["overhead_max"]
             
             fee_percent = svc["fee_percent"] or 0
             fee_min = overhead_min * fee_percent / 100
@@ -220,32 +115,6 @@ def get_services_report(period: str = "30"):
             total_min = overhead_min + fee_min
             total_max = overhead_max + fee_max
             
-            progress = (actual / estimated * 100) if estimated > 0 else 0
-            status = get_hours_status(actual, estimated)
-            
-            cursor.execute("""
-                SELECT t.name, t.estimated_hours, COALESCE(t.actual_hours, 0) as actual_hours, 
-                       t.is_recurring, t.recurrence_type, p.title as position_title
-                FROM service_tasks t
-                JOIN positions p ON t.position_id = p.id
-                WHERE t.service_id = ?
-                ORDER BY t.estimated_hours DESC
-            """, (svc["id"],))
-            task_details = []
-            for t in cursor.fetchall():
-                t_progress = (t["actual_hours"] / t["estimated_hours"] * 100) if t["estimated_hours"] > 0 else 0
-                t_status = get_hours_status(t["actual_hours"], t["estimated_hours"])
-                task_details.append({
-                    "name": t["name"],
-                    "position_title": t["position_title"],
-                    "estimated_hours": t["estimated_hours"],
-                    "actual_hours": t["actual_hours"],
-                    "progress": round(t_progress, 1),
-                    "status": t_status,
-                    "is_recurring": bool(t["is_recurring"]),
-                    "recurrence_type": t["recurrence_type"]
-                })
-            
             services.append({
                 "id": svc["id"],
                 "name": svc["name"],
@@ -253,49 +122,26 @@ def get_services_report(period: str = "30"):
                 "business_unit": svc["business_unit"],
                 "service_type_name": svc["service_type_name"],
                 "status": svc["status"],
-                "estimated_hours": estimated,
-                "actual_hours": actual,
-                "progress": round(progress, 1),
-                "hours_status": status,
+                "estimated_hours": rollup["estimated_hours"],
+                "actual_hours": rollup["actual_hours"],
+                "progress": rollup["progress"],
+                "hours_status": rollup["hours_status"],
                 "overhead_min": overhead_min,
                 "overhead_max": overhead_max,
                 "fee_percent": fee_percent,
                 "total_min": total_min,
                 "total_max": total_max,
-                "tasks": task_details
+                "tasks": rollup["tasks"]
             })
             
-            total_estimated_hours += estimated
-            total_actual_hours += actual
+            total_estimated_hours += rollup["estimated_hours"]
+            total_actual_hours += rollup["actual_hours"]
             total_overhead_min += overhead_min
             total_overhead_max += overhead_max
             total_with_fees_min += total_min
             total_with_fees_max += total_max
         
-        cursor.execute("""
-            SELECT p.title, 
-                   SUM(t.estimated_hours) as estimated,
-                   SUM(COALESCE(t.actual_hours, 0)) as actual
-            FROM service_tasks t
-            JOIN positions p ON t.position_id = p.id
-            JOIN services s ON t.service_id = s.id
-            WHERE s.status = 'Active'
-            GROUP BY p.id, p.title
-            ORDER BY estimated DESC
-        """)
-        position_rows = cursor.fetchall()
-        by_position = []
-        for pos in position_rows:
-            est = pos["estimated"] or 0
-            act = pos["actual"] or 0
-            prog = (act / est * 100) if est > 0 else 0
-            by_position.append({
-                "position_title": pos["title"],
-                "estimated_hours": est,
-                "actual_hours": act,
-                "progress": round(prog, 1),
-                "status": get_hours_status(act, est)
-            })
+        by_position = load_position_rollups(cursor, "service")
         
         overall_progress = (total_actual_hours / total_estimated_hours * 100) if total_estimated_hours > 0 else 0
         
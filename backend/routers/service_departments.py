@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException
 from datetime import datetime
 from models.service_department import (
     ServiceDepartment, ServiceDepartmentCreate, ServiceDepartmentUpdate,
@@ -59,7 +59,7 @@ def get_service_department_stats():
     return {"success": True, "data": stats, "error": None}
 
 @router.post("", response_model=dict, status_code=201)
-async def create_service_department(dept: ServiceDepartmentCreate, background_tasks: BackgroundTasks):
+async def create_service_department(dept: ServiceDepartmentCreate):
     now = datetime.now().isoformat()
     with get_connection() as conn:
         cursor = conn.cursor()
@@ -79,8 +79,7 @@ async def create_service_department(dept: ServiceDepartmentCreate, background_ta
             raise
 
     result = row_to_dept(row)
-    background_tasks.add_task(
-        _send_department_webhook_async,
+    await _send_department_webhook_async(
         dept_id,
         result["name"],
         "department.created",
@@ -90,7 +89,7 @@ async def create_service_department(dept: ServiceDepartmentCreate, background_ta
     return {"success": True, "data": result, "error": None}
 
 @router.put("/{dept_id}", response_model=dict)
-async def update_service_department(dept_id: int, dept: ServiceDepartmentUpdate, background_tasks: BackgroundTasks):
+async def update_service_department(dept_id: int, dept: ServiceDepartmentUpdate):
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM service_departments WHERE id = ?", (dept_id,))
@@ -123,8 +122,7 @@ async def update_service_department(dept_id: int, dept: ServiceDepartmentUpdate,
         positions = [{"id": p["id"], "name": p["title"]} for p in cursor.fetchall()]
 
     result = row_to_dept(row)
-    background_tasks.add_task(
-        _send_department_webhook_async,
+    await _send_department_webhook_async(
         dept_id,
         result["name"],
         "department.updated",
@@ -1,5 +1,6 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends
 from datetime import datetime
+from typing import Optional
 from models.service import (
     ServiceType, ServiceTypeCreate, ServiceTypeUpdate,
     Service, ServiceCreate, ServiceUpdate,
@@ -15,6 +16,7 @@ from services.calculation_service import (
     process_task_row
 )
 from services.webhook_service import send_service_webhook
+from services.pagination import PageParams, list_rows
 import logging
 
 logger = logging.getLogger(__name__)
@@ -127,32 +129,38 @@ def delete_service_type(st_id: int):
     return {"success": True, "data": {"deleted": st_id}, "error": None}
 
 @router.get("/api/services", response_model=dict)
-def list_services():
+def list_services(
+    page: PageParams = Depends(),
+    status: Optional[str] = None,
+    business_unit: Optional[str] = None,
+    department: Optional[str] = None,
+):
     with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT s.*, sd.name as department_name, st.name as service_type_name, st.is_recurring as type_is_recurring
-            FROM services s
-            JOIN service_departments sd ON s.service_department_id = sd.id
-            JOIN service_types st ON s.service_type_id = st.id
-            ORDER BY s.created_at DESC
-        """)
-        rows = cursor.fetchall()
-        data = [{
-            "id": r["id"],
-            "name": r["name"],
-            "description": r["description"],
-            "service_department_id": r["service_department_id"],
-            "department_name": r["department_name"],
-            "business_unit": r["business_unit"],
-            "service_type_id": r["service_type_id"],
-            "service_type_name": r["service_type_name"],
-            "type_is_recurring": bool(r["type_is_recurring"]),
-            "status": r["status"],
-            "fee_percent": r["fee_percent"],
-            "created_at": r["created_at"],
-            "updated_at": r["updated_at"]
-        } for r in rows]
+        data = list_rows(
+            conn.cursor(),
+            """SELECT s.*, sd.name as department_name, st.name as service_type_name, st.is_recurring as type_is_recurring
+               FROM services s
+               JOIN service_departments sd ON s.service_department_id = sd.id
+               JOIN service_types st ON s.service_type_id = st.id""",
+            [("s.created_at", "created_at", True, ""), ("s.id", "id", False)],
+            lambda r: {
+                "id": r["id"],
+                "name": r["name"],
+                "description": r["description"],
+                "service_department_id": r["service_department_id"],
+                "department_name": r["department_name"],
+                "business_unit": r["business_unit"],
+                "service_type_id": r["service_type_id"],
+                "service_type_name": r["service_type_name"],
+                "type_is_recurring": bool(r["type_is_recurring"]),
+                "status": r["status"],
+                "fee_percent": r["fee_percent"],
+                "created_at": r["created_at"],
+                "updated_at": r["updated_at"]
+            },
+            page,
+            filters={"s.status": status, "s.business_unit": business_unit, "sd.name": department},
+        )
     return {"success": True, "data": data, "error": None}
 
 async def _send_service_webhook_async(service_id, name, description, department_name, business_unit):
@@ -162,7 +170,7 @@ async def _send_service_webhook_async(service_id, name, description, department_
 
 
 @router.post("/api/services", response_model=dict, status_code=201)
-async def create_service(service: ServiceCreate, background_tasks: BackgroundTasks):
+async def create_service(service: ServiceCreate):
     with get_connection() as conn:
         cursor = conn.cursor()
 
@@ -195,8 +203,7 @@ async def create_service(service: ServiceCreate, background_tasks: BackgroundTas
         row = cursor.fetchone()
 
     logger.info(f"Service {service_id} created, triggering TF webhook")
-    background_tasks.add_task(
-        _send_service_webhook_async,
+    await _send_service_webhook_async(
         service_id,
         service.name,
         service.description,
@@ -729,28 +736,17 @@ def get_services_dashboard():
         service_rows = cursor.fetchall()
         
         cursor.execute("""
-            SELECT 
-                t.service_id,
-                SUM(t.estimated_hours * p.hourly_cost_min) as cost_min,
-                SUM(t.estimated_hours * p.hourly_cost_max) as cost_max,
-                SUM(t.estimated_hours) as total_estimated,
-                SUM(COALESCE(t.actual_hours, 0)) as total_actual
-            FROM service_tasks t
-            JOIN positions p ON t.position_id = p.id
-            GROUP BY t.service_id
+            SELECT
+                service_id,
+                labor_cost_min as cost_min,
+                labor_cost_max as cost_max,
+                estimated_hours as total_estimated,
+                actual_hours as total_actual,
+                software_cost
+            FROM service_cost_rollup
         """)
         task_costs = {row["service_id"]: dict(row) for row in cursor.fetchall()}
         
-        cursor.execute("""
-            SELECT 
-                a.service_id,
-                SUM(sc.monthly_cost * a.allocation_percent / 100) as software_cost
-            FROM service_software_allocations a
-            JOIN software_costs sc ON a.software_id = sc.id
-            GROUP BY a.service_id
-        """)
-        software_costs = {row["service_id"]: row["software_cost"] for row in cursor.fetchall()}
-        
         cursor.execute("SELECT DISTINCT business_unit FROM services WHERE business_unit IS NOT NULL AND business_unit != ''")
         business_units = [row["business_unit"] for row in cursor.fetchall()]
         
@@ -775,7 +771,7 @@ def get_services_dashboard():
             total_estimated_hours = tc.get("total_estimated") or 0
             total_actual_hours = tc.get("total_actual") or 0
             
-            software_cost = software_costs.get(svc_id, 0) or 0
+            software_cost = tc.get("software_cost") or 0
             
             overhead_fees = calculate_overhead_and_fees(
                 labor_cost_min, labor_cost_max, software_cost, svc["fee_percent"] or 0
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
+from fastapi.concurrency import run_in_threadpool
+from typing import Literal
 from datetime import datetime
-import csv
-import io
 from models.software import Software, SoftwareCreate, SoftwareUpdate, SoftwareAllocationCreate
 from database import get_connection
+from services.pagination import PageParams, list_rows
+from services.csv_import import CsvFormatError, import_csv
 
 router = APIRouter(prefix="/api/software", tags=["software"])
 
@@ -18,12 +20,12 @@ def row_to_software(row) -> dict:
     }
 
 @router.get("", response_model=dict)
-def list_software():
+def list_software(page: PageParams = Depends()):
     with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM software_costs ORDER BY name")
-        rows = cursor.fetchall()
-        software = [row_to_software(row) for row in rows]
+        software = list_rows(
+            conn.cursor(), "SELECT * FROM software_costs",
+            [("name", "name", False), ("id", "id", False)], row_to_software, page
+        )
     return {"success": True, "data": software, "error": None}
 
 @router.get("/{software_id}", response_model=dict)
@@ -92,75 +94,42 @@ def delete_software(software_id: int):
         conn.commit()
     return {"success": True, "data": {"deleted": software_id}, "error": None}
 
+def parse_software_csv_row(row: dict, field_map: dict):
+    name = row[field_map.get('name', '')].strip()
+    description = ((row.get(field_map['description']) or '').strip() or None) if 'description' in field_map else None
+    cost_str = row[field_map.get('monthly_cost', '')].strip()
+    cost_str = cost_str.replace('$', '').replace(',', '')
+    monthly_cost = float(cost_str)
+    
+    if not name:
+        return "Missing name"
+    
+    if monthly_cost < 0:
+        return "Monthly cost must be >= 0"
+    
+    return {"name": name, "description": description, "monthly_cost": monthly_cost}
+
+SOFTWARE_CSV_IMPORT = {
+    "table": "software_costs",
+    "key": "name",
+    "columns": ["name", "description", "monthly_cost"],
+    "required": {'name', 'monthly_cost'},
+    "header_error": "CSV must have columns: Name, Monthly Cost (Description is optional)",
+    "parse_row": parse_software_csv_row,
+}
+
 @router.post("/upload-csv", response_model=dict)
-async def upload_software_csv(file: UploadFile = File(...)):
+async def upload_software_csv(file: UploadFile = File(...), mode: Literal["insert", "upsert"] = "insert"):
+    """mode=upsert updates software whose name already exists instead of adding a duplicate."""
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="File must be a CSV")
     
-    content = await file.read()
     try:
-        decoded = content.decode('utf-8-sig')
-    except UnicodeDecodeError:
-        decoded = content.decode('latin-1')
-    
-    reader = csv.DictReader(io.StringIO(decoded))
-    
-    def normalize(s):
-        return s.lower().strip().replace(' ', '_')
-    
-    required_fields = {'name', 'monthly_cost'}
-    fieldnames_normalized = set(normalize(f) for f in reader.fieldnames)
-    if not required_fields.issubset(fieldnames_normalized):
-        raise HTTPException(
-            status_code=400, 
-            detail=f"CSV must have columns: Name, Monthly Cost (Description is optional)"
-        )
-    
-    field_map = {normalize(f): f for f in reader.fieldnames}
-    
-    now = datetime.now().isoformat()
-    created = []
-    errors = []
+        data = await run_in_threadpool(import_csv, file.file, SOFTWARE_CSV_IMPORT, mode == "upsert")
+    except CsvFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        for i, row in enumerate(reader, start=2):
-            try:
-                name = row[field_map.get('name', '')].strip()
-                description = row.get(field_map.get('description', ''), '').strip() if 'description' in field_map else None
-                cost_str = row[field_map.get('monthly_cost', '')].strip()
-                cost_str = cost_str.replace('$', '').replace(',', '')
-                monthly_cost = float(cost_str)
-                
-                if not name:
-                    errors.append(f"Row {i}: Missing name")
-                    continue
-                
-                if monthly_cost < 0:
-                    errors.append(f"Row {i}: Monthly cost must be >= 0")
-                    continue
-                
-                cursor.execute(
-                    """INSERT INTO software_costs (name, description, monthly_cost, created_at, updated_at)
-                       VALUES (?, ?, ?, ?, ?)""",
-                    (name, description, monthly_cost, now, now)
-                )
-                created.append({"name": name, "description": description, "monthly_cost": monthly_cost})
-            except (ValueError, KeyError) as e:
-                errors.append(f"Row {i}: {str(e)}")
-        
-        conn.commit()
-    
-    return {
-        "success": True,
-        "data": {
-            "created_count": len(created),
-            "created": created,
-            "error_count": len(errors),
-            "errors": errors
-        },
-        "error": None
-    }
+    return {"success": True, "data": data, "error": None}
 
 @router.get("/product/{product_id}/allocations", response_model=dict)
 def list_product_allocations(product_id: int):
@@ -1,9 +1,22 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Depends
 from datetime import datetime, date
-import json
-from models.valuation import Valuation, ValuationCreate, ValuationUpdate, ValuationHistory
-from database import get_connection
-from services.valuation_calculator import calculate_all
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import multiprocessing
+import time
+from models.valuation import (
+    Valuation, ValuationCreate, ValuationUpdate, ValuationHistory,
+    ValuationSimulationRequest, PortfolioSimulationRequest
+)
+from database import get_connection, transaction
+from auth import verify_api_key, rate_limit
+from services.valuation_calculator import calculate_all, calculate_all_batch
+from services.pagination import PageParams, list_rows
+from services.valuation_history import encode_snapshot, reconstruct_snapshot
+from services.valuation_simulation import resolve_ranges, run_simulations, simulation_cache
+from config import settings
 
 router = APIRouter(prefix="/api/valuations", tags=["valuations"])
 
@@ -40,46 +53,88 @@ def row_to_valuation(row) -> dict:
         result[field] = row[field]
     return result
 
-def get_product_type(product_id: int) -> str:
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT product_type FROM products WHERE id = ?", (product_id,))
-        row = cursor.fetchone()
+HISTORY_INSERT_SQL = """INSERT INTO valuation_history 
+               (product_id, valuation_date, confidence_level, total_economic_value, 
+                three_year_revenue_projection, strategic_multiplier, final_value_low, 
+                final_value_high, rice_score, snapshot_kind, snapshot_blob, created_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+HISTORY_SUMMARY_COLUMNS = [
+    "id", "product_id", "valuation_date", "confidence_level", "total_economic_value",
+    "three_year_revenue_projection", "strategic_multiplier", "final_value_low",
+    "final_value_high", "rice_score", "created_at",
+]
+
+def history_snapshot_params(cursor, product_id: int, valuation_data: dict) -> tuple:
+    snapshot_kind, snapshot_blob = encode_snapshot(cursor, product_id, valuation_data)
+    return (
+        product_id,
+        valuation_data.get("valuation_date") or date.today().isoformat(),
+        valuation_data.get("confidence_level"),
+        valuation_data.get("total_economic_value"),
+        valuation_data.get("three_year_revenue_projection"),
+        valuation_data.get("strategic_multiplier"),
+        valuation_data.get("final_value_low"),
+        valuation_data.get("final_value_high"),
+        valuation_data.get("rice_score"),
+        snapshot_kind,
+        snapshot_blob,
+        datetime.now().isoformat(),
+    )
+
+class ValuationUnitOfWork:
+    """
+    The reads and writes behind one valuation save, on one connection and in
+    one transaction: the valuation row, its history snapshot and the
+    product's estimated_value are committed together or not at all.
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def product_type(self, product_id: int) -> str:
+        self.cursor.execute("SELECT product_type FROM products WHERE id = ?", (product_id,))
+        row = self.cursor.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Product not found")
         return row["product_type"]
 
-def get_product_effort_hours(product_id: int) -> float:
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT COALESCE(SUM(estimated_hours), 0) as total FROM tasks WHERE product_id = ?", (product_id,))
-        row = cursor.fetchone()
+    def effort_hours(self, product_id: int) -> float:
+        self.cursor.execute("SELECT COALESCE(SUM(estimated_hours), 0) as total FROM tasks WHERE product_id = ?", (product_id,))
+        row = self.cursor.fetchone()
         return row["total"] if row else 0
 
-def save_history_snapshot(product_id: int, valuation_data: dict):
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """INSERT INTO valuation_history 
-               (product_id, valuation_date, confidence_level, total_economic_value, 
-                three_year_revenue_projection, strategic_multiplier, final_value_low, 
-                final_value_high, rice_score, snapshot_json, created_at)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (
-                product_id,
-                valuation_data.get("valuation_date") or date.today().isoformat(),
-                valuation_data.get("confidence_level"),
-                valuation_data.get("total_economic_value"),
-                valuation_data.get("three_year_revenue_projection"),
-                valuation_data.get("strategic_multiplier"),
-                valuation_data.get("final_value_low"),
-                valuation_data.get("final_value_high"),
-                valuation_data.get("rice_score"),
-                json.dumps(valuation_data),
-                datetime.now().isoformat(),
-            )
+    def get_valuation(self, product_id: int):
+        self.cursor.execute("SELECT * FROM product_valuations WHERE product_id = ?", (product_id,))
+        return self.cursor.fetchone()
+
+    def insert_valuation(self, columns: list, values: list):
+        placeholders = ", ".join(["?"] * len(columns))
+        self.cursor.execute(f"INSERT INTO product_valuations ({', '.join(columns)}) VALUES ({placeholders})", values)
+        self.cursor.execute("SELECT * FROM product_valuations WHERE id = ?", (self.cursor.lastrowid,))
+        return self.cursor.fetchone()
+
+    def update_valuation(self, product_id: int, updates: dict):
+        set_clause = ", ".join(f"{k} = ?" for k in updates.keys())
+        self.cursor.execute(f"UPDATE product_valuations SET {set_clause} WHERE product_id = ?", list(updates.values()) + [product_id])
+        return self.get_valuation(product_id)
+
+    def delete_valuation(self, product_id: int):
+        self.cursor.execute("DELETE FROM product_valuations WHERE product_id = ?", (product_id,))
+
+    def save_history_snapshot(self, product_id: int, valuation_data: dict):
+        self.cursor.execute(HISTORY_INSERT_SQL, history_snapshot_params(self.cursor, product_id, valuation_data))
+
+    def set_estimated_value(self, product_id: int, value: float | None):
+        self.cursor.execute(
+            "UPDATE products SET estimated_value = ?, updated_at = ? WHERE id = ?",
+            (value or 0, datetime.now().isoformat(), product_id)
         )
-        conn.commit()
+
+@contextmanager
+def valuation_unit_of_work():
+    with transaction() as conn:
+        yield ValuationUnitOfWork(conn.cursor())
 
 @router.get("/product/{product_id}", response_model=dict)
 def get_valuation_by_product(product_id: int):
@@ -93,60 +148,47 @@ def get_valuation_by_product(product_id: int):
 
 @router.post("", response_model=dict, status_code=201)
 def create_valuation(valuation: ValuationCreate):
-    product_type = get_product_type(valuation.product_id)
-    effort_hours = get_product_effort_hours(valuation.product_id)
-    
-    input_data = valuation.model_dump(exclude_unset=True)
-    calculated = calculate_all(input_data, product_type, effort_hours)
-    
-    now = datetime.now().isoformat()
-    val_date = valuation.valuation_date.isoformat() if valuation.valuation_date else date.today().isoformat()
-    
-    columns = ["product_id", "valuation_date", "created_at", "updated_at"]
-    values = [valuation.product_id, val_date, now, now]
-    
-    for field in INPUT_FIELDS:
-        if field == "valuation_date":
-            continue
-        columns.append(field)
-        val = getattr(valuation, field, None)
-        values.append(val)
-    
-    for field in CALCULATED_FIELDS:
-        columns.append(field)
-        values.append(calculated.get(field))
-    
-    placeholders = ", ".join(["?"] * len(columns))
-    col_str = ", ".join(columns)
-    
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM product_valuations WHERE product_id = ?", (valuation.product_id,))
-        if cursor.fetchone():
+    with valuation_unit_of_work() as uow:
+        product_type = uow.product_type(valuation.product_id)
+        effort_hours = uow.effort_hours(valuation.product_id)
+        
+        input_data = valuation.model_dump(exclude_unset=True)
+        calculated = calculate_all(input_data, product_type, effort_hours)
+        
+        now = datetime.now().isoformat()
+        val_date = valuation.valuation_date.isoformat() if valuation.valuation_date else date.today().isoformat()
+        
+        columns = ["product_id", "valuation_date", "created_at", "updated_at"]
+        values = [valuation.product_id, val_date, now, now]
+        
+        for field in INPUT_FIELDS:
+            if field == "valuation_date":
+                continue
+            columns.append(field)
+            val = getattr(valuation, field, None)
+            values.append(val)
+        
+        for field in CALCULATED_FIELDS:
+            columns.append(field)
+            values.append(calculated.get(field))
+        
+        if uow.get_valuation(valuation.product_id):
             raise HTTPException(status_code=400, detail="Valuation already exists for this product. Use PUT to update.")
         
-        cursor.execute(f"INSERT INTO product_valuations ({col_str}) VALUES ({placeholders})", values)
-        conn.commit()
-        valuation_id = cursor.lastrowid
-        cursor.execute("SELECT * FROM product_valuations WHERE id = ?", (valuation_id,))
-        row = cursor.fetchone()
-    
-    result = row_to_valuation(row)
-    save_history_snapshot(valuation.product_id, result)
-    
-    update_product_estimated_value(valuation.product_id, calculated.get("final_value_high"))
+        row = uow.insert_valuation(columns, values)
+        result = row_to_valuation(row)
+        uow.save_history_snapshot(valuation.product_id, result)
+        uow.set_estimated_value(valuation.product_id, calculated.get("final_value_high"))
     
     return {"success": True, "data": result, "error": None}
 
 @router.put("/product/{product_id}", response_model=dict)
 def update_valuation(product_id: int, valuation: ValuationUpdate):
-    product_type = get_product_type(product_id)
-    effort_hours = get_product_effort_hours(product_id)
-    
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM product_valuations WHERE product_id = ?", (product_id,))
-        existing = cursor.fetchone()
+    with valuation_unit_of_work() as uow:
+        product_type = uow.product_type(product_id)
+        effort_hours = uow.effort_hours(product_id)
+        
+        existing = uow.get_valuation(product_id)
         if not existing:
             raise HTTPException(status_code=404, detail="Valuation not found for this product")
         
@@ -172,63 +214,52 @@ def update_valuation(product_id: int, valuation: ValuationUpdate):
         for field in CALCULATED_FIELDS:
             updates[field] = calculated.get(field)
         
-        set_clause = ", ".join(f"{k} = ?" for k in updates.keys())
-        values = list(updates.values()) + [product_id]
-        cursor.execute(f"UPDATE product_valuations SET {set_clause} WHERE product_id = ?", values)
-        conn.commit()
-        
-        cursor.execute("SELECT * FROM product_valuations WHERE product_id = ?", (product_id,))
-        row = cursor.fetchone()
-    
-    result = row_to_valuation(row)
-    save_history_snapshot(product_id, result)
-    
-    update_product_estimated_value(product_id, calculated.get("final_value_high"))
+        row = uow.update_valuation(product_id, updates)
+        result = row_to_valuation(row)
+        uow.save_history_snapshot(product_id, result)
+        uow.set_estimated_value(product_id, calculated.get("final_value_high"))
     
     return {"success": True, "data": result, "error": None}
 
 @router.delete("/product/{product_id}", response_model=dict)
 def delete_valuation(product_id: int):
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM product_valuations WHERE product_id = ?", (product_id,))
-        existing = cursor.fetchone()
-        if not existing:
+    with valuation_unit_of_work() as uow:
+        if not uow.get_valuation(product_id):
             raise HTTPException(status_code=404, detail="Valuation not found for this product")
-        cursor.execute("DELETE FROM product_valuations WHERE product_id = ?", (product_id,))
-        conn.commit()
-    
-    update_product_estimated_value(product_id, 0)
+        uow.delete_valuation(product_id)
+        uow.set_estimated_value(product_id, 0)
     
     return {"success": True, "data": {"deleted": product_id}, "error": None}
 
 @router.get("/product/{product_id}/history", response_model=dict)
-def get_valuation_history(product_id: int):
+def get_valuation_history(product_id: int, page: PageParams = Depends()):
+    with get_connection() as conn:
+        history = list_rows(
+            conn.cursor(),
+            f"SELECT {', '.join(HISTORY_SUMMARY_COLUMNS)} FROM valuation_history",
+            [("created_at", "created_at", True, ""), ("id", "id", True)],
+            lambda row: {column: row[column] for column in HISTORY_SUMMARY_COLUMNS},
+            page,
+            filters={"product_id": product_id},
+        )
+    return {"success": True, "data": history, "error": None}
+
+@router.get("/product/{product_id}/history/{history_id}", response_model=dict)
+def get_valuation_history_snapshot(product_id: int, history_id: int):
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(
-            "SELECT * FROM valuation_history WHERE product_id = ? ORDER BY created_at DESC",
-            (product_id,)
+            f"SELECT {', '.join(HISTORY_SUMMARY_COLUMNS)} FROM valuation_history WHERE id = ? AND product_id = ?",
+            (history_id, product_id)
         )
-        rows = cursor.fetchall()
-    
-    history = []
-    for row in rows:
-        history.append({
-            "id": row["id"],
-            "product_id": row["product_id"],
-            "valuation_date": row["valuation_date"],
-            "confidence_level": row["confidence_level"],
-            "total_economic_value": row["total_economic_value"],
-            "three_year_revenue_projection": row["three_year_revenue_projection"],
-            "strategic_multiplier": row["strategic_multiplier"],
-            "final_value_low": row["final_value_low"],
-            "final_value_high": row["final_value_high"],
-            "rice_score": row["rice_score"],
-            "created_at": row["created_at"],
-        })
+        row = cursor.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="History entry not found")
+        snapshot = reconstruct_snapshot(cursor, product_id, history_id)
     
-    return {"success": True, "data": history, "error": None}
+    entry = {column: row[column] for column in HISTORY_SUMMARY_COLUMNS}
+    entry["snapshot"] = snapshot
+    return {"success": True, "data": entry, "error": None}
 
 @router.get("/portfolio", response_model=dict)
 def get_portfolio_valuations():
@@ -266,11 +297,188 @@ def get_portfolio_valuations():
     
     return {"success": True, "data": portfolio, "error": None}
 
-def update_product_estimated_value(product_id: int, value: float | None):
+RECOMPUTE_CHUNK_SQL = """
+    SELECT v.*, p.product_type,
+           COALESCE((SELECT SUM(t.estimated_hours) FROM tasks t WHERE t.product_id = v.product_id), 0) as effort_hours
+    FROM product_valuations v
+    JOIN products p ON p.id = v.product_id
+    WHERE v.id > ?
+    ORDER BY v.id
+    LIMIT ?
+"""
+
+def _write_recomputed(cursor, rows: list, results: list, now: str) -> int:
+    # Skip rows edited or deleted since the chunk was read; their own write recalculated them.
+    cursor.execute(
+        "SELECT id, updated_at FROM product_valuations WHERE id BETWEEN ? AND ?",
+        (rows[0]["id"], rows[-1]["id"])
+    )
+    current = {row["id"]: row["updated_at"] for row in cursor.fetchall()}
+
+    valuation_updates = []
+    history = []
+    product_updates = []
+    for row, calculated in zip(rows, results):
+        if row["id"] not in current or current[row["id"]] != row["updated_at"]:
+            continue
+        if all(row[field] == calculated.get(field) for field in CALCULATED_FIELDS):
+            continue
+        for field in CALCULATED_FIELDS:
+            row[field] = calculated.get(field)
+        row["updated_at"] = now
+        valuation_updates.append([row[field] for field in CALCULATED_FIELDS] + [now, row["id"]])
+        history.append(history_snapshot_params(cursor, row["product_id"], row_to_valuation(row)))
+        product_updates.append((calculated.get("final_value_high") or 0, now, row["product_id"]))
+
+    set_clause = ", ".join(f"{field} = ?" for field in CALCULATED_FIELDS)
+    cursor.executemany(f"UPDATE product_valuations SET {set_clause}, updated_at = ? WHERE id = ?", valuation_updates)
+    cursor.executemany(HISTORY_INSERT_SQL, history)
+    cursor.executemany("UPDATE products SET estimated_value = ?, updated_at = ? WHERE id = ?", product_updates)
+    return len(valuation_updates)
+
+def recompute_all_valuations(chunk_size: Optional[int] = None, workers: Optional[int] = None) -> dict:
+    """
+    Re-run calculate_all for every stored valuation, e.g. after changing
+    CONFIDENCE_RANGES or the strategic multiplier weights.
+
+    Valuations are read in id-ordered chunks together with their product type
+    and effort hours, and evaluated in-process or, with workers > 1, in a
+    process pool of at most VALUATION_MAX_WORKERS. Each chunk's changed rows
+    are written back with a history snapshot and a new product estimated
+    value in their own transaction, so the write lock is only held while a
+    chunk is written, never while one is evaluated.
+    """
+    chunk_size = chunk_size or settings.VALUATION_RECOMPUTE_CHUNK_SIZE
+    workers = settings.VALUATION_RECOMPUTE_WORKERS if workers is None else workers
+    workers = min(workers, settings.VALUATION_MAX_WORKERS)
+    started = time.perf_counter()
+    now = datetime.now().isoformat()
+    scanned = 0
+    updated = 0
+
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        pending = deque()
+        last_id = 0
+        while True:
+            with get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(RECOMPUTE_CHUNK_SQL, (last_id, chunk_size))
+                rows = [dict(row) for row in cursor.fetchall()]
+            if rows:
+                last_id = rows[-1]["id"]
+                scanned += len(rows)
+                items = [(row, row["product_type"], row["effort_hours"]) for row in rows]
+                if executor:
+                    pending.append((rows, executor.submit(calculate_all_batch, items)))
+                else:
+                    pending.append((rows, calculate_all_batch(items)))
+            # Keep up to `workers` chunks evaluating while earlier ones are written
+            while pending and (not rows or len(pending) > max(workers, 1)):
+                chunk_rows, results = pending.popleft()
+                if executor:
+                    results = results.result()
+                with transaction() as conn:
+                    updated += _write_recomputed(conn.cursor(), chunk_rows, results, now)
+            if not rows:
+                break
+    finally:
+        if executor:
+            executor.shutdown()
+
+    seconds = time.perf_counter() - started
+    return {
+        "rows": scanned,
+        "updated": updated,
+        "unchanged": scanned - updated,
+        "workers": workers if executor else 1,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(scanned / seconds, 1) if seconds > 0 else None,
+    }
+
+@router.post("/recompute", response_model=dict)
+def recompute_valuations(
+    chunk_size: Optional[int] = Query(default=None, ge=1),
+    workers: Optional[int] = Query(default=None, ge=0, le=settings.VALUATION_MAX_WORKERS),
+    _api_key: str = Depends(verify_api_key)
+):
+    return {"success": True, "data": recompute_all_valuations(chunk_size, workers), "error": None}
+
+SIMULATION_INPUT_SQL = """
+    SELECT v.*, p.name as product_name, p.product_type,
+           COALESCE(r.labor_cost_min, 0) + COALESCE(r.software_cost, 0) as total_cost_min,
+           COALESCE(r.labor_cost_max, 0) + COALESCE(r.software_cost, 0) as total_cost_max
+    FROM product_valuations v
+    JOIN products p ON p.id = v.product_id
+    LEFT JOIN product_cost_rollup r ON r.product_id = v.product_id
+"""
+
+def simulation_job(row, samples: Optional[int], seed: Optional[int], spread: Optional[float], ranges: Optional[dict] = None) -> dict:
+    data = {field: row[field] for field in row.keys()}
+    return {
+        "data": data,
+        "product_type": row["product_type"],
+        "cost_min": row["total_cost_min"],
+        "cost_max": row["total_cost_max"],
+        "ranges": resolve_ranges(data, ranges, spread),
+        "samples": samples or settings.SIMULATION_SAMPLES,
+        "seed": seed,
+    }
+
+def check_simulation_budget(samples: Optional[int], products: int):
+    total = (samples or settings.SIMULATION_SAMPLES) * products
+    if total > settings.SIMULATION_MAX_TOTAL_SAMPLES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Simulation would draw {total} samples ({products} products); the limit per request is {settings.SIMULATION_MAX_TOTAL_SAMPLES}"
+        )
+
+@router.post("/product/{product_id}/simulate", response_model=dict)
+def simulate_product_valuation(
+    product_id: int,
+    request: ValuationSimulationRequest,
+    _api_key: str = Depends(verify_api_key),
+    _rate: str = Depends(rate_limit)
+):
+    check_simulation_budget(request.samples, 1)
     with get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE products SET estimated_value = ?, updated_at = ? WHERE id = ?",
-            (value or 0, datetime.now().isoformat(), product_id)
-        )
-        conn.commit()
+        cursor.execute(SIMULATION_INPUT_SQL + " WHERE v.product_id = ?", (product_id,))
+        row = cursor.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Valuation not found for this product")
+    
+    ranges = {field: bounds.model_dump() for field, bounds in request.ranges.items()}
+    try:
+        job = simulation_job(row, request.samples, request.seed, request.spread, ranges)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    result = run_simulations([job], workers=0)[0]
+    return {"success": True, "data": {"product_id": product_id, **result}, "error": None}
+
+@router.post("/simulate/portfolio", response_model=dict)
+def simulate_portfolio_valuations(
+    request: PortfolioSimulationRequest,
+    _api_key: str = Depends(verify_api_key),
+    _rate: str = Depends(rate_limit)
+):
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SIMULATION_INPUT_SQL + " ORDER BY v.product_id")
+        rows = cursor.fetchall()
+    check_simulation_budget(request.samples, len(rows))
+    
+    jobs = [simulation_job(row, request.samples, request.seed, request.spread) for row in rows]
+    results = run_simulations(jobs, workers=request.workers)
+    portfolio = [
+        {"product_id": row["product_id"], "product_name": row["product_name"], **result}
+        for row, result in zip(rows, results)
+    ]
+    return {"success": True, "data": portfolio, "error": None}
+
+@router.get("/simulate/cache", response_model=dict)
+def get_simulation_cache_stats():
+    return {"success": True, "data": simulation_cache.stats(), "error": None}
@@ -1,13 +1,19 @@
 from typing import Optional, Tuple
 from datetime import datetime
+from collections import OrderedDict
 import secrets
 import hashlib
+import threading
+import time
 
 from config import settings
 from database import get_connection
+from services.supabase_client import supabase_client
 
 
 class AuthUser:
+    __slots__ = ("id", "email", "name", "role", "department_id")
+
     def __init__(self, id: int, email: str, name: str, role: str, department_id: Optional[int] = None):
         self.id = id
         self.email = email
@@ -16,8 +22,67 @@ class AuthUser:
         self.department_id = department_id
 
 
+class TokenCache:
+    """
+    Bounded LRU of validated token -> AuthUser. An entry lives for
+    AUTH_TOKEN_CACHE_TTL seconds, never past the token's own expiry, and is
+    dropped as soon as the user's row is changed through this process.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[AuthUser]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[1] <= time.time():
+                if entry is not None:
+                    del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token: str, user: AuthUser, expires_at: Optional[float] = None):
+        if self.max_entries <= 0:
+            return
+        deadline = time.time() + self.ttl_seconds
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        with self._lock:
+            self._entries[token] = (user, deadline)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for token in [t for t, (user, _) in self._entries.items() if user.id == user_id]:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+token_cache = TokenCache(settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL)
+
+
 class DevAuthService:
     def validate_token(self, token: str) -> Optional[AuthUser]:
+        user = token_cache.get(token)
+        if user is not None:
+            return user
         try:
             user_id = int(token)
             with get_connection() as conn:
@@ -25,18 +90,20 @@ class DevAuthService:
                 cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
                 row = cursor.fetchone()
                 if row:
-                    return AuthUser(
+                    user = AuthUser(
                         id=row["id"],
                         email=row["email"],
                         name=row["name"],
                         role=row["role"],
                         department_id=row["department_id"] if "department_id" in row.keys() else None,
                     )
+                    token_cache.put(token, user)
+                    return user
         except (ValueError, TypeError):
             pass
         return None
 
-    def login(self, email: str, password: str) -> Optional[Tuple[str, AuthUser]]:
+    async def login(self, email: str, password: str) -> Optional[Tuple[str, AuthUser]]:
         with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
@@ -62,7 +129,7 @@ class DevAuthService:
                 return row["id"]
         return None
 
-    def set_password(self, user_id: int, password: str) -> bool:
+    async def set_password(self, user_id: int, password: str) -> bool:
         with get_connection() as conn:
             cursor = conn.cursor()
             password_hash = _hash_password(password)
@@ -71,16 +138,19 @@ class DevAuthService:
                 (password_hash, datetime.now().isoformat(), user_id)
             )
             conn.commit()
+            token_cache.invalidate_user(user_id)
             return cursor.rowcount > 0
 
 
 class SupabaseAuthService:
     def __init__(self):
         self.jwt_secret = settings.SUPABASE_JWT_SECRET
-        self.supabase_url = settings.SUPABASE_URL
         self.supabase_key = settings.SUPABASE_KEY
 
     def validate_token(self, token: str) -> Optional[AuthUser]:
+        user = token_cache.get(token)
+        if user is not None:
+            return user
         try:
             import jwt
             payload = jwt.decode(
@@ -98,49 +168,44 @@ class SupabaseAuthService:
                 cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
                 row = cursor.fetchone()
                 if row:
-                    return AuthUser(
+                    user = AuthUser(
                         id=row["id"],
                         email=row["email"],
                         name=row["name"],
                         role=row["role"],
                         department_id=row["department_id"] if "department_id" in row.keys() else None,
                     )
+                    token_cache.put(token, user, expires_at=payload.get("exp"))
+                    return user
         except Exception:
             pass
         return None
 
-    def login(self, email: str, password: str) -> Optional[Tuple[str, AuthUser]]:
-        import httpx
-
+    async def login(self, email: str, password: str) -> Optional[Tuple[str, AuthUser]]:
+        response = await supabase_client.post(
+            "/auth/v1/token?grant_type=password",
+            json={"email": email, "password": password},
+        )
+        if response.status_code != 200:
+            return None
         try:
-            response = httpx.post(
-                f"{self.supabase_url}/auth/v1/token?grant_type=password",
-                json={"email": email, "password": password},
-                headers={
-                    "apikey": self.supabase_key,
-                    "Content-Type": "application/json",
-                },
-                timeout=10.0,
-            )
-            if response.status_code == 200:
-                data = response.json()
-                access_token = data.get("access_token")
-
-                with get_connection() as conn:
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
-                    row = cursor.fetchone()
-                    if row and access_token:
-                        user = AuthUser(
-                            id=row["id"],
-                            email=row["email"],
-                            name=row["name"],
-                            role=row["role"],
-                            department_id=row["department_id"] if "department_id" in row.keys() else None,
-                        )
-                        return (access_token, user)
-        except Exception:
-            pass
+            access_token = response.json().get("access_token")
+        except ValueError:
+            return None
+
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
+            row = cursor.fetchone()
+            if row and access_token:
+                user = AuthUser(
+                    id=row["id"],
+                    email=row["email"],
+                    name=row["name"],
+                    role=row["role"],
+                    department_id=row["department_id"] if "department_id" in row.keys() else None,
+                )
+                return (access_token, user)
         return None
 
     def verify_invite_token(self, token: str) -> Optional[int]:
@@ -152,44 +217,39 @@ class SupabaseAuthService:
                 return row["id"]
         return None
 
-    def set_password(self, user_id: int, password: str) -> bool:
-        import httpx
-
+    async def set_password(self, user_id: int, password: str) -> bool:
         with get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+            cursor.execute("SELECT email FROM users WHERE id = ?", (user_id,))
             row = cursor.fetchone()
-            if not row:
-                return False
-
-            try:
-                response = httpx.post(
-                    f"{self.supabase_url}/auth/v1/admin/users",
-                    json={
-                        "email": row["email"],
-                        "password": password,
-                        "email_confirm": True,
-                    },
-                    headers={
-                        "apikey": self.supabase_key,
-                        "Authorization": f"Bearer {self.supabase_key}",
-                        "Content-Type": "application/json",
-                    },
-                    timeout=10.0,
-                )
-                if response.status_code in (200, 201):
-                    data = response.json()
-                    supabase_user_id = data.get("id")
+        if not row:
+            return False
 
-                    cursor.execute(
-                        "UPDATE users SET supabase_user_id = ?, invite_status = 'accepted', invite_token = NULL, updated_at = ? WHERE id = ?",
-                        (supabase_user_id, datetime.now().isoformat(), user_id)
-                    )
-                    conn.commit()
-                    return True
-            except Exception:
-                pass
-        return False
+        response = await supabase_client.post(
+            "/auth/v1/admin/users",
+            json={
+                "email": row["email"],
+                "password": password,
+                "email_confirm": True,
+            },
+            headers={"Authorization": f"Bearer {self.supabase_key}"},
+        )
+        if response.status_code not in (200, 201):
+            return False
+        try:
+            supabase_user_id = response.json().get("id")
+        except ValueError:
+            return False
+
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE users SET supabase_user_id = ?, invite_status = 'accepted', invite_token = NULL, updated_at = ? WHERE id = ?",
+                (supabase_user_id, datetime.now().isoformat(), user_id)
+            )
+            conn.commit()
+        token_cache.invalidate_user(user_id)
+        return True
 
 
 def _hash_password(password: str) -> str:
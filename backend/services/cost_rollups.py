@@ -0,0 +1,41 @@
+from database import COST_ROLLUPS, ROLLUP_COLUMNS, cost_rollup_select, rebuild_cost_rollups
+
+
+def verify_cost_rollups(conn) -> dict:
+    """
+    Compare the stored roll-up rows with totals computed fresh from tasks and
+    allocations. An entity with no roll-up row must have no tasks or costs.
+    """
+    cursor = conn.cursor()
+    report = {}
+    for kind, rollup in COST_ROLLUPS.items():
+        cursor.execute(cost_rollup_select(kind, "1 = 1"))
+        fresh = {row["entity_id"]: row for row in cursor.fetchall()}
+        cursor.execute(f"SELECT * FROM {rollup['rollup_table']}")
+        stored = {row[rollup["foreign_key"]]: row for row in cursor.fetchall()}
+
+        mismatches = []
+        for entity_id in sorted(set(fresh) | set(stored)):
+            expected = fresh.get(entity_id)
+            actual = stored.get(entity_id)
+            for column in ROLLUP_COLUMNS:
+                expected_value = expected[column] if expected else None
+                actual_value = actual[column] if actual else None
+                if actual is None and expected_value in (None, 0):
+                    continue
+                if expected_value != actual_value:
+                    mismatches.append({
+                        "id": entity_id,
+                        "column": column,
+                        "expected": expected_value,
+                        "stored": actual_value
+                    })
+        report[kind] = {"checked": len(fresh), "mismatches": mismatches}
+    return report
+
+
+def rebuild_all_cost_rollups(conn) -> dict:
+    cursor = conn.cursor()
+    written = rebuild_cost_rollups(cursor)
+    conn.commit()
+    return written
@@ -0,0 +1,149 @@
+"""
+Streaming CSV import into one table.
+
+The upload is read through a TextIOWrapper, so only the current line and the
+pending batch are held in memory, and rows are written with executemany in
+batches of CSV_IMPORT_BATCH_SIZE. Everything runs in one transaction. As
+before, the file is decoded as UTF-8 (BOM allowed) and, if that fails
+anywhere, re-read from the start as Latin-1. In upsert mode empty cells
+(None values) keep the stored column, and a key shared by several existing
+rows is reported as an error instead of being updated.
+"""
+import csv
+import io
+import time
+from datetime import datetime
+from typing import BinaryIO
+
+from config import settings
+from database import transaction
+
+
+class CsvFormatError(ValueError):
+    pass
+
+
+def normalize_header(name: str) -> str:
+    return name.lower().strip().replace(' ', '_')
+
+
+def import_csv(upload: BinaryIO, spec: dict, upsert: bool = False) -> dict:
+    """
+    spec describes the target: table, key (the column matched in upsert
+    mode), columns, required (normalized header names), header_error, and
+    parse_row(row, field_map) returning the column values or an error
+    message. Raises CsvFormatError when the header is unusable.
+    """
+    for encoding in ("utf-8-sig", "latin-1"):
+        upload.seek(0)
+        text = io.TextIOWrapper(upload, encoding=encoding, newline="")
+        try:
+            with transaction() as conn:
+                return _import_rows(conn.cursor(), csv.DictReader(text), spec, upsert)
+        except UnicodeDecodeError:
+            continue
+        finally:
+            text.detach()
+
+
+def _import_rows(cursor, reader: csv.DictReader, spec: dict, upsert: bool) -> dict:
+    started = time.perf_counter()
+    if not reader.fieldnames or not spec["required"].issubset(normalize_header(f) for f in reader.fieldnames):
+        raise CsvFormatError(spec["header_error"])
+    field_map = {normalize_header(f): f for f in reader.fieldnames}
+
+    now = datetime.now().isoformat()
+    created = []
+    updated = []
+    errors = []
+    batch = []
+    batch_keys = {}
+    rows = 0
+
+    def flush():
+        if upsert:
+            created_rows, updated_rows, ambiguous = _upsert_batch(cursor, spec, batch, now)
+            for key_value, matches in ambiguous.items():
+                errors.append(
+                    f"Row {batch_keys[key_value]}: {spec['key']} '{key_value}' matches {matches} existing rows; "
+                    "update them individually"
+                )
+        else:
+            _insert_batch(cursor, spec, batch, now)
+            created_rows, updated_rows = batch, []
+        created.extend(created_rows)
+        updated.extend(updated_rows)
+        batch.clear()
+        batch_keys.clear()
+
+    for i, row in enumerate(reader, start=2):
+        rows += 1
+        try:
+            values = spec["parse_row"](row, field_map)
+        except (ValueError, KeyError) as e:
+            errors.append(f"Row {i}: {str(e)}")
+            continue
+        if isinstance(values, str):
+            errors.append(f"Row {i}: {values}")
+            continue
+        if upsert and values[spec["key"]] in batch_keys:
+            # A repeated key updates the row written for its first occurrence
+            flush()
+        batch.append(values)
+        batch_keys[values[spec["key"]]] = i
+        if len(batch) >= settings.CSV_IMPORT_BATCH_SIZE:
+            flush()
+    flush()
+
+    seconds = time.perf_counter() - started
+    return {
+        "created_count": len(created),
+        "created": created,
+        "updated_count": len(updated),
+        "updated": updated,
+        "error_count": len(errors),
+        "errors": errors,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(rows / seconds, 1) if seconds > 0 else None,
+    }
+
+
+def _insert_batch(cursor, spec: dict, batch: list, now: str):
+    columns = spec["columns"]
+    placeholders = ", ".join("?" for _ in range(len(columns) + 2))
+    cursor.executemany(
+        f"INSERT INTO {spec['table']} ({', '.join(columns)}, created_at, updated_at) VALUES ({placeholders})",
+        [[values[column] for column in columns] + [now, now] for values in batch]
+    )
+
+
+def _upsert_batch(cursor, spec: dict, batch: list, now: str) -> tuple:
+    """
+    Update rows whose key already exists and insert the rest; keys are
+    distinct within a batch. The key column is not unique in the table, so a
+    key matching more than one row is skipped and returned with its match
+    count rather than updating every row that shares it.
+    """
+    if not batch:
+        return [], [], {}
+    key = spec["key"]
+    keys = [values[key] for values in batch]
+    cursor.execute(
+        f"SELECT {key}, COUNT(*) FROM {spec['table']} WHERE {key} IN ({', '.join('?' for _ in keys)}) GROUP BY {key}",
+        keys
+    )
+    matches = dict(cursor.fetchall())
+    ambiguous = {value: count for value, count in matches.items() if count > 1}
+    existing = set(matches) - set(ambiguous)
+
+    to_update = [values for values in batch if values[key] in existing]
+    to_insert = [values for values in batch if values[key] not in matches]
+    other_columns = [column for column in spec["columns"] if column != key]
+    cursor.executemany(
+        f"UPDATE {spec['table']} SET {', '.join(f'{column} = COALESCE(?, {column})' for column in other_columns)}, "
+        f"updated_at = ? WHERE {key} = ?",
+        [[values[column] for column in other_columns] + [now, values[key]] for values in to_update]
+    )
+    _insert_batch(cursor, spec, to_insert, now)
+    return to_insert, to_update, ambiguous
@@ -0,0 +1,86 @@
+"""
+Lesson lookups for the learn router and the assistant.
+
+The lesson bodies in services.lesson_content are imported on first use
+rather than at startup. That first use also builds the by-id, by-framework
+and by-category indexes and the JSON body of every learn response, so later
+requests are a dict lookup returning ready bytes.
+"""
+import hashlib
+import json
+import threading
+from typing import List, Optional
+
+CATEGORIES = {
+    "fundamentals": {"name": "Fundamentals", "description": "Core frameworks for understanding problems"},
+    "prioritization": {"name": "Prioritization", "description": "How to rank and order work"},
+    "decision": {"name": "Decision Making", "description": "Build, buy, or kill frameworks"},
+    "advanced": {"name": "Advanced", "description": "Deep dives and calculations"},
+}
+
+
+def _serialize(data, success: bool = True, error: Optional[str] = None) -> bytes:
+    # Same encoding as FastAPI's JSONResponse, so bodies match the old responses byte for byte.
+    return json.dumps(
+        {"success": success, "data": data, "error": error},
+        ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class LessonIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            from services.lesson_content import LESSONS
+
+            categories = {key: dict(meta, count=0) for key, meta in CATEGORIES.items()}
+            by_id = {}
+            by_framework = {}
+            for lesson in LESSONS:
+                by_id[lesson["id"]] = lesson
+                by_framework.setdefault(lesson["framework"].lower(), []).append(lesson)
+                categories[lesson["category"]]["count"] += 1
+
+            self._lessons = LESSONS
+            self.by_id = by_id
+            self.by_framework = by_framework
+            self.categories = categories
+            self._all_body = _serialize(LESSONS)
+            self._categories_body = _serialize(categories)
+            self._lesson_bodies = {lesson_id: _serialize(lesson) for lesson_id, lesson in by_id.items()}
+            self._framework_bodies = {framework: _serialize(matches) for framework, matches in by_framework.items()}
+            self._no_matches_body = _serialize([])
+            self.not_found_body = _serialize(None, success=False, error="Lesson not found")
+            # One validator for every learn response; it changes whenever any lesson does.
+            self.etag = '"' + hashlib.sha256(self._all_body + self._categories_body).hexdigest()[:32] + '"'
+            self._loaded = True
+
+    def lessons(self) -> List[dict]:
+        self._load()
+        return self._lessons
+
+    def all_body(self) -> bytes:
+        self._load()
+        return self._all_body
+
+    def categories_body(self) -> bytes:
+        self._load()
+        return self._categories_body
+
+    def lesson_body(self, lesson_id: str) -> Optional[bytes]:
+        self._load()
+        return self._lesson_bodies.get(lesson_id)
+
+    def framework_body(self, framework: str) -> bytes:
+        self._load()
+        return self._framework_bodies.get(framework.lower(), self._no_matches_body)
+
+
+lesson_index = LessonIndex()
@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+import httpx
+
+from config import settings
+
+try:
+    from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+    ANTHROPIC_AVAILABLE = True
+except ImportError:
+    ANTHROPIC_AVAILABLE = False
+
+
+class LLMClientManager:
+    """
+    One AsyncAnthropic client per API key, shared across requests so HTTP
+    connections are reused. A semaphore caps how many LLM calls are in
+    flight on this worker; callers beyond the cap wait for a free slot.
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._client = None
+        self._api_key: Optional[str] = None
+        self._transport = transport
+        self._lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(settings.ANTHROPIC_MAX_CONCURRENCY)
+        self.in_flight = 0
+
+    async def get_client(self, api_key: str):
+        async with self._lock:
+            if self._client is None or self._api_key != api_key:
+                if self._client is not None:
+                    await self._client.close()
+                self._client = AsyncAnthropic(
+                    api_key=api_key,
+                    base_url=settings.ANTHROPIC_BASE_URL or None,
+                    max_retries=settings.ANTHROPIC_MAX_RETRIES,
+                    timeout=httpx.Timeout(settings.ANTHROPIC_TIMEOUT, connect=settings.ANTHROPIC_CONNECT_TIMEOUT),
+                    http_client=DefaultAsyncHttpxClient(
+                        limits=httpx.Limits(
+                            max_connections=settings.ANTHROPIC_MAX_CONCURRENCY,
+                            max_keepalive_connections=settings.ANTHROPIC_MAX_CONCURRENCY
+                        ),
+                        transport=self._transport,
+                    ),
+                )
+                self._api_key = api_key
+            return self._client
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+
+    async def close(self):
+        async with self._lock:
+            if self._client is not None:
+                await self._client.close()
+            self._client = None
+            self._api_key = None
+
+
+llm_clients = LLMClientManager()
+
+
+class PromptPrefixMetrics:
+    """
+    Local view of prompt-prefix reuse: bytes of cacheable prefix sent, bytes
+    that repeated a recently sent prefix, and the provider's reported cache
+    token counts.
+    """
+
+    def __init__(self, max_tracked_prefixes: int = 32):
+        self._lock = threading.Lock()
+        self._seen = OrderedDict()
+        self.max_tracked_prefixes = max_tracked_prefixes
+        self.requests = 0
+        self.prefix_bytes = 0
+        self.reused_prefix_bytes = 0
+        self.reused_prefixes = 0
+        self.input_tokens = 0
+        self.cache_read_input_tokens = 0
+        self.cache_creation_input_tokens = 0
+
+    def record_prefix(self, blocks: List[dict]):
+        encoded = "".join(block["text"] for block in blocks).encode("utf-8")
+        digest = hashlib.sha256(encoded).hexdigest()
+        with self._lock:
+            self.requests += 1
+            self.prefix_bytes += len(encoded)
+            if digest in self._seen:
+                self._seen.move_to_end(digest)
+                self.reused_prefixes += 1
+                self.reused_prefix_bytes += len(encoded)
+            else:
+                self._seen[digest] = True
+                if len(self._seen) > self.max_tracked_prefixes:
+                    self._seen.popitem(last=False)
+
+    def record_usage(self, usage):
+        if usage is None:
+            return
+        with self._lock:
+            self.input_tokens += getattr(usage, "input_tokens", None) or 0
+            self.cache_read_input_tokens += getattr(usage, "cache_read_input_tokens", None) or 0
+            self.cache_creation_input_tokens += getattr(usage, "cache_creation_input_tokens", None) or 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "prefix_bytes": self.prefix_bytes,
+                "reused_prefix_bytes": self.reused_prefix_bytes,
+                "reused_prefixes": self.reused_prefixes,
+                "distinct_prefixes_tracked": len(self._seen),
+                "input_tokens": self.input_tokens,
+                "cache_read_input_tokens": self.cache_read_input_tokens,
+                "cache_creation_input_tokens": self.cache_creation_input_tokens,
+            }
+
+
+prompt_metrics = PromptPrefixMetrics()
+
+
+def cached_system_blocks(parts: List[str]) -> List[dict]:
+    """
+    System prompt as text blocks, with a prompt-caching breakpoint on the last
+    one so the provider can reuse the whole prefix across requests.
+    """
+    blocks = [{"type": "text", "text": part} for part in parts if part]
+    if blocks:
+        blocks[-1]["cache_control"] = {"type": "ephemeral"}
+        prompt_metrics.record_prefix(blocks)
+    return blocks
+
+
+async def create_message(api_key: str, **kwargs):
+    client = await llm_clients.get_client(api_key)
+    async with llm_clients.slot():
+        response = await client.messages.create(**kwargs)
+    prompt_metrics.record_usage(response.usage)
+    return response
+
+
+async def stream_message_text(api_key: str, **kwargs):
+    """
+    Yield text deltas as they arrive. Raw stream events are consumed directly
+    so the full reply is never accumulated in memory.
+    """
+    client = await llm_clients.get_client(api_key)
+    async with llm_clients.slot():
+        stream = await client.messages.create(stream=True, **kwargs)
+        try:
+            async for event in stream:
+                if event.type == "message_start":
+                    prompt_metrics.record_usage(event.message.usage)
+                elif event.type == "content_block_delta" and event.delta.type == "text_delta":
+                    yield event.delta.text
+        finally:
+            await stream.close()
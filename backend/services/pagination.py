@@ -0,0 +1,143 @@
+"""
+Shared paging, projection and filtering for list endpoints.
+
+Without limit or cursor a list endpoint returns every matching row, as it
+always has. With either, it returns one page as {"items", "next_cursor"}.
+Pages are ordered by the endpoint's sort key with id as tie-breaker, and the
+next page starts after the last row's key through an indexed comparison, so
+reaching page N costs the same as page 1. A nullable sort key is compared as
+COALESCE(key, <null value>) in both the ORDER BY and that comparison, since
+NULL compares neither above nor below a cursor value.
+"""
+import base64
+import json
+from typing import Callable, List, Optional
+
+from fastapi import HTTPException, Query
+
+from config import settings
+
+
+class PageParams:
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=settings.LIST_MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None),
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.fields = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+
+    @property
+    def paged(self) -> bool:
+        return self.limit is not None or self.cursor is not None
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, size: int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except ValueError:
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def project(items: List[dict], fields: Optional[List[str]]) -> List[dict]:
+    if fields is None:
+        return items
+    if items:
+        unknown = [field for field in fields if field not in items[0]]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return [{field: item[field] for field in fields} for item in items]
+
+
+def sort_keys(order_by: List[tuple]) -> List[tuple]:
+    """
+    (sql_expression, row_key, descending, null_value) for each order_by
+    entry, with nullable keys wrapped in COALESCE so they have a total order.
+    """
+    keys = []
+    for expression, key, descending, *nullable in order_by:
+        null_value = nullable[0] if nullable else None
+        if null_value is not None:
+            literal = "'" + null_value.replace("'", "''") + "'"
+            expression = f"COALESCE({expression}, {literal})"
+        keys.append((expression, key, descending, null_value))
+    return keys
+
+
+def keyset_condition(order_by: List[tuple], values: list) -> tuple:
+    """
+    WHERE clause selecting rows that sort after values under order_by. The
+    leading bound on the first key lets SQLite seek in the matching index
+    instead of sorting the remainder of the table.
+    """
+    keys = sort_keys(order_by)
+    leading, _, leading_descending, _ = keys[0]
+    alternatives = []
+    params = [values[0]]
+    for i, (expression, _, descending, _) in enumerate(keys):
+        terms = [f"{previous} = ?" for previous, _, _, _ in keys[:i]]
+        terms.append(f"{expression} {'<' if descending else '>'} ?")
+        alternatives.append("(" + " AND ".join(terms) + ")")
+        params.extend(values[:i + 1])
+    condition = f"{leading} {'<=' if leading_descending else '>='} ? AND (" + " OR ".join(alternatives) + ")"
+    return condition, params
+
+
+def list_rows(
+    cursor,
+    select_sql: str,
+    order_by: List[tuple],
+    to_dict: Callable,
+    page: PageParams,
+    filters: Optional[dict] = None,
+):
+    """
+    Run select_sql with filters, ordering and paging applied.
+
+    order_by is a list of (sql_expression, row_key, descending) ending with
+    the id, with the value NULL sorts as appended for nullable columns;
+    filters maps sql_expression to a value, or a whole condition containing
+    its ? placeholder to a value, and None values are skipped. Returns the
+    list of rows, or one page when page.paged.
+    """
+    filters = {column: value for column, value in (filters or {}).items() if value is not None}
+    conditions = [column if "?" in column else f"{column} = ?" for column in filters]
+    params = list(filters.values())
+
+    if page.cursor is not None:
+        condition, cursor_params = keyset_condition(order_by, decode_cursor(page.cursor, len(order_by)))
+        conditions.append(condition)
+        params.extend(cursor_params)
+
+    sql = select_sql
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY " + ", ".join(
+        f"{expression} {'DESC' if descending else 'ASC'}" for expression, _, descending, _ in sort_keys(order_by)
+    )
+
+    if not page.paged:
+        cursor.execute(sql, params)
+        return project([to_dict(row) for row in cursor.fetchall()], page.fields)
+
+    limit = page.limit or settings.LIST_DEFAULT_PAGE_SIZE
+    cursor.execute(sql + " LIMIT ?", params + [limit + 1])
+    rows = cursor.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([
+            null_value if rows[-1][key] is None else rows[-1][key]
+            for _, key, _, null_value in sort_keys(order_by)
+        ])
+    return {"items": project([to_dict(row) for row in rows], page.fields), "next_cursor": next_cursor}
@@ -0,0 +1,150 @@
+"""
+Column-wise ROI, gain/pain, health and hours metrics for many products at once.
+
+calculate_portfolio_metrics() gives, element by element, exactly what the
+scalar functions in calculation_service return, including the infinite
+ROI/gain-pain cases and the integer 0 returned for zero value at zero cost.
+NumPy (listed in requirements.txt) does the work; if it is missing, the
+inputs are packed into array('d') columns and the scalar functions are
+applied per element. tests/test_portfolio_metrics.py checks both paths
+against the scalar functions.
+"""
+from array import array
+from typing import Sequence
+
+from services.calculation_service import (
+    HOURS_STATUS_THRESHOLDS,
+    calculate_gain_pain,
+    calculate_hours_progress,
+    calculate_hours_status,
+    calculate_roi,
+    get_health_from_roi,
+)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+INF = float('inf')
+
+HEALTH_BANDS = [
+    (100, "green", "BUILD"),
+    (50, "yellow", "CONSIDER"),
+    (0, "orange", "DEFER"),
+]
+
+
+def roi_midpoint(roi_low: float, roi_high: float):
+    if roi_low != INF and roi_high != INF:
+        return (roi_low + roi_high) / 2
+    if roi_low != INF:
+        return roi_low
+    return None
+
+
+def calculate_portfolio_metrics(
+    estimated_values: Sequence[float],
+    costs_min: Sequence[float],
+    costs_max: Sequence[float],
+    actual_hours: Sequence[float],
+    estimated_hours: Sequence[float],
+) -> dict:
+    """
+    Returns lists keyed roi_low, roi_high, roi_mid, gain_pain_low,
+    gain_pain_high, health, recommendation, hours_progress and hours_status,
+    one entry per input row.
+    """
+    if NUMPY_AVAILABLE:
+        return _metrics_numpy(estimated_values, costs_min, costs_max, actual_hours, estimated_hours)
+    return _metrics_array(estimated_values, costs_min, costs_max, actual_hours, estimated_hours)
+
+
+def _metrics_array(estimated_values, costs_min, costs_max, actual_hours, estimated_hours) -> dict:
+    values = array('d', estimated_values)
+    cost_min = array('d', costs_min)
+    cost_max = array('d', costs_max)
+    actual = array('d', actual_hours)
+    estimated = array('d', estimated_hours)
+
+    columns = {key: [] for key in (
+        "roi_low", "roi_high", "roi_mid", "gain_pain_low", "gain_pain_high",
+        "health", "recommendation", "hours_progress", "hours_status",
+    )}
+    for i in range(len(values)):
+        roi = calculate_roi(values[i], cost_min[i], cost_max[i])
+        gain_pain = calculate_gain_pain(values[i], cost_min[i], cost_max[i])
+        roi_mid = roi_midpoint(roi["roi_low"], roi["roi_high"])
+        health, recommendation = get_health_from_roi(roi_mid)
+        columns["roi_low"].append(roi["roi_low"])
+        columns["roi_high"].append(roi["roi_high"])
+        columns["roi_mid"].append(roi_mid)
+        columns["gain_pain_low"].append(gain_pain["gain_pain_low"])
+        columns["gain_pain_high"].append(gain_pain["gain_pain_high"])
+        columns["health"].append(health)
+        columns["recommendation"].append(recommendation)
+        columns["hours_progress"].append(calculate_hours_progress(actual[i], estimated[i]))
+        columns["hours_status"].append(calculate_hours_status(actual[i], estimated[i]))
+    return columns
+
+
+def _metrics_numpy(estimated_values, costs_min, costs_max, actual_hours, estimated_hours) -> dict:
+    values = np.asarray(estimated_values, dtype=np.float64)
+    cost_min = np.asarray(costs_min, dtype=np.float64)
+    cost_max = np.asarray(costs_max, dtype=np.float64)
+    actual = np.asarray(actual_hours, dtype=np.float64)
+    estimated = np.asarray(estimated_hours, dtype=np.float64)
+
+    no_cost = cost_max <= 0
+    zero_at_no_cost = no_cost & (values == 0)
+    has_min = ~no_cost & (cost_min > 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        roi_low = np.where(no_cost, INF, (values - cost_max) / cost_max * 100)
+        roi_high = np.where(has_min, (values - cost_min) / cost_min * 100, INF)
+        gain_pain_low = np.where(no_cost, INF, values / cost_max)
+        gain_pain_high = np.where(has_min, values / cost_min, INF)
+        ratio = actual / estimated
+    for column in (roi_low, roi_high, gain_pain_low, gain_pain_high):
+        column[zero_at_no_cost] = 0
+
+    low_finite = roi_low != INF
+    high_finite = roi_high != INF
+    roi_mid = np.where(high_finite, (roi_low + roi_high) / 2, roi_low)
+    has_mid = low_finite
+
+    health = np.full(len(values), "red", dtype=object)
+    recommendation = np.full(len(values), "KILL", dtype=object)
+    for threshold, color, action in reversed(HEALTH_BANDS):
+        band = has_mid & (roi_mid >= threshold)
+        health[band] = color
+        recommendation[band] = action
+    health[~has_mid] = "gray"
+    recommendation[~has_mid] = "N/A"
+
+    not_started = (actual == 0) | (estimated <= 0)
+    hours_status = np.select(
+        [not_started, ratio < HOURS_STATUS_THRESHOLDS['under_threshold'], ratio <= HOURS_STATUS_THRESHOLDS['over_threshold']],
+        ["not_started", "under", "on_track"],
+        default="over",
+    ).astype(object)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        progress = np.where(estimated > 0, ratio * 100, 0.0)
+
+    columns = {
+        "roi_low": roi_low.tolist(),
+        "roi_high": roi_high.tolist(),
+        "roi_mid": [mid if finite else None for mid, finite in zip(roi_mid.tolist(), has_mid.tolist())],
+        "gain_pain_low": gain_pain_low.tolist(),
+        "gain_pain_high": gain_pain_high.tolist(),
+        "health": health.tolist(),
+        "recommendation": recommendation.tolist(),
+        # Python's round() is correctly rounded; np.round is not, so finish here.
+        "hours_progress": [round(p, 1) for p in progress.tolist()],
+        "hours_status": hours_status.tolist(),
+    }
+    for i in np.flatnonzero(zero_at_no_cost).tolist():
+        for key in ("roi_low", "roi_high", "gain_pain_low", "gain_pain_high"):
+            columns[key][i] = 0
+    return columns
@@ -0,0 +1,128 @@
+"""
+Product documents (raw valuation output, user flow, specifications, persona
+feedback) live in product_documents, one row per product and doc type,
+instead of on the products row, so list and dashboard queries never read
+them. Content of PRODUCT_DOCUMENT_COMPRESS_MIN_BYTES or more is stored
+zlib-compressed in content_blob; shorter content stays as text.
+"""
+import json
+import sqlite3
+import zlib
+from typing import Iterable, Optional
+
+from config import settings
+
+DOC_TYPES = ['raw-valuation-output', 'user-flow', 'specifications', 'persona-feedback']
+
+# The products columns each doc type used to live in (content, updated_at).
+LEGACY_COLUMNS = {
+    'raw-valuation-output': ('raw_valuation_output', 'raw_valuation_output_updated_at'),
+    'user-flow': ('user_flow', 'user_flow_updated_at'),
+    'specifications': ('specifications', 'specifications_updated_at'),
+    'persona-feedback': ('persona_feedback', 'persona_feedback_updated_at'),
+}
+
+# Per-product {doc_type: {"updated_at", "size_bytes"}} as JSON, answered from
+# idx_product_documents_summary without reading any content. Expects the
+# products table aliased as p.
+DOCUMENT_SUMMARY_SQL = """(SELECT json_group_object(d.doc_type, json_object('updated_at', d.updated_at, 'size_bytes', d.size_bytes))
+    FROM product_documents d WHERE d.product_id = p.id) AS documents_json"""
+
+
+def encode_content(content: Optional[str]) -> tuple:
+    """(content, content_blob, size_bytes) to store for content."""
+    if content is None:
+        return None, None, 0
+    raw = content.encode("utf-8")
+    threshold = settings.PRODUCT_DOCUMENT_COMPRESS_MIN_BYTES
+    if threshold > 0 and len(raw) >= threshold:
+        blob = zlib.compress(raw)
+        if len(blob) < len(raw):
+            return None, blob, len(raw)
+    return content, None, len(raw)
+
+
+def decode_content(row) -> Optional[str]:
+    if row["content_blob"] is not None:
+        return zlib.decompress(row["content_blob"]).decode("utf-8")
+    return row["content"]
+
+
+def parse_summary(documents_json: Optional[str]) -> dict:
+    return json.loads(documents_json) if documents_json else {}
+
+
+def read_document(cursor, product_id: int, doc_type: str) -> Optional[dict]:
+    cursor.execute(
+        "SELECT content, content_blob, updated_at FROM product_documents WHERE product_id = ? AND doc_type = ?",
+        (product_id, doc_type)
+    )
+    row = cursor.fetchone()
+    if not row:
+        return None
+    return {"content": decode_content(row), "updated_at": row["updated_at"]}
+
+
+def write_document(cursor, product_id: int, doc_type: str, content: Optional[str], updated_at: str):
+    text, blob, size = encode_content(content)
+    cursor.execute(
+        """INSERT INTO product_documents (product_id, doc_type, content, content_blob, size_bytes, updated_at)
+           VALUES (?, ?, ?, ?, ?, ?)
+           ON CONFLICT(product_id, doc_type) DO UPDATE SET
+               content = excluded.content, content_blob = excluded.content_blob,
+               size_bytes = excluded.size_bytes, updated_at = excluded.updated_at""",
+        (product_id, doc_type, text, blob, size, updated_at)
+    )
+
+
+def read_all_contents(cursor, product_ids: Optional[Iterable[int]] = None) -> dict:
+    """{product_id: {legacy content column: content}}, for callers that need every document."""
+    sql = "SELECT product_id, doc_type, content, content_blob FROM product_documents"
+    params = []
+    if product_ids is not None:
+        params = list(product_ids)
+        if not params:
+            return {}
+        sql += f" WHERE product_id IN ({', '.join('?' for _ in params)})"
+    cursor.execute(sql, params)
+    documents = {}
+    for row in cursor.fetchall():
+        content_column = LEGACY_COLUMNS[row["doc_type"]][0]
+        documents.setdefault(row["product_id"], {})[content_column] = decode_content(row)
+    return documents
+
+
+def move_documents_out_of_products(cursor) -> dict:
+    """
+    Copy documents still held in products columns into product_documents,
+    keeping their updated_at, then drop those columns. Returns counts.
+    """
+    cursor.execute("PRAGMA table_info(products)")
+    columns = {row[1] for row in cursor.fetchall()}
+    stats = {"documents": 0, "bytes": 0}
+    legacy = [
+        (doc_type, content_col, updated_col)
+        for doc_type, (content_col, updated_col) in LEGACY_COLUMNS.items()
+        if content_col in columns
+    ]
+    for doc_type, content_col, updated_col in legacy:
+        updated_expr = updated_col if updated_col in columns else "NULL"
+        cursor.execute(
+            f"SELECT id, {content_col}, {updated_expr} FROM products "
+            f"WHERE {content_col} IS NOT NULL OR {updated_expr} IS NOT NULL"
+        )
+        for product_id, content, updated_at in cursor.fetchall():
+            write_document(cursor, product_id, doc_type, content, updated_at)
+            stats["documents"] += 1
+            stats["bytes"] += len(content.encode("utf-8")) if content else 0
+
+    for doc_type, content_col, updated_col in legacy:
+        for column in (content_col, updated_col):
+            if column not in columns:
+                continue
+            try:
+                cursor.execute(f"ALTER TABLE products DROP COLUMN {column}")
+            except sqlite3.OperationalError:
+                # SQLite before 3.35 cannot drop columns; empty them instead.
+                cursor.execute(f"UPDATE products SET {column} = NULL WHERE {column} IS NOT NULL")
+    return stats
@@ -0,0 +1,135 @@
+import ast
+import re
+from pathlib import Path
+from typing import List
+
+BACKEND_DIR = Path(__file__).parent.parent
+SQL_DIRS = [BACKEND_DIR / "routers", BACKEND_DIR / "services"]
+
+SQL_START = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+TABLE_ALIAS = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+LOOKUP_PREDICATE = re.compile(
+    r"\bWHERE\b[\s\S]*?((?<![!<>])=\s*(\?|\w+\.\w+)|\bIN\s*\(\s*(\?|SELECT\b))",
+    re.IGNORECASE,
+)
+FORMAT_FIELD = re.compile(r"\{\w*\}")
+EXECUTE_METHODS = {"execute", "executemany"}
+ALIAS_STOPWORDS = {"where", "join", "left", "inner", "outer", "on", "group", "order", "set", "values", "limit", "using"}
+
+
+def _module_strings(tree: ast.Module) -> dict:
+    """Module-level NAME = "..." string constants, so execute(NAME, ...) can be resolved."""
+    strings = {}
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)
+                and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)):
+            strings[node.targets[0].id] = node.value
+    return strings
+
+
+def collect_sql(dirs: List[Path] = SQL_DIRS) -> List[dict]:
+    """
+    Every SQL statement passed to execute() or executemany() as a string
+    literal, or as a module-level string constant, in the given directories.
+    f-strings, concatenations and str.format templates are skipped because
+    their final text is only known at runtime.
+    """
+    statements = []
+    for directory in dirs:
+        for path in sorted(directory.glob("*.py")):
+            tree = ast.parse(path.read_text())
+            module_strings = _module_strings(tree)
+            seen = set()
+            for node in ast.walk(tree):
+                if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                        and node.func.attr in EXECUTE_METHODS and node.args):
+                    continue
+                argument = node.args[0]
+                if isinstance(argument, ast.Name):
+                    argument = module_strings.get(argument.id)
+                if not isinstance(argument, ast.Constant) or not isinstance(argument.value, str):
+                    continue
+                sql = argument.value
+                if not SQL_START.match(sql) or FORMAT_FIELD.search(sql) or id(argument) in seen:
+                    continue
+                seen.add(id(argument))
+                statements.append({"file": f"{directory.name}/{path.name}", "line": argument.lineno, "sql": sql.strip()})
+    return statements
+
+
+def _table_aliases(sql: str) -> dict:
+    aliases = {}
+    for table, alias in TABLE_ALIAS.findall(sql):
+        aliases[table] = table
+        if alias and alias.lower() not in ALIAS_STOPWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def explain_statement(conn, sql: str) -> list:
+    cursor = conn.cursor()
+    cursor.execute(f"EXPLAIN QUERY PLAN {sql}", [None] * sql.count("?"))
+    return [{"id": row[0], "parent": row[1], "detail": row[3]} for row in cursor.fetchall()]
+
+
+def find_full_scans(plan: list, sql: str, aliases: dict, row_counts: dict, min_rows: int) -> list:
+    """
+    A plain SCAN (no index) of a table with more than min_rows rows is flagged
+    when the statement is a lookup (WHERE comparing against a bound parameter or
+    another column), or when the scan is not the outermost loop (an inner join
+    loop or a correlated subquery re-scans it per outer row). Listing and
+    aggregate queries legitimately scan their driving table.
+    """
+    lookup = LOOKUP_PREDICATE.search(sql) is not None
+    # An INSERT's plan also lists the child-table foreign key probes SQLite
+    # compiles in; they only run while deferred violations are outstanding.
+    inserting = sql.lstrip()[:6].upper() == "INSERT"
+    scans = []
+    driving_seen = False
+    for step in plan:
+        is_loop = step["detail"].startswith(("SCAN", "SEARCH"))
+        match = FULL_SCAN.match(step["detail"])
+        outermost = step["parent"] == 0 and is_loop and not driving_seen
+        if step["parent"] == 0 and is_loop:
+            driving_seen = True
+        if not match:
+            continue
+        table = aliases.get(match.group(1), match.group(1))
+        if inserting and table not in aliases.values():
+            continue
+        rows = row_counts.get(table, 0)
+        if rows <= min_rows:
+            continue
+        if lookup or not outermost:
+            scans.append({"table": table, "rows": rows, "detail": step["detail"]})
+    return scans
+
+
+def check_query_plans(conn, min_rows: int = 1000, dirs: List[Path] = SQL_DIRS) -> dict:
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+    row_counts = {}
+    for (table,) in cursor.fetchall():
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        row_counts[table] = cursor.fetchone()[0]
+
+    violations = []
+    errors = []
+    statements = collect_sql(dirs)
+    for statement in statements:
+        try:
+            plan = explain_statement(conn, statement["sql"])
+        except Exception as e:
+            errors.append({**statement, "error": str(e)})
+            continue
+        scans = find_full_scans(plan, statement["sql"], _table_aliases(statement["sql"]), row_counts, min_rows)
+        if scans:
+            violations.append({**statement, "scans": scans})
+
+    return {
+        "checked": len(statements),
+        "min_rows": min_rows,
+        "violations": violations,
+        "errors": errors,
+    }
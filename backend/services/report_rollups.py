@@ -0,0 +1,150 @@
+"""
+Grouped hours, cost and status roll-ups for the products and services reports.
+
+Every entity type is described once in ENTITY_SOURCES. Hours and cost totals
+come from the trigger-maintained cost roll-up tables; task details for all
+active entities of a type are read in one further query.
+"""
+
+ENTITY_SOURCES = {
+    "product": {
+        "table": "products",
+        "tasks_table": "tasks",
+        "allocations_table": "product_software_allocations",
+        "rollup_table": "product_cost_rollup",
+        "foreign_key": "product_id",
+        "active_filter": "e.status IN ('Ideation', 'Approved', 'In Development')",
+        "task_extras": [],
+    },
+    "service": {
+        "table": "services",
+        "tasks_table": "service_tasks",
+        "allocations_table": "service_software_allocations",
+        "rollup_table": "service_cost_rollup",
+        "foreign_key": "service_id",
+        "active_filter": "e.status = 'Active'",
+        "task_extras": [("is_recurring", bool), ("recurrence_type", None)],
+    },
+}
+
+
+def get_hours_status(actual, estimated):
+    if actual == 0:
+        return "not_started"
+    elif actual < estimated * 0.9:
+        return "under"
+    elif actual <= estimated * 1.1:
+        return "on_track"
+    else:
+        return "over"
+
+
+def _progress(actual, estimated):
+    return round((actual / estimated * 100) if estimated > 0 else 0, 1)
+
+
+def _active_ids_sql(source: dict) -> str:
+    return f"SELECT e.id FROM {source['table']} e WHERE {source['active_filter']}"
+
+
+def load_entity_rollups(cursor, entity_type: str) -> dict:
+    """
+    Hours, labor cost, software cost, progress, status and task details for
+    every active entity of entity_type, keyed by entity id. Entities without
+    tasks or software allocations are absent; use empty_rollup() for those.
+    """
+    source = ENTITY_SOURCES[entity_type]
+    fk = source["foreign_key"]
+    active_ids = _active_ids_sql(source)
+
+    cursor.execute(f"""
+        SELECT r.{fk} as entity_id, r.estimated_hours, r.actual_hours,
+               r.labor_cost_min, r.labor_cost_max, r.software_cost
+        FROM {source['rollup_table']} r
+        WHERE r.{fk} IN ({active_ids})
+          AND (r.task_count > 0 OR r.software_cost IS NOT NULL)
+    """)
+    totals = {row["entity_id"]: row for row in cursor.fetchall()}
+
+    extra_columns = "".join(f", t.{column}" for column, _ in source["task_extras"])
+    cursor.execute(f"""
+        SELECT t.{fk} as entity_id, t.name, t.estimated_hours, COALESCE(t.actual_hours, 0) as actual_hours,
+               p.title as position_title{extra_columns}
+        FROM {source['tasks_table']} t
+        JOIN positions p ON t.position_id = p.id
+        WHERE t.{fk} IN ({active_ids})
+        ORDER BY t.{fk}, t.estimated_hours DESC, t.id
+    """)
+    tasks_by_entity = {}
+    for t in cursor.fetchall():
+        task = {
+            "name": t["name"],
+            "position_title": t["position_title"],
+            "estimated_hours": t["estimated_hours"],
+            "actual_hours": t["actual_hours"],
+            "progress": _progress(t["actual_hours"], t["estimated_hours"]),
+            "status": get_hours_status(t["actual_hours"], t["estimated_hours"])
+        }
+        for column, convert in source["task_extras"]:
+            task[column] = convert(t[column]) if convert else t[column]
+        tasks_by_entity.setdefault(t["entity_id"], []).append(task)
+
+    rollups = {}
+    for entity_id, row in totals.items():
+        rollups[entity_id] = _build_rollup(
+            estimated=row["estimated_hours"] or 0,
+            actual=row["actual_hours"] or 0,
+            cost_min=row["labor_cost_min"] or 0,
+            cost_max=row["labor_cost_max"] or 0,
+            software_cost=row["software_cost"] or 0,
+            tasks=tasks_by_entity.get(entity_id, []),
+        )
+    return rollups
+
+
+def empty_rollup() -> dict:
+    return _build_rollup(estimated=0, actual=0, cost_min=0, cost_max=0, software_cost=0, tasks=[])
+
+
+def _build_rollup(estimated, actual, cost_min, cost_max, software_cost, tasks) -> dict:
+    return {
+        "estimated_hours": estimated,
+        "actual_hours": actual,
+        "progress": _progress(actual, estimated),
+        "hours_status": get_hours_status(actual, estimated),
+        "cost_min": cost_min,
+        "cost_max": cost_max,
+        "software_cost": software_cost,
+        "overhead_min": cost_min + software_cost,
+        "overhead_max": cost_max + software_cost,
+        "tasks": tasks,
+    }
+
+
+def load_position_rollups(cursor, entity_type: str) -> list:
+    """Hours per position across all active entities of entity_type, largest first."""
+    source = ENTITY_SOURCES[entity_type]
+    fk = source["foreign_key"]
+    cursor.execute(f"""
+        SELECT p.title,
+               SUM(t.estimated_hours) as estimated,
+               SUM(COALESCE(t.actual_hours, 0)) as actual
+        FROM {source['tasks_table']} t
+        JOIN positions p ON t.position_id = p.id
+        JOIN {source['table']} e ON t.{fk} = e.id
+        WHERE {source['active_filter']}
+        GROUP BY p.id, p.title
+        ORDER BY estimated DESC
+    """)
+    by_position = []
+    for pos in cursor.fetchall():
+        est = pos["estimated"] or 0
+        act = pos["actual"] or 0
+        by_position.append({
+            "position_title": pos["title"],
+            "estimated_hours": est,
+            "actual_hours": act,
+            "progress": _progress(act, est),
+            "status": get_hours_status(act, est)
+        })
+    return by_position
@@ -0,0 +1,185 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from config import settings
+from database import get_connection, get_all_data_versions
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+PRODUCT_COST_TABLES = ["products", "tasks", "positions", "product_software_allocations", "software_costs"]
+SERVICE_COST_TABLES = [
+    "services", "service_types", "service_departments", "service_tasks", "positions",
+    "service_software_allocations", "software_costs",
+]
+
+# Polled read endpoints served with an ETag, and the tables their payload is built from.
+CONDITIONAL_GET_ROUTES = {
+    "/api/dashboard": PRODUCT_COST_TABLES + ["product_service_departments", "service_departments"],
+    "/api/services-dashboard": SERVICE_COST_TABLES,
+    "/api/reports/products": PRODUCT_COST_TABLES + ["service_departments"],
+    "/api/reports/services": SERVICE_COST_TABLES,
+    "/api/valuations/portfolio": ["products", "product_valuations"],
+    "/api/business-units/stats": ["business_units", "products", "services", "business_unit_team"],
+}
+
+
+class DataVersionTracker:
+    """
+    In-memory copy of the data_versions counters.
+
+    The copy is re-read after any mutating request handled by this process,
+    and at least every DATA_VERSION_RECHECK_SECONDS so writes from other
+    processes (manage.py, other workers) are picked up. In between, versions
+    are answered without touching SQLite.
+    """
+
+    def __init__(self, recheck_seconds: float):
+        self.recheck_seconds = recheck_seconds
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._generation = 0
+        self._loaded_generation = -1
+        self._loaded_at = 0.0
+        self.reloads = 0
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+
+    def peek(self, tables: List[str]) -> Optional[int]:
+        """Version for tables from the in-memory copy, or None if it must be re-read."""
+        with self._lock:
+            if self._loaded_generation != self._generation:
+                return None
+            if time.monotonic() - self._loaded_at >= self.recheck_seconds:
+                return None
+            return sum(self._versions.get(table, 0) for table in tables)
+
+    def load(self, tables: List[str]) -> int:
+        with self._lock:
+            generation = self._generation
+        with get_connection() as conn:
+            versions = get_all_data_versions(conn)
+        with self._lock:
+            self._versions = versions
+            self._loaded_generation = generation
+            self._loaded_at = time.monotonic()
+            self.reloads += 1
+        return sum(versions.get(table, 0) for table in tables)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"generation": self._generation, "reloads": self.reloads}
+
+
+class ResponseCache:
+    """LRU of serialized response bodies, each valid for one data version."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key: str, version: int) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, version: int, body: bytes):
+        with self._lock:
+            self._entries[key] = (version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+            }
+
+
+data_version_tracker = DataVersionTracker(settings.DATA_VERSION_RECHECK_SECONDS)
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def response_etag(version: int, query: str) -> str:
+    if not query:
+        return f'"{version}"'
+    digest = hashlib.sha256(query.encode("utf-8")).hexdigest()[:16]
+    return f'"{version}-{digest}"'
+
+
+class ConditionalGetMiddleware(BaseHTTPMiddleware):
+    """
+    ETag / If-None-Match handling for CONDITIONAL_GET_ROUTES. The ETag is the
+    combined data version of the route's tables plus, when there is a query
+    string, a digest of it, so each query variant has its own validator as
+    well as its own cached body. A matching If-None-Match gets a 304 before
+    the route runs, and otherwise the body is served from the response cache
+    while the version is unchanged. Every mutating request invalidates the
+    tracked versions once it has been handled.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        if request.method not in SAFE_METHODS:
+            try:
+                return await call_next(request)
+            finally:
+                data_version_tracker.invalidate()
+
+        tables = CONDITIONAL_GET_ROUTES.get(request.url.path)
+        if request.method != "GET" or tables is None:
+            return await call_next(request)
+
+        version = data_version_tracker.peek(tables)
+        if version is None:
+            version = await run_in_threadpool(data_version_tracker.load, tables)
+        headers = {"ETag": response_etag(version, request.url.query), "Cache-Control": "no-cache"}
+
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            response_cache.record_not_modified()
+            return Response(status_code=304, headers=headers)
+
+        key = f"{request.url.path}?{request.url.query}"
+        body = response_cache.get(key, version)
+        if body is None:
+            response = await call_next(request)
+            if response.status_code != 200:
+                return response
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            response_cache.put(key, version, body)
+        return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,39 @@
+import threading
+from typing import Callable, List
+
+from database import get_connection, get_data_version
+
+
+class VersionedSnapshot:
+    """
+    Caches the result of build() until a write touches one of its source tables.
+
+    The data version is read before building, so a write that lands mid-build
+    only causes one extra rebuild; a stale snapshot is never served as current.
+    Snapshots are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, tables: List[str], build: Callable[[], object]):
+        self.tables = tables
+        self._build = build
+        self._lock = threading.Lock()
+        self._version = None
+        self._value = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self):
+        with get_connection() as conn:
+            version = get_data_version(conn, self.tables)
+            with self._lock:
+                if self._value is not None and self._version == version:
+                    self.hits += 1
+                    return self._value
+                self.misses += 1
+                value = self._build()
+                self._version = version
+                self._value = value
+                return value
+
+    def stats(self) -> dict:
+        return {"version": self._version, "hits": self.hits, "misses": self.misses}
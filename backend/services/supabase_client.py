@@ -0,0 +1,105 @@
+import time
+from typing import Optional
+
+import httpx
+
+from config import settings
+
+
+class SupabaseUnavailable(Exception):
+    """Supabase could not be reached, answered with a 5xx, or the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures, and while open lets
+    calls fail fast instead of waiting on timeouts. After reset_seconds one
+    trial call is let through: success closes the circuit, failure opens it
+    again for another reset_seconds.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if not self._trial_in_flight and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        if self.opened_at is None:
+            state = "closed"
+        elif time.monotonic() - self.opened_at >= self.reset_seconds:
+            state = "half_open"
+        else:
+            state = "open"
+        return {"state": state, "consecutive_failures": self.failures}
+
+
+class SupabaseClient:
+    """
+    One AsyncClient for Supabase auth calls, shared across requests so
+    connections are reused, behind a circuit breaker.
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._transport = transport
+        self.breaker = CircuitBreaker(settings.SUPABASE_BREAKER_THRESHOLD, settings.SUPABASE_BREAKER_RESET_SECONDS)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=settings.SUPABASE_URL,
+                timeout=httpx.Timeout(settings.SUPABASE_TIMEOUT, connect=settings.SUPABASE_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.SUPABASE_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.SUPABASE_MAX_CONNECTIONS
+                ),
+                headers={"apikey": settings.SUPABASE_KEY},
+                transport=self._transport,
+            )
+        return self._client
+
+    async def post(self, path: str, json: dict, headers: Optional[dict] = None) -> httpx.Response:
+        if not self.breaker.allow():
+            raise SupabaseUnavailable("Circuit open after repeated Supabase failures")
+        try:
+            response = await self._get_client().post(path, json=json, headers=headers)
+        except httpx.RequestError as e:
+            self.breaker.record_failure()
+            raise SupabaseUnavailable(str(e) or type(e).__name__) from e
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            raise SupabaseUnavailable(f"Supabase returned {response.status_code}")
+        self.breaker.record_success()
+        return response
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return self.breaker.stats()
+
+
+supabase_client = SupabaseClient()
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 CONFIDENCE_RANGES = {
     "High": (0.9, 1.1),
@@ -327,3 +327,10 @@ def calculate_all(data: dict, product_type: str, effort_hours: Optional[float] =
     )
     
     return results
+
+def calculate_all_batch(items: List[tuple]) -> List[dict]:
+    """
+    calculate_all over (data, product_type, effort_hours) items. Module-level
+    so it can be handed to process-pool workers.
+    """
+    return [calculate_all(data, product_type, effort_hours) for data, product_type, effort_hours in items]
@@ -0,0 +1,132 @@
+"""
+Compact storage for valuation_history snapshots.
+
+Each product's history is a chain of rows in id order. A keyframe row holds
+the whole snapshot; the rows after it hold only the fields that changed since
+the previous row. Both are zlib-compressed JSON in snapshot_blob. A new
+keyframe starts every VALUATION_HISTORY_KEYFRAME_INTERVAL rows, so rebuilding
+any snapshot decodes at most that many rows.
+"""
+import json
+import zlib
+from typing import Optional
+
+from config import settings
+
+KEYFRAME = "key"
+DELTA = "delta"
+
+# Upper bound for "no id limit" in chain queries (SQLite's max INTEGER).
+MAX_ID = 2 ** 63 - 1
+
+
+def _pack(value) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+
+def _unpack(blob: bytes):
+    return json.loads(zlib.decompress(blob))
+
+
+def _same(a, b) -> bool:
+    # 1 == 1.0 and 0 == False, but they serialize differently; keep the exact value.
+    return type(a) is type(b) and a == b
+
+
+def diff_snapshot(previous: dict, current: dict) -> dict:
+    return {
+        "set": {k: v for k, v in current.items() if k not in previous or not _same(previous[k], v)},
+        "unset": [k for k in previous if k not in current],
+    }
+
+
+def apply_delta(previous: dict, delta: dict) -> dict:
+    snapshot = dict(previous)
+    snapshot.update(delta["set"])
+    for key in delta["unset"]:
+        snapshot.pop(key, None)
+    return snapshot
+
+
+def _load_chain(cursor, product_id: int, upto_id: int = MAX_ID) -> list:
+    """Rows from the latest keyframe at or before upto_id through upto_id."""
+    cursor.execute(
+        """SELECT id, snapshot_kind, snapshot_blob FROM valuation_history
+           WHERE product_id = ? AND id <= ? AND id >= COALESCE(
+               (SELECT MAX(id) FROM valuation_history
+                WHERE product_id = ? AND id <= ? AND snapshot_kind = ?), 0)
+           ORDER BY id""",
+        (product_id, upto_id, product_id, upto_id, KEYFRAME)
+    )
+    return cursor.fetchall()
+
+
+def _replay(chain: list) -> Optional[dict]:
+    snapshot = None
+    for row in chain:
+        if row["snapshot_kind"] == KEYFRAME:
+            snapshot = _unpack(row["snapshot_blob"])
+        elif row["snapshot_kind"] == DELTA and snapshot is not None:
+            snapshot = apply_delta(snapshot, _unpack(row["snapshot_blob"]))
+        else:
+            snapshot = None
+    return snapshot
+
+
+def encode_snapshot(cursor, product_id: int, snapshot: dict) -> tuple:
+    """
+    (snapshot_kind, snapshot_blob) for a new history row of product_id,
+    encoded against the product's current latest snapshot.
+    """
+    chain = _load_chain(cursor, product_id)
+    previous = _replay(chain)
+    if previous is None or len(chain) >= settings.VALUATION_HISTORY_KEYFRAME_INTERVAL:
+        return KEYFRAME, _pack(snapshot)
+    return DELTA, _pack(diff_snapshot(previous, snapshot))
+
+
+def reconstruct_snapshot(cursor, product_id: int, history_id: int) -> Optional[dict]:
+    """The full snapshot stored by history row history_id, or None if there is none."""
+    chain = _load_chain(cursor, product_id, history_id)
+    if not chain or chain[-1]["id"] != history_id:
+        return None
+    return _replay(chain)
+
+
+def compact_history(cursor) -> dict:
+    """
+    Re-encode rows that still carry snapshot_json into keyframes and deltas,
+    product by product, and drop the JSON text.
+    """
+    cursor.execute("SELECT DISTINCT product_id FROM valuation_history WHERE snapshot_json IS NOT NULL")
+    product_ids = [row[0] for row in cursor.fetchall()]
+    stats = {"products": len(product_ids), "rows": 0, "bytes_before": 0, "bytes_after": 0}
+    for product_id in product_ids:
+        cursor.execute(
+            "SELECT id, snapshot_json FROM valuation_history WHERE product_id = ? ORDER BY id",
+            (product_id,)
+        )
+        previous = None
+        chain_length = 0
+        updates = []
+        for history_id, snapshot_json in cursor.fetchall():
+            if snapshot_json is None:
+                previous = None
+                continue
+            snapshot = json.loads(snapshot_json)
+            if previous is None or chain_length >= settings.VALUATION_HISTORY_KEYFRAME_INTERVAL:
+                kind, blob = KEYFRAME, _pack(snapshot)
+                chain_length = 1
+            else:
+                kind, blob = DELTA, _pack(diff_snapshot(previous, snapshot))
+                chain_length += 1
+            previous = snapshot
+            updates.append((kind, blob, history_id))
+            stats["bytes_before"] += len(snapshot_json.encode("utf-8"))
+            stats["bytes_after"] += len(blob)
+        cursor.executemany(
+            "UPDATE valuation_history SET snapshot_kind = ?, snapshot_blob = ?, snapshot_json = NULL WHERE id = ?",
+            updates
+        )
+        stats["rows"] += len(updates)
+    return stats
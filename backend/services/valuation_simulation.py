@@ -0,0 +1,375 @@
+"""
+Monte Carlo simulation of product valuations.
+
+Uncertain inputs are drawn from triangular distributions and pushed through
+the valuation_calculator formulas for all samples at once. The confidence
+band from CONFIDENCE_RANGES becomes one more triangular multiplier instead of
+a fixed low/high pair, and ROI is taken against a cost drawn between the
+product's minimum and maximum total cost. Without NumPy, each sample is
+evaluated with calculate_all.
+"""
+import hashlib
+import json
+import multiprocessing
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from config import settings
+from services.valuation_calculator import CONFIDENCE_RANGES, calculate_all
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+PERCENTILES = (10, 50, 90)
+
+# Numeric inputs that feed total_economic_value or the strategic multiplier
+SIMULATABLE_FIELDS = [
+    "hours_saved_per_user_per_week", "number_of_affected_users", "average_hourly_cost",
+    "current_errors_per_month", "cost_per_error", "expected_error_reduction_percent",
+    "alternative_solution_cost",
+    "risk_probability_percent", "risk_cost_if_occurs", "risk_reduction_percent",
+    "process_standardization_annual_value", "expected_adoption_rate_percent",
+    "time_to_full_productivity_weeks", "training_cost_per_user",
+    "total_potential_customers", "serviceable_percent", "achievable_market_share_percent", "average_deal_size",
+    "year_1_customers", "year_2_customers", "year_3_customers",
+    "customer_acquisition_cost", "annual_marketing_spend", "annual_sales_team_cost",
+    "internal_value_weight", "external_value_weight",
+    "reach_score", "impact_score", "strategic_alignment_score", "differentiation_score", "urgency_score",
+]
+
+# Inputs given a default +/- spread around their stored value unless the
+# request supplies an explicit range
+DEFAULT_UNCERTAIN_FIELDS = [
+    "hours_saved_per_user_per_week", "number_of_affected_users", "expected_error_reduction_percent",
+    "expected_adoption_rate_percent", "achievable_market_share_percent", "average_deal_size",
+    "year_1_customers", "year_2_customers", "year_3_customers",
+]
+
+VALUE_INPUT_FIELDS = SIMULATABLE_FIELDS + ["alternative_solution_period", "confidence_level"]
+
+
+def resolve_ranges(data: dict, ranges: Optional[dict] = None, spread: Optional[float] = None) -> dict:
+    """
+    Triangular (low, mode, high) for every simulated input: explicit ranges
+    first, then DEFAULT_UNCERTAIN_FIELDS that have a stored value, spread
+    around it. Percent inputs are kept within 0-100.
+    """
+    spread = settings.SIMULATION_DEFAULT_SPREAD if spread is None else spread
+    resolved = {}
+    for field in DEFAULT_UNCERTAIN_FIELDS:
+        value = data.get(field)
+        if value is None:
+            continue
+        low, high = value * (1 - spread), value * (1 + spread)
+        if field.endswith("_percent"):
+            low, high = max(low, 0), min(high, 100)
+        resolved[field] = {"low": low, "mode": value, "high": high}
+
+    for field, bounds in (ranges or {}).items():
+        if field not in SIMULATABLE_FIELDS:
+            raise ValueError(f"{field} is not a simulated valuation input")
+        low, high = bounds["low"], bounds["high"]
+        if low > high:
+            raise ValueError(f"{field}: low must not exceed high")
+        mode = bounds.get("mode")
+        if mode is None:
+            stored = data.get(field)
+            mode = stored if stored is not None and low <= stored <= high else (low + high) / 2
+        if not low <= mode <= high:
+            raise ValueError(f"{field}: mode must lie between low and high")
+        resolved[field] = {"low": low, "mode": mode, "high": high}
+    return resolved
+
+
+def simulation_key(job: dict) -> str:
+    payload = {
+        "data": {field: job["data"].get(field) for field in VALUE_INPUT_FIELDS},
+        "product_type": job["product_type"],
+        "cost_min": job["cost_min"],
+        "cost_max": job["cost_max"],
+        "ranges": job["ranges"],
+        "samples": job["samples"],
+        "seed": job.get("seed"),
+        "confidence_ranges": CONFIDENCE_RANGES,
+        "numpy": NUMPY_AVAILABLE,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def simulate_valuation(job: dict) -> dict:
+    """
+    Run one simulation. job holds data (the stored valuation), product_type,
+    cost_min, cost_max, ranges (from resolve_ranges), samples and an optional
+    seed; without a seed one is derived from the inputs so results repeat.
+    Module-level so it can run in process-pool workers.
+    """
+    seed = job.get("seed")
+    if seed is None:
+        seed = int(simulation_key(job)[:12], 16)
+    low_mult, high_mult = CONFIDENCE_RANGES.get(job["data"].get("confidence_level") or "Medium", (0.6, 1.0))
+    if NUMPY_AVAILABLE:
+        final_values, rois = _simulate_numpy(job, seed, low_mult, high_mult)
+    else:
+        final_values, rois = _simulate_python(job, seed, low_mult, high_mult)
+    return {
+        "samples": job["samples"],
+        "seed": seed,
+        "inputs": job["ranges"],
+        "confidence_multiplier": {"low": low_mult, "high": high_mult},
+        "final_value": _summarize(final_values),
+        "roi": _summarize(rois),
+        "probability_roi_positive": _probability_positive(rois),
+    }
+
+
+def _summarize(values) -> Optional[dict]:
+    if NUMPY_AVAILABLE:
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return None
+        summary = {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+        summary["mean"] = float(values.mean())
+    else:
+        values = sorted(v for v in values if v is not None)
+        if not values:
+            return None
+        summary = {f"p{p}": _percentile(values, p) for p in PERCENTILES}
+        summary["mean"] = sum(values) / len(values)
+    summary["valid_samples"] = len(values)
+    return summary
+
+
+def _percentile(ordered: list, p: float) -> float:
+    """Linear-interpolation percentile, the same method as numpy.percentile's default."""
+    position = (len(ordered) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _probability_positive(rois) -> Optional[float]:
+    if NUMPY_AVAILABLE:
+        valid = rois[~np.isnan(rois)]
+        return float((valid > 0).mean()) if len(valid) else None
+    valid = [r for r in rois if r is not None]
+    return sum(1 for r in valid if r > 0) / len(valid) if valid else None
+
+
+def _simulate_python(job: dict, seed: int, low_mult: float, high_mult: float):
+    rnd = random.Random(seed)
+    data = job["data"]
+    cost_min, cost_max = job["cost_min"], job["cost_max"]
+    final_values = []
+    rois = []
+    for _ in range(job["samples"]):
+        sample = dict(data)
+        for field in sorted(job["ranges"]):
+            bounds = job["ranges"][field]
+            sample[field] = rnd.triangular(bounds["low"], bounds["high"], bounds["mode"])
+        confidence = rnd.triangular(low_mult, high_mult)
+        cost = rnd.triangular(cost_min, cost_max) if cost_max > 0 else None
+
+        results = calculate_all(sample, job["product_type"])
+        base_value = results["total_economic_value"]
+        if base_value is None:
+            final_values.append(None)
+            rois.append(None)
+            continue
+        final_value = base_value * (results["strategic_multiplier"] or 1.0) * confidence
+        final_values.append(final_value)
+        rois.append((final_value - cost) / cost * 100 if cost is not None and cost > 0 else None)
+    return final_values, rois
+
+
+def _simulate_numpy(job: dict, seed: int, low_mult: float, high_mult: float):
+    rng = np.random.default_rng(seed)
+    n = job["samples"]
+    sampled = {}
+    for field in sorted(job["ranges"]):
+        bounds = job["ranges"][field]
+        sampled[field] = _triangular(rng, bounds["low"], bounds["mode"], bounds["high"], n)
+    confidence = _triangular(rng, low_mult, (low_mult + high_mult) / 2, high_mult, n)
+    cost_min, cost_max = job["cost_min"], job["cost_max"]
+    cost = _triangular(rng, cost_min, (cost_min + cost_max) / 2, cost_max, n) if cost_max > 0 else None
+
+    base_value, strategic_multiplier = economic_value_vectorized(job["data"], job["product_type"], sampled, n)
+    strat_mult = np.where(np.isnan(strategic_multiplier) | (strategic_multiplier == 0), 1.0, strategic_multiplier)
+    final_values = base_value * strat_mult * confidence
+    if cost is None:
+        rois = np.full(n, np.nan)
+    else:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rois = np.where(cost > 0, (final_values - cost) / cost * 100, np.nan)
+    return final_values, rois
+
+
+def _triangular(rng, low: float, mode: float, high: float, n: int):
+    if low == high:
+        return np.full(n, float(low))
+    return rng.triangular(low, mode, high, n)
+
+
+def economic_value_vectorized(data: dict, product_type: str, sampled: dict, n: int):
+    """
+    total_economic_value and strategic_multiplier from calculate_all, for n
+    samples at once. Inputs come from sampled when present, else data; NaN
+    stands for None throughout.
+    """
+    def col(field):
+        if field in sampled:
+            return sampled[field]
+        value = data.get(field)
+        return np.full(n, np.nan if value is None else float(value))
+
+    def present(x):
+        return ~np.isnan(x)
+
+    def or_zero(x):
+        return np.where(present(x), x, 0.0)
+
+    def truthy(x):
+        return present(x) & (x != 0)
+
+    users = col("number_of_affected_users")
+    time_savings = col("hours_saved_per_user_per_week") * users * col("average_hourly_cost") * 52
+    error_reduction = col("current_errors_per_month") * 12 * col("cost_per_error") * (col("expected_error_reduction_percent") / 100)
+
+    alternative_cost = col("alternative_solution_cost")
+    period = data.get("alternative_solution_period")
+    if period == "Monthly":
+        cost_avoidance = alternative_cost * 12
+    elif period == "Annually":
+        cost_avoidance = alternative_cost
+    elif period == "One-time":
+        cost_avoidance = alternative_cost / 3
+    else:
+        cost_avoidance = np.full(n, np.nan)
+
+    risk_mitigation = (col("risk_probability_percent") / 100) * col("risk_cost_if_occurs") * (col("risk_reduction_percent") / 100)
+
+    raw_internal_total = np.zeros(n)
+    for value in (time_savings, error_reduction, cost_avoidance, risk_mitigation):
+        raw_internal_total = raw_internal_total + or_zero(value)
+    raw_internal_total = raw_internal_total + or_zero(col("process_standardization_annual_value"))
+
+    adoption_rate_percent = col("expected_adoption_rate_percent")
+    adoption_rate = np.where(truthy(adoption_rate_percent), adoption_rate_percent, 100) / 100
+    weeks = col("time_to_full_productivity_weeks")
+    ramp_factor = np.where(truthy(weeks) & (weeks > 0), np.clip(1 - (weeks / 52 / 2), 0.5, 1.0), 1.0)
+    adjusted = np.where(raw_internal_total > 0, raw_internal_total * adoption_rate * ramp_factor, np.nan)
+    training_cost = col("training_cost_per_user") * users * adoption_rate
+
+    internal_total = np.where(truthy(adjusted), adjusted, raw_internal_total)
+    internal_total = np.where(truthy(training_cost), internal_total - training_cost, internal_total)
+
+    deal_size = col("average_deal_size")
+    three_year = col("total_potential_customers") * (col("serviceable_percent") / 100)
+    three_year = three_year * (col("achievable_market_share_percent") / 100)
+    three_year = three_year * deal_size * 3
+    customers = [col(f"year_{year}_customers") for year in (1, 2, 3)]
+    yearly = [c * deal_size for c in customers]
+    all_years = truthy(yearly[0]) & truthy(yearly[1]) & truthy(yearly[2])
+    three_year = np.where(all_years, yearly[0] + yearly[1] + yearly[2], three_year)
+
+    total_customers = or_zero(customers[0]) + or_zero(customers[1]) + or_zero(customers[2])
+    total_cac = total_customers * or_zero(col("customer_acquisition_cost"))
+    total_gtm = 3 * (or_zero(col("annual_marketing_spend")) + or_zero(col("annual_sales_team_cost")))
+    net_three_year = three_year - total_cac - total_gtm
+    external = np.where(truthy(net_three_year), net_three_year, three_year)
+
+    if product_type == "Internal":
+        economic_value = np.where(internal_total > 0, internal_total, np.nan)
+    elif product_type == "External":
+        economic_value = external
+    else:
+        internal_weight = col("internal_value_weight")
+        external_weight = col("external_value_weight")
+        internal_weight = np.where(truthy(internal_weight), internal_weight, 50) / 100
+        external_weight = np.where(truthy(external_weight), external_weight, 50) / 100
+        internal_val = np.where(internal_total > 0, internal_total, 0)
+        external_val = or_zero(external)
+        economic_value = np.where(
+            (internal_val > 0) | (external_val > 0),
+            (internal_val * internal_weight) + (external_val * external_weight),
+            np.nan
+        )
+
+    normalized = [
+        (col("reach_score") - 1) / 4,
+        (col("impact_score") - 0.25) / 2.75,
+        (col("strategic_alignment_score") - 1) / 4,
+        (col("differentiation_score") - 1) / 4,
+        (col("urgency_score") - 1) / 4,
+    ]
+    total = np.zeros(n)
+    for value in normalized:
+        total = total + value
+    strategic_multiplier = 0.5 + ((total / len(normalized)) * 1.5)
+    return economic_value, strategic_multiplier
+
+
+class SimulationCache:
+    """LRU of simulation results keyed by simulation_key()."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: str, result: dict):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+simulation_cache = SimulationCache(settings.SIMULATION_CACHE_SIZE)
+
+
+def run_simulations(jobs: List[dict], workers: Optional[int] = None) -> List[dict]:
+    """
+    Results for jobs in order, served from the cache where possible. Uncached
+    jobs run in a process pool when workers > 1 and there is more than one,
+    with at most VALUATION_MAX_WORKERS processes.
+    """
+    workers = settings.SIMULATION_WORKERS if workers is None else workers
+    workers = min(workers, settings.VALUATION_MAX_WORKERS)
+    keys = [simulation_key(job) for job in jobs]
+    results = [simulation_cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+
+    if workers > 1 and len(missing) > 1:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(missing)), mp_context=context) as executor:
+            computed = list(executor.map(simulate_valuation, [jobs[i] for i in missing]))
+    else:
+        computed = [simulate_valuation(jobs[i]) for i in missing]
+
+    for i, result in zip(missing, computed):
+        simulation_cache.put(keys[i], result)
+        results[i] = result
+    return [dict(result, cached=i not in missing) for i, result in enumerate(results)]
@@ -1,10 +1,230 @@
+import asyncio
+import json
+import time
 import httpx
 import logging
 from typing import Optional, List
+from starlette.concurrency import run_in_threadpool
 import config
+from config import settings
+from database import get_connection, transaction
 
 logger = logging.getLogger(__name__)
 
+RETRYABLE_STATUS_CODES = {408, 425, 429}
+
+
+class WebhookOutbox:
+    """
+    Durable outbound queue for TaskFlow webhooks.
+
+    Events are written to the webhook_outbox table and delivered by a worker
+    task over one pooled HTTP client, so they survive restarts and failed
+    deliveries are retried with exponential backoff. Each endpoint gets its
+    own concurrency limit.
+
+    Several processes may run a worker against the same database. A worker
+    claims a row by moving it to 'sending' with a lease in the same
+    transaction that selects it, so no other worker picks it up while the
+    lease holds. Delivery is at-least-once: a row whose lease expires, for
+    instance because its process stopped mid-send, is claimed and sent again.
+
+    The outbox is not transactional with the change an event reports: the
+    row is written in its own commit after the handler has committed its
+    change, so a crash between the two commits loses the event. SQLite work
+    runs in the thread pool, never on the event loop.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._in_flight = {}
+        self._endpoint_slots = {}
+
+    def enqueue(self, endpoint: str, event: str, payload: dict) -> int:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO webhook_outbox (endpoint, event, payload, next_attempt_at) VALUES (?, ?, ?, ?)",
+                (endpoint, event, json.dumps(payload), time.time())
+            )
+            conn.commit()
+            outbox_id = cursor.lastrowid
+        self._notify()
+        return outbox_id
+
+    def _notify(self):
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._client = httpx.AsyncClient(
+            timeout=settings.WEBHOOK_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.WEBHOOK_MAX_CONNECTIONS
+            ),
+            headers={"X-Webhook-Secret": config.TASKFLOW_WEBHOOK_SECRET}
+        )
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the worker. Undelivered events are sent again once their lease expires."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        tasks = [self._task, *self._in_flight.values()]
+        for task in self._in_flight.values():
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._client.aclose()
+        self._task = None
+        self._client = None
+        self._wake = None
+        self._loop = None
+        self._in_flight = {}
+        self._endpoint_slots = {}
+
+    def stats(self) -> dict:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT status, COUNT(*) as count FROM webhook_outbox GROUP BY status")
+            counts = {row["status"]: row["count"] for row in cursor.fetchall()}
+        return {
+            "pending": counts.get("pending", 0),
+            "sending": counts.get("sending", 0),
+            "delivered": counts.get("delivered", 0),
+            "failed": counts.get("failed", 0),
+            "in_flight": len(self._in_flight),
+            "worker_running": self._task is not None
+        }
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            timeout = settings.WEBHOOK_POLL_INTERVAL
+            try:
+                due, next_at = await run_in_threadpool(self._claim_due, set(self._in_flight))
+                for row in due:
+                    task = asyncio.create_task(self._deliver(row))
+                    self._in_flight[row["id"]] = task
+                if next_at is not None:
+                    timeout = min(timeout, max(next_at - time.time(), 0))
+            except Exception:
+                logger.exception("Webhook outbox worker failed to read the queue")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _claim_due(self, in_flight: set) -> tuple:
+        now = time.time()
+        with transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT * FROM webhook_outbox
+                   WHERE (status = 'pending' AND next_attempt_at <= ?) OR (status = 'sending' AND lease_expires_at <= ?)
+                   ORDER BY next_attempt_at, id LIMIT 100""",
+                (now, now)
+            )
+            due = [dict(row) for row in cursor.fetchall() if row["id"] not in in_flight]
+            if due:
+                lease_expires_at = now + settings.WEBHOOK_LEASE_SECONDS
+                cursor.executemany(
+                    "UPDATE webhook_outbox SET status = 'sending', lease_expires_at = ? WHERE id = ?",
+                    [(lease_expires_at, row["id"]) for row in due]
+                )
+            cursor.execute(
+                """SELECT MIN(at) FROM (
+                       SELECT MIN(next_attempt_at) AS at FROM webhook_outbox WHERE status = 'pending' AND next_attempt_at > ?
+                       UNION ALL
+                       SELECT MIN(lease_expires_at) FROM webhook_outbox WHERE status = 'sending' AND lease_expires_at > ?
+                   )""",
+                (now, now)
+            )
+            next_at = cursor.fetchone()[0]
+        return due, next_at
+
+    def _renew_lease(self, outbox_id: int):
+        with get_connection() as conn:
+            conn.execute(
+                "UPDATE webhook_outbox SET lease_expires_at = ? WHERE id = ? AND status = 'sending'",
+                (time.time() + settings.WEBHOOK_LEASE_SECONDS, outbox_id)
+            )
+            conn.commit()
+
+    def _endpoint_slot(self, endpoint: str) -> asyncio.Semaphore:
+        if endpoint not in self._endpoint_slots:
+            self._endpoint_slots[endpoint] = asyncio.Semaphore(settings.WEBHOOK_ENDPOINT_CONCURRENCY)
+        return self._endpoint_slots[endpoint]
+
+    async def _deliver(self, row: dict):
+        url = f"{config.TASKFLOW_WEBHOOK_URL}{row['endpoint']}"
+        error = None
+        retry = True
+        try:
+            async with self._endpoint_slot(row["endpoint"]):
+                # Time spent waiting for the slot should not eat into the send's lease.
+                await run_in_threadpool(self._renew_lease, row["id"])
+                response = await self._client.post(url, content=row["payload"], headers={"Content-Type": "application/json"})
+            if 200 <= response.status_code < 300:
+                logger.info(f"Webhook {row['event']} #{row['id']} delivered to {row['endpoint']}")
+            else:
+                error = f"{response.status_code} - {response.text}"
+                retry = response.status_code >= 500 or response.status_code in RETRYABLE_STATUS_CODES
+        except httpx.TimeoutException:
+            error = "timeout"
+        except httpx.RequestError as e:
+            error = str(e)
+        finally:
+            self._in_flight.pop(row["id"], None)
+
+        if error is None:
+            await run_in_threadpool(self._mark_delivered, row["id"])
+        else:
+            await run_in_threadpool(self._mark_failed_attempt, row, error, retry)
+        self._wake.set()
+
+    def _mark_delivered(self, outbox_id: int):
+        with get_connection() as conn:
+            conn.execute(
+                "UPDATE webhook_outbox SET status = 'delivered', attempts = attempts + 1, lease_expires_at = NULL, last_error = NULL, delivered_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (outbox_id,)
+            )
+            conn.commit()
+
+    def _mark_failed_attempt(self, row: dict, error: str, retry: bool):
+        attempts = row["attempts"] + 1
+        if retry and attempts < settings.WEBHOOK_MAX_ATTEMPTS:
+            delay = min(settings.WEBHOOK_RETRY_BASE_DELAY * 2 ** (attempts - 1), settings.WEBHOOK_RETRY_MAX_DELAY)
+            status = "pending"
+            logger.warning(f"Webhook {row['event']} #{row['id']} failed (attempt {attempts}): {error}; retrying in {delay:g}s")
+        else:
+            delay = 0
+            status = "failed"
+            logger.error(f"Webhook {row['event']} #{row['id']} failed permanently after {attempts} attempt(s): {error}")
+        with get_connection() as conn:
+            conn.execute(
+                "UPDATE webhook_outbox SET status = ?, attempts = ?, next_attempt_at = ?, lease_expires_at = NULL, last_error = ? WHERE id = ?",
+                (status, attempts, time.time() + delay, error, row["id"])
+            )
+            conn.commit()
+
+
+webhook_outbox = WebhookOutbox()
+
+
+async def _queue_webhook(endpoint: str, payload: dict) -> dict:
+    outbox_id = await run_in_threadpool(webhook_outbox.enqueue, endpoint, payload["event"], payload)
+    return {"success": True, "queued": True, "outbox_id": outbox_id}
+
+
 async def send_product_webhook(
     product_id: int,
     name: str,
@@ -16,8 +236,7 @@ async def send_product_webhook(
         logger.info(f"Webhooks disabled, skipping product.in_development for product {product_id}")
         return {"success": False, "reason": "webhooks_disabled"}
 
-    url = f"{config.TASKFLOW_WEBHOOK_URL}/product"
-    payload = {
+    return await _queue_webhook("/product", {
         "event": "product.in_development",
         "product_id": product_id,
         "name": name,
@@ -25,29 +244,7 @@ async def send_product_webhook(
         "product_type": "product",
         "is_internal": product_type == "Internal",
         "service_department": service_department
-    }
-    headers = {
-        "Content-Type": "application/json",
-        "X-Webhook-Secret": config.TASKFLOW_WEBHOOK_SECRET
-    }
-
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(url, json=payload, headers=headers)
-
-            if response.status_code == 201:
-                data = response.json()
-                logger.info(f"Webhook sent successfully for product {product_id}, TF project_id={data.get('project_id')}")
-                return {"success": True, "project_id": data.get("project_id")}
-            else:
-                logger.error(f"Webhook failed for product {product_id}: {response.status_code} - {response.text}")
-                return {"success": False, "status_code": response.status_code, "error": response.text}
-    except httpx.TimeoutException:
-        logger.error(f"Webhook timeout for product {product_id}")
-        return {"success": False, "error": "timeout"}
-    except httpx.RequestError as e:
-        logger.error(f"Webhook request error for product {product_id}: {e}")
-        return {"success": False, "error": str(e)}
+    })
 
 
 async def send_service_webhook(
@@ -61,37 +258,14 @@ async def send_service_webhook(
         logger.info(f"Webhooks disabled, skipping service.created for service {service_id}")
         return {"success": False, "reason": "webhooks_disabled"}
 
-    url = f"{config.TASKFLOW_WEBHOOK_URL}/service"
-    payload = {
+    return await _queue_webhook("/service", {
         "event": "service.created",
         "service_id": service_id,
         "name": name,
         "description": description,
         "department_name": department_name,
         "business_unit": business_unit
-    }
-    headers = {
-        "Content-Type": "application/json",
-        "X-Webhook-Secret": config.TASKFLOW_WEBHOOK_SECRET
-    }
-
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(url, json=payload, headers=headers)
-
-            if response.status_code == 201:
-                data = response.json()
-                logger.info(f"Webhook sent successfully for service {service_id}, TF project_id={data.get('project_id')}")
-                return {"success": True, "project_id": data.get("project_id")}
-            else:
-                logger.error(f"Webhook failed for service {service_id}: {response.status_code} - {response.text}")
-                return {"success": False, "status_code": response.status_code, "error": response.text}
-    except httpx.TimeoutException:
-        logger.error(f"Webhook timeout for service {service_id}")
-        return {"success": False, "error": "timeout"}
-    except httpx.RequestError as e:
-        logger.error(f"Webhook request error for service {service_id}: {e}")
-        return {"success": False, "error": str(e)}
+    })
 
 
 async def send_department_webhook(
@@ -105,36 +279,13 @@ async def send_department_webhook(
         logger.info(f"Webhooks disabled, skipping {event} for department {department_id}")
         return {"success": False, "reason": "webhooks_disabled"}
 
-    url = f"{config.TASKFLOW_WEBHOOK_URL}/department"
-    payload = {
+    return await _queue_webhook("/department", {
         "event": event,
         "department_id": department_id,
         "name": name,
         "manager_name": manager_name,
         "positions": positions or []
-    }
-    headers = {
-        "Content-Type": "application/json",
-        "X-Webhook-Secret": config.TASKFLOW_WEBHOOK_SECRET
-    }
-
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(url, json=payload, headers=headers)
-
-            if response.status_code == 201:
-                data = response.json()
-                logger.info(f"Department webhook sent successfully for department {department_id}")
-                return {"success": True, "data": data}
-            else:
-                logger.error(f"Department webhook failed for department {department_id}: {response.status_code} - {response.text}")
-                return {"success": False, "status_code": response.status_code, "error": response.text}
-    except httpx.TimeoutException:
-        logger.error(f"Department webhook timeout for department {department_id}")
-        return {"success": False, "error": "timeout"}
-    except httpx.RequestError as e:
-        logger.error(f"Department webhook request error for department {department_id}: {e}")
-        return {"success": False, "error": str(e)}
+    })
 
 
 async def send_position_webhook(
@@ -147,35 +298,12 @@ async def send_position_webhook(
         logger.info(f"Webhooks disabled, skipping {event} for position {position_id}")
         return {"success": False, "reason": "webhooks_disabled"}
 
-    url = f"{config.TASKFLOW_WEBHOOK_URL}/position"
-    payload = {
+    return await _queue_webhook("/position", {
         "event": event,
         "position_id": position_id,
         "name": name,
         "department_id": department_id
-    }
-    headers = {
-        "Content-Type": "application/json",
-        "X-Webhook-Secret": config.TASKFLOW_WEBHOOK_SECRET
-    }
-
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(url, json=payload, headers=headers)
-
-            if response.status_code == 201:
-                data = response.json()
-                logger.info(f"Position webhook sent successfully for position {position_id}")
-                return {"success": True, "data": data}
-            else:
-                logger.error(f"Position webhook failed for position {position_id}: {response.status_code} - {response.text}")
-                return {"success": False, "status_code": response.status_code, "error": response.text}
-    except httpx.TimeoutException:
-        logger.error(f"Position webhook timeout for position {position_id}")
-        return {"success": False, "error": "timeout"}
-    except httpx.RequestError as e:
-        logger.error(f"Position webhook request error for position {position_id}: {e}")
-        return {"success": False, "error": str(e)}
+    })
 
 
 async def send_business_unit_webhook(
@@ -189,36 +317,13 @@ async def send_business_unit_webhook(
         logger.info(f"Webhooks disabled, skipping {event} for business unit {business_unit_id}")
         return {"success": False, "reason": "webhooks_disabled"}
 
-    url = f"{config.TASKFLOW_WEBHOOK_URL}/business-unit"
-    payload = {
+    return await _queue_webhook("/business-unit", {
         "event": event,
         "business_unit_id": business_unit_id,
         "name": name,
         "description": description,
         "head_position_id": head_position_id
-    }
-    headers = {
-        "Content-Type": "application/json",
-        "X-Webhook-Secret": config.TASKFLOW_WEBHOOK_SECRET
-    }
-
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(url, json=payload, headers=headers)
-
-            if response.status_code == 201:
-                data = response.json()
-                logger.info(f"Business unit webhook sent successfully for BU {business_unit_id}")
-                return {"success": True, "data": data}
-            else:
-                logger.error(f"Business unit webhook failed for BU {business_unit_id}: {response.status_code} - {response.text}")
-                return {"success": False, "status_code": response.status_code, "error": response.text}
-    except httpx.TimeoutException:
-        logger.error(f"Business unit webhook timeout for BU {business_unit_id}")
-        return {"success": False, "error": "timeout"}
-    except httpx.RequestError as e:
-        logger.error(f"Business unit webhook request error for BU {business_unit_id}: {e}")
-        return {"success": False, "error": str(e)}
+    })
 
 
 async def send_business_unit_team_webhook(
@@ -229,31 +334,8 @@ async def send_business_unit_team_webhook(
         logger.info(f"Webhooks disabled, skipping business_unit_team.updated for BU {business_unit_id}")
         return {"success": False, "reason": "webhooks_disabled"}
 
-    url = f"{config.TASKFLOW_WEBHOOK_URL}/business-unit-team"
-    payload = {
+    return await _queue_webhook("/business-unit-team", {
         "event": "business_unit_team.updated",
         "business_unit_id": business_unit_id,
         "positions": positions
-    }
-    headers = {
-        "Content-Type": "application/json",
-        "X-Webhook-Secret": config.TASKFLOW_WEBHOOK_SECRET
-    }
-
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(url, json=payload, headers=headers)
-
-            if response.status_code == 201:
-                data = response.json()
-                logger.info(f"Business unit team webhook sent successfully for BU {business_unit_id}")
-                return {"success": True, "data": data}
-            else:
-                logger.error(f"Business unit team webhook failed for BU {business_unit_id}: {response.status_code} - {response.text}")
-                return {"success": False, "status_code": response.status_code, "error": response.text}
-    except httpx.TimeoutException:
-        logger.error(f"Business unit team webhook timeout for BU {business_unit_id}")
-        return {"success": False, "error": "timeout"}
-    except httpx.RequestError as e:
-        logger.error(f"Business unit team webhook request error for BU {business_unit_id}: {e}")
-        return {"success": False, "error": str(e)}
+    })
@@ -0,0 +1,41 @@
+"""
+Tests run from backend/ with `python -m pytest`. Each test that touches the
+database gets its own SQLite file; remote services (Anthropic, Supabase) are
+replaced with httpx.MockTransport handlers, so nothing needs network access.
+"""
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import database  # noqa: E402
+import services.llm_client as llm_client  # noqa: E402
+from config import settings  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    database.pool.close_all()
+    monkeypatch.setattr(database, "DATABASE_PATH", tmp_path / "jarvis.db")
+    database.init_db()
+    yield
+    database.pool.close_all()
+
+
+@pytest.fixture
+def stub_llm(monkeypatch):
+    """Install an LLMClientManager whose HTTP calls go to handler instead of the network."""
+    monkeypatch.setattr(settings, "ANTHROPIC_BASE_URL", "http://anthropic.test")
+    monkeypatch.setattr(settings, "ANTHROPIC_MAX_RETRIES", 0)
+
+    def install(handler, max_concurrency: int = None):
+        if max_concurrency is not None:
+            monkeypatch.setattr(settings, "ANTHROPIC_MAX_CONCURRENCY", max_concurrency)
+        manager = llm_client.LLMClientManager(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(llm_client, "llm_clients", manager)
+        return manager
+
+    return install
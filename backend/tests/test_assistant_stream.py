@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import services.llm_client as llm_client
+from routers.assistant import FrameworkRefTracker, extract_framework_refs
+from services.llm_client import stream_message_text
+
+pytestmark = pytest.mark.skipif(not llm_client.ANTHROPIC_AVAILABLE, reason="anthropic SDK not installed")
+
+# "minimum viable segment" and "rice" are each split across deltas.
+DELTAS = ["Start with your minimum vi", "able segment, then score features with RI", "CE.", " Nothing else."]
+
+
+def sse_body(deltas: list) -> bytes:
+    events = [
+        ("message_start", {"type": "message_start", "message": {
+            "id": "msg_test", "type": "message", "role": "assistant", "model": "test-model", "content": [],
+            "stop_reason": None, "stop_sequence": None, "usage": {"input_tokens": 12, "output_tokens": 1},
+        }}),
+        ("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}),
+    ]
+    events += [
+        ("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": text}})
+        for text in deltas
+    ]
+    events += [
+        ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+        ("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                           "usage": {"output_tokens": 20}}),
+        ("message_stop", {"type": "message_stop"}),
+    ]
+    return "".join(f"event: {name}\ndata: {json.dumps(data)}\n\n" for name, data in events).encode("utf-8")
+
+
+async def chunked(body: bytes, size: int = 37):
+    # Network chunks deliberately cut through SSE lines.
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def streaming_handler(request):
+    assert json.loads(request.content)["stream"] is True
+    return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=chunked(sse_body(DELTAS)))
+
+
+def test_stream_message_text_yields_each_delta(stub_llm):
+    manager = stub_llm(streaming_handler)
+
+    async def run():
+        texts = [text async for text in stream_message_text(
+            "key", model="m", max_tokens=10, messages=[{"role": "user", "content": "hi"}]
+        )]
+        await manager.close()
+        return texts
+
+    texts = asyncio.run(run())
+    assert texts == DELTAS
+    assert manager.in_flight == 0
+
+
+def test_framework_ref_tracker_matches_full_text_across_chunk_boundaries():
+    tracker = FrameworkRefTracker()
+    for text in DELTAS:
+        tracker.feed(text)
+    full = "".join(DELTAS)
+    assert tracker.refs() == extract_framework_refs(full)
+    assert {"MVS", "RICE"} <= set(tracker.refs())
+
+
+def test_chat_stream_endpoint(stub_llm, db, monkeypatch):
+    stub_llm(streaming_handler)
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "key")
+    from main import app
+
+    with TestClient(app) as client:
+        response = client.post("/api/assistant/stream", json={"message": "hi"})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    texts = [event["text"] for event in events if event["type"] == "text"]
+    assert "".join(texts) == "".join(DELTAS)
+    assert events[-1] == {"type": "done", "framework_refs": extract_framework_refs("".join(DELTAS))}
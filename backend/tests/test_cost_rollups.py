@@ -0,0 +1,61 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from database import get_connection
+from services.cost_rollups import verify_cost_rollups
+
+
+@pytest.fixture
+def client(db):
+    from main import app
+
+    with TestClient(app) as client:
+        assert client.post("/api/admin/seed-demo-data").status_code == 200
+        yield client
+
+
+def assert_rollups_fresh():
+    with get_connection() as conn:
+        report = verify_cost_rollups(conn)
+    assert report["product"]["mismatches"] == []
+    assert report["service"]["mismatches"] == []
+
+
+def test_deleting_a_position_refreshes_rollups(client):
+    # A position with both product and service tasks, so both roll-ups are exercised.
+    with get_connection() as conn:
+        position_id, product_id = conn.execute(
+            "SELECT position_id, product_id FROM tasks WHERE position_id IN (SELECT position_id FROM service_tasks) ORDER BY id LIMIT 1"
+        ).fetchone()
+        remaining_hours = conn.execute(
+            "SELECT COALESCE(SUM(estimated_hours), 0) FROM tasks WHERE product_id = ? AND position_id != ?",
+            (product_id, position_id)
+        ).fetchone()[0]
+
+    assert client.delete(f"/api/positions/{position_id}").status_code == 200
+
+    assert_rollups_fresh()
+    report = client.get("/api/reports/products").json()["data"]
+    product = next(p for p in report["products"] if p["id"] == product_id)
+    assert product["estimated_hours"] == remaining_hours
+
+
+def test_deleting_software_refreshes_rollups(client):
+    with get_connection() as conn:
+        software_id, product_id = conn.execute(
+            """SELECT software_id, product_id FROM product_software_allocations
+               WHERE software_id IN (SELECT software_id FROM service_software_allocations) ORDER BY id LIMIT 1"""
+        ).fetchone()
+        remaining = conn.execute(
+            """SELECT SUM(sc.monthly_cost * a.allocation_percent / 100)
+               FROM product_software_allocations a JOIN software_costs sc ON a.software_id = sc.id
+               WHERE a.product_id = ? AND a.software_id != ?""",
+            (product_id, software_id)
+        ).fetchone()[0]
+
+    assert client.delete(f"/api/software/{software_id}").status_code == 200
+
+    assert_rollups_fresh()
+    with get_connection() as conn:
+        stored = conn.execute("SELECT software_cost FROM product_cost_rollup WHERE product_id = ?", (product_id,)).fetchone()[0]
+    assert stored == remaining
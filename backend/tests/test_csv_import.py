@@ -0,0 +1,77 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from config import settings
+from database import get_connection
+
+
+@pytest.fixture
+def client(db):
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+def upload(client, resource: str, text: str, mode: str = "insert", encoding: str = "utf-8"):
+    response = client.post(
+        f"/api/{resource}/upload-csv",
+        params={"mode": mode},
+        files={"file": (f"{resource}.csv", text.encode(encoding), "text/csv")},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+
+def software_rows():
+    with get_connection() as conn:
+        return {row["name"]: dict(row) for row in conn.execute("SELECT name, description, monthly_cost FROM software_costs")}
+
+
+def test_upsert_batches_and_counts(client, monkeypatch):
+    monkeypatch.setattr(settings, "CSV_IMPORT_BATCH_SIZE", 2)
+    upload(client, "software", "Name,Description,Monthly Cost\nA,first,10\nB,second,20\n")
+
+    data = upload(
+        client, "software",
+        "Name,Description,Monthly Cost\nA,,11\nC,third,30\nB,changed,21\nD,,40\nC,,31\nbad,,-1\n",
+        mode="upsert",
+    )
+
+    assert (data["created_count"], data["updated_count"], data["error_count"]) == (2, 3, 1)
+    assert data["rows"] == 6
+    assert data["errors"] == ["Row 7: Monthly cost must be >= 0"]
+    assert software_rows() == {
+        "A": {"name": "A", "description": "first", "monthly_cost": 11},
+        "B": {"name": "B", "description": "changed", "monthly_cost": 21},
+        "C": {"name": "C", "description": "third", "monthly_cost": 31},
+        "D": {"name": "D", "description": None, "monthly_cost": 40},
+    }
+
+
+def test_upsert_refuses_keys_shared_by_several_rows(client):
+    upload(client, "positions", "Title,Department,Hourly Cost Min,Hourly Cost Max\nEngineer,R&D,50,80\nEngineer,Ops,40,60\nDesigner,R&D,45,70\n")
+
+    data = upload(
+        client, "positions",
+        "Title,Department,Hourly Cost Min,Hourly Cost Max\nEngineer,R&D,90,120\nDesigner,Design,45,75\n",
+        mode="upsert",
+    )
+
+    assert (data["created_count"], data["updated_count"]) == (0, 1)
+    assert data["errors"] == ["Row 2: title 'Engineer' matches 2 existing rows; update them individually"]
+    with get_connection() as conn:
+        rows = conn.execute("SELECT title, department, hourly_cost_max FROM positions ORDER BY id").fetchall()
+    assert [tuple(row) for row in rows] == [("Engineer", "R&D", 80), ("Engineer", "Ops", 60), ("Designer", "Design", 75)]
+
+
+def test_latin1_fallback_rereads_from_the_start(client, monkeypatch):
+    # Rows from the failed UTF-8 attempt must be rolled back, not imported twice.
+    monkeypatch.setattr(settings, "CSV_IMPORT_BATCH_SIZE", 1)
+    text = "Name,Description,Monthly Cost\nPlain,ascii,1\nCafé,crème,2\n"
+
+    data = upload(client, "software", text, encoding="latin-1")
+
+    assert data["created_count"] == 2 and data["error_count"] == 0
+    assert software_rows()["Café"]["description"] == "crème"
+    assert set(software_rows()) == {"Plain", "Café"}
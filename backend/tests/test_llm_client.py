@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import services.llm_client as llm_client
+from services.llm_client import create_message
+
+pytestmark = pytest.mark.skipif(not llm_client.ANTHROPIC_AVAILABLE, reason="anthropic SDK not installed")
+
+
+def message_body(text: str) -> dict:
+    return {
+        "id": "msg_test",
+        "type": "message",
+        "role": "assistant",
+        "model": "test-model",
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": 5, "cache_read_input_tokens": 4},
+    }
+
+
+def test_create_message_uses_shared_client(stub_llm):
+    seen = []
+
+    def handler(request):
+        seen.append((request.url.path, request.headers["x-api-key"], json.loads(request.content)))
+        return httpx.Response(200, json=message_body("hello"))
+
+    manager = stub_llm(handler)
+
+    async def run():
+        first = await create_message("key-1", model="m", max_tokens=10, messages=[{"role": "user", "content": "hi"}])
+        client = await manager.get_client("key-1")
+        second = await create_message("key-1", model="m", max_tokens=10, messages=[{"role": "user", "content": "hi"}])
+        same_client = client is await manager.get_client("key-1")
+        replaced = client is not await manager.get_client("key-2")
+        await manager.close()
+        return first, second, same_client, replaced
+
+    first, second, same_client, replaced = asyncio.run(run())
+    assert first.content[0].text == "hello" and second.content[0].text == "hello"
+    assert same_client and replaced
+    assert [path for path, _, _ in seen] == ["/v1/messages", "/v1/messages"]
+    assert all(key == "key-1" for _, key, _ in seen)
+    assert seen[0][2]["messages"] == [{"role": "user", "content": "hi"}]
+
+
+def test_concurrency_is_capped_by_semaphore(stub_llm):
+    active = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.02)
+        active -= 1
+        return httpx.Response(200, json=message_body("ok"))
+
+    manager = stub_llm(handler, max_concurrency=2)
+
+    async def run():
+        replies = await asyncio.gather(*[
+            create_message("key", model="m", max_tokens=10, messages=[{"role": "user", "content": str(i)}])
+            for i in range(6)
+        ])
+        await manager.close()
+        return replies
+
+    replies = asyncio.run(run())
+    assert len(replies) == 6
+    assert peak == 2
+    assert manager.in_flight == 0
+
+
+def test_chat_maps_provider_errors_to_error_payload(stub_llm, db, monkeypatch):
+    def handler(request):
+        return httpx.Response(529, json={"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}})
+
+    stub_llm(handler)
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "key")
+    from main import app
+
+    with TestClient(app) as client:
+        body = client.post("/api/assistant", json={"message": "hi"}).json()
+        stream = client.post("/api/assistant/stream", json={"message": "hi"}).text
+
+    assert body["success"] is False and body["data"] is None
+    assert "Overloaded" in body["error"]
+    events = [json.loads(line[len("data: "):]) for line in stream.splitlines() if line.startswith("data: ")]
+    assert events[-1]["type"] == "error" and "Overloaded" in events[-1]["error"]
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+import services.portfolio_metrics as portfolio_metrics
+from services.calculation_service import (
+    calculate_gain_pain,
+    calculate_hours_progress,
+    calculate_hours_status,
+    calculate_roi,
+    get_health_from_roi,
+)
+
+# Values that land on the branch edges of the scalar functions: zero and
+# negative costs, zero value, ROI exactly at a health band and hours ratios
+# exactly at the status thresholds.
+EDGE_AMOUNTS = [0, 0.0, -1.0, 1.0, 2.0, 3.0, 10.0, 90.0, 100.0, 110.0, 150.0, 200.0]
+
+
+def draw_amount(rng):
+    choice = rng.random()
+    if choice < 0.4:
+        return rng.choice(EDGE_AMOUNTS)
+    if choice < 0.5:
+        return float(rng.randint(-50, 50))
+    return rng.uniform(-1e3, 1e6)
+
+
+def draw_rows(rng, count):
+    rows = []
+    for _ in range(count):
+        value, cost_min, cost_max, actual, estimated = (draw_amount(rng) for _ in range(5))
+        if rng.random() < 0.2:
+            # ROI midpoint of exactly 0, 50 or 100 when both costs match.
+            cost_min = cost_max = abs(cost_max) or 1.0
+            value = cost_max * rng.choice([1, 1.5, 2])
+        rows.append((value, cost_min, cost_max, actual, estimated))
+    return rows
+
+
+def scalar_metrics(value, cost_min, cost_max, actual, estimated):
+    roi = calculate_roi(value, cost_min, cost_max)
+    gain_pain = calculate_gain_pain(value, cost_min, cost_max)
+    roi_mid = portfolio_metrics.roi_midpoint(roi["roi_low"], roi["roi_high"])
+    health, recommendation = get_health_from_roi(roi_mid)
+    return {
+        "roi_low": roi["roi_low"],
+        "roi_high": roi["roi_high"],
+        "roi_mid": roi_mid,
+        "gain_pain_low": gain_pain["gain_pain_low"],
+        "gain_pain_high": gain_pain["gain_pain_high"],
+        "health": health,
+        "recommendation": recommendation,
+        "hours_progress": calculate_hours_progress(actual, estimated),
+        "hours_status": calculate_hours_status(actual, estimated),
+    }
+
+
+@pytest.mark.parametrize("use_numpy", [
+    pytest.param(True, marks=pytest.mark.skipif(not portfolio_metrics.NUMPY_AVAILABLE, reason="numpy not installed")),
+    False,
+])
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_scalar_functions(monkeypatch, use_numpy, seed):
+    monkeypatch.setattr(portfolio_metrics, "NUMPY_AVAILABLE", use_numpy)
+    rows = draw_rows(random.Random(seed), 400)
+
+    columns = portfolio_metrics.calculate_portfolio_metrics(*zip(*rows))
+
+    for i, row in enumerate(rows):
+        expected = scalar_metrics(*row)
+        actual = {key: columns[key][i] for key in expected}
+        # repr() also tells int 0 from 0.0 and compares inf and None exactly.
+        assert {k: repr(v) for k, v in actual.items()} == {k: repr(v) for k, v in expected.items()}, row
+
+
+def test_empty_input():
+    columns = portfolio_metrics.calculate_portfolio_metrics([], [], [], [], [])
+    assert all(column == [] for column in columns.values())
@@ -0,0 +1,142 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import database
+from config import settings
+from database import get_connection
+from services.product_documents import read_document, write_document
+
+
+@pytest.fixture
+def compress_over_64_bytes(monkeypatch):
+    monkeypatch.setattr(settings, "PRODUCT_DOCUMENT_COMPRESS_MIN_BYTES", 64)
+
+
+@pytest.fixture
+def client(db):
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+def create_product(client) -> int:
+    return client.post("/api/products", json={"name": "Docs"}).json()["data"]["id"]
+
+
+def stored_row(product_id: int, doc_type: str):
+    with get_connection() as conn:
+        return conn.execute(
+            "SELECT content, content_blob, size_bytes FROM product_documents WHERE product_id = ? AND doc_type = ?",
+            (product_id, doc_type)
+        ).fetchone()
+
+
+def test_legacy_columns_move_into_product_documents(db, compress_over_64_bytes):
+    long_flow = "step -> " * 40
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        for column in ("raw_valuation_output", "raw_valuation_output_updated_at", "user_flow",
+                       "user_flow_updated_at", "specifications", "specifications_updated_at"):
+            cursor.execute(f"ALTER TABLE products ADD COLUMN {column} TEXT")
+        cursor.execute(
+            """INSERT INTO products (name, raw_valuation_output, raw_valuation_output_updated_at,
+                   user_flow, user_flow_updated_at, specifications_updated_at)
+               VALUES ('Legacy', 'Saves 2h/week', '2024-01-01', ?, '2024-01-02', '2024-01-03')""",
+            (long_flow,)
+        )
+        product_id = cursor.lastrowid
+        cursor.execute("INSERT INTO products (name) VALUES ('Empty')")
+
+        database.migrate_product_documents(cursor)
+        conn.commit()
+
+        assert read_document(cursor, product_id, "raw-valuation-output") == {"content": "Saves 2h/week", "updated_at": "2024-01-01"}
+        assert read_document(cursor, product_id, "user-flow") == {"content": long_flow, "updated_at": "2024-01-02"}
+        assert read_document(cursor, product_id, "specifications") == {"content": None, "updated_at": "2024-01-03"}
+        assert cursor.execute("SELECT COUNT(*) FROM product_documents").fetchone()[0] == 3
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(products)")}
+    assert "user_flow" not in columns and "raw_valuation_output_updated_at" not in columns
+    assert stored_row(product_id, "user-flow")["content_blob"] is not None
+
+
+def test_documents_round_trip_through_compression(db, compress_over_64_bytes):
+    short = "Short note"
+    long = "Persona feedback: très utile. " * 20
+    with get_connection() as conn:
+        product_id = conn.execute("INSERT INTO products (name) VALUES ('P')").lastrowid
+        cursor = conn.cursor()
+        write_document(cursor, product_id, "user-flow", short, "2024-01-01")
+        write_document(cursor, product_id, "persona-feedback", long, "2024-01-02")
+        conn.commit()
+
+        assert read_document(cursor, product_id, "user-flow")["content"] == short
+        assert read_document(cursor, product_id, "persona-feedback")["content"] == long
+
+        # Rewriting below the threshold goes back to plain text.
+        write_document(cursor, product_id, "persona-feedback", short, "2024-01-03")
+        conn.commit()
+        assert read_document(cursor, product_id, "persona-feedback") == {"content": short, "updated_at": "2024-01-03"}
+
+    plain = stored_row(product_id, "user-flow")
+    assert (plain["content"], plain["content_blob"], plain["size_bytes"]) == (short, None, len(short))
+    rewritten = stored_row(product_id, "persona-feedback")
+    assert rewritten["content_blob"] is None and rewritten["size_bytes"] == len(short)
+
+
+def test_large_document_is_stored_compressed(db, compress_over_64_bytes):
+    long = "Persona feedback: très utile. " * 20
+    with get_connection() as conn:
+        product_id = conn.execute("INSERT INTO products (name) VALUES ('P')").lastrowid
+        write_document(conn.cursor(), product_id, "persona-feedback", long, "2024-01-02")
+        conn.commit()
+
+    row = stored_row(product_id, "persona-feedback")
+    assert row["content"] is None
+    assert row["size_bytes"] == len(long.encode("utf-8"))
+    assert len(row["content_blob"]) < row["size_bytes"]
+
+
+def test_product_detail_summarises_documents_without_content(client):
+    product_id = create_product(client)
+    assert client.get(f"/api/products/{product_id}").json()["data"]["documents"] == {}
+
+    saved = client.put(f"/api/products/{product_id}/documents/raw-valuation-output", json={"content": "Saves 2h/week"})
+    assert saved.status_code == 200
+
+    product = client.get(f"/api/products/{product_id}").json()["data"]
+    assert product["documents"] == {
+        "raw-valuation-output": {"updated_at": saved.json()["data"]["updated_at"], "size_bytes": len("Saves 2h/week")}
+    }
+    assert "Saves 2h/week" not in str(product)
+
+
+def test_other_documents_stay_locked_until_raw_output_has_content(client):
+    product_id = create_product(client)
+    url = f"/api/products/{product_id}/documents"
+
+    locked = client.get(f"{url}/user-flow").json()["data"]
+    assert locked["locked"] is True and locked["lock_reason"] == "Complete Raw Valuation Output first"
+    assert client.put(f"{url}/user-flow", json={"content": "Flow"}).status_code == 403
+
+    assert client.put(f"{url}/raw-valuation-output", json={"content": "   "}).status_code == 200
+    assert client.get(f"{url}/user-flow").json()["data"]["locked"] is True
+
+    assert client.put(f"{url}/raw-valuation-output", json={"content": "Saves 2h/week"}).status_code == 200
+    assert client.put(f"{url}/user-flow", json={"content": "Flow"}).status_code == 200
+    unlocked = client.get(f"{url}/user-flow").json()["data"]
+    assert (unlocked["locked"], unlocked["content"]) == (False, "Flow")
+
+
+def test_deleting_a_product_removes_its_documents(client):
+    product_id = create_product(client)
+    other_id = create_product(client)
+    for pid in (product_id, other_id):
+        client.put(f"/api/products/{pid}/documents/raw-valuation-output", json={"content": "Saves 2h/week"})
+    client.put(f"/api/products/{product_id}/documents/user-flow", json={"content": "Flow"})
+
+    assert client.delete(f"/api/products/{product_id}").status_code == 200
+
+    with get_connection() as conn:
+        remaining = conn.execute("SELECT product_id FROM product_documents").fetchall()
+    assert [row["product_id"] for row in remaining] == [other_id]
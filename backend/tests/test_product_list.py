@@ -0,0 +1,55 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from database import get_connection
+
+
+@pytest.fixture
+def client(db):
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+def walk_pages(client, url: str, limit: int) -> list:
+    ids = []
+    cursor = None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        page = client.get(url, params=params).json()["data"]
+        ids.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def test_paging_covers_rows_with_null_sort_key_once(client):
+    created = ["2025-01-02", None, "2025-01-01", None, "2025-01-02", None, "2025-01-03"]
+    with get_connection() as conn:
+        for i, created_at in enumerate(created):
+            conn.execute("INSERT INTO products (name, created_at) VALUES (?, ?)", (f"P{i}", created_at))
+        conn.commit()
+
+    unpaged = [item["id"] for item in client.get("/api/products").json()["data"]]
+    assert len(unpaged) == len(created)
+    for limit in (1, 2, 3):
+        assert walk_pages(client, "/api/products", limit) == unpaged
+
+
+def test_department_filter_uses_department_assignments(client):
+    with get_connection() as conn:
+        lead = conn.execute("INSERT INTO service_departments (name) VALUES ('Engineering')").lastrowid
+        other = conn.execute("INSERT INTO service_departments (name) VALUES ('Design')").lastrowid
+        assigned = conn.execute("INSERT INTO products (name, service_department) VALUES ('Assigned', NULL)").lastrowid
+        legacy = conn.execute("INSERT INTO products (name, service_department) VALUES ('Legacy', 'Engineering')").lastrowid
+        conn.execute(
+            "INSERT INTO product_service_departments (product_id, department_id, role) VALUES (?, ?, 'lead'), (?, ?, 'supporting')",
+            (assigned, lead, legacy, other)
+        )
+        conn.commit()
+
+    engineering = client.get("/api/products", params={"department": "Engineering"}).json()["data"]
+    design = client.get("/api/products", params={"department": "Design"}).json()["data"]
+    assert [item["id"] for item in engineering] == [assigned]
+    assert [item["id"] for item in design] == [legacy]
@@ -0,0 +1,90 @@
+import pytest
+
+import auth
+from auth import RateLimiter, SQLiteRateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 600.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(auth.time, "time", clock.time)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_limiter(request, tmp_path):
+    def make(limit: int = 3):
+        if request.param == "sqlite":
+            return SQLiteRateLimiter(tmp_path / "rate_limits.db", requests_per_minute=limit)
+        return RateLimiter(requests_per_minute=limit, stripes=1)
+    return make
+
+
+def test_limit_is_enforced_per_key(clock, make_limiter):
+    limiter = make_limiter()
+
+    assert [limiter.is_allowed("a") for _ in range(4)] == [True, True, True, False]
+    assert limiter.is_allowed("b")
+    assert limiter.get_retry_after("a") == 60
+    clock.now += 10
+    assert limiter.get_retry_after("a") == 50
+    assert limiter.get_retry_after("unseen") == 0
+
+
+def test_previous_window_is_weighted_after_rollover(clock, make_limiter):
+    limiter = make_limiter()
+    for _ in range(3):
+        limiter.is_allowed("a")
+
+    # At the rollover the previous window still counts in full.
+    clock.now = 660.0
+    assert not limiter.is_allowed("a")
+
+    # A sixth of the way in, half a request has slid out of the window.
+    clock.now = 670.0
+    assert limiter.is_allowed("a")
+    assert not limiter.is_allowed("a")
+    # The estimate falls back under the limit just after 680.
+    retry_after = limiter.get_retry_after("a")
+    assert 10 <= retry_after <= 11
+
+    clock.now = 679.0
+    assert not limiter.is_allowed("a")
+    clock.now = 670.0 + retry_after + 0.5
+    assert limiter.is_allowed("a")
+
+    # Two windows later nothing is left.
+    clock.now = 800.0
+    assert [limiter.is_allowed("a") for _ in range(4)] == [True, True, True, False]
+
+
+def test_idle_keys_are_evicted_after_two_windows(clock, make_limiter):
+    # The SQLite backend sweeps at most once a window, so check a window apart.
+    limiter = make_limiter()
+    limiter.is_allowed("idle")
+
+    clock.now = 700.0
+    limiter.is_allowed("busy")
+    assert limiter.tracked_keys() == 2
+
+    clock.now = 761.0
+    limiter.is_allowed("busy")
+    assert limiter.tracked_keys() == 1
+
+
+def test_sqlite_limiters_on_one_file_share_the_limit(clock, tmp_path):
+    first = SQLiteRateLimiter(tmp_path / "rate_limits.db", requests_per_minute=3)
+    second = SQLiteRateLimiter(tmp_path / "rate_limits.db", requests_per_minute=3)
+
+    assert [first.is_allowed("a"), second.is_allowed("a"), first.is_allowed("a")] == [True, True, True]
+    assert not second.is_allowed("a")
+    assert not first.is_allowed("a")
+    assert second.get_retry_after("a") == 60
@@ -0,0 +1,28 @@
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client(db):
+    from main import app
+
+    with TestClient(app) as client:
+        assert client.post("/api/admin/seed-demo-data").status_code == 200
+        yield client
+
+
+def test_query_variants_get_their_own_body_and_etag(client):
+    week = client.get("/api/reports/products", params={"period": "7"})
+    month = client.get("/api/reports/products", params={"period": "30"})
+    plain = client.get("/api/reports/products")
+
+    assert week.json()["data"]["period_days"] == 7
+    assert month.json()["data"]["period_days"] == 30
+    assert len({week.headers["etag"], month.headers["etag"], plain.headers["etag"]}) == 3
+
+    again = client.get("/api/reports/products", params={"period": "7"})
+    assert again.json()["data"]["period_days"] == 7
+
+    revalidate = {"If-None-Match": week.headers["etag"]}
+    assert client.get("/api/reports/products", params={"period": "7"}, headers=revalidate).status_code == 304
+    assert client.get("/api/reports/products", params={"period": "30"}, headers=revalidate).status_code == 200
@@ -0,0 +1,152 @@
+import asyncio
+import time
+
+import httpx
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+import routers.auth_router as auth_router
+import services.auth_service as auth_service
+import services.supabase_client as supabase_client
+from config import settings
+from services.supabase_client import SupabaseClient, SupabaseUnavailable
+
+JWT_SECRET = "test-jwt-secret-with-at-least-32-bytes"
+ADMIN_EMAIL = "admin@productjarvis.io"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(supabase_client.time, "monotonic", clock.monotonic)
+    return clock
+
+
+@pytest.fixture
+def stub_supabase(monkeypatch):
+    """Install a SupabaseClient whose HTTP calls go to handler instead of the network."""
+    monkeypatch.setattr(settings, "SUPABASE_URL", "http://supabase.test")
+    monkeypatch.setattr(settings, "SUPABASE_KEY", "service-key")
+    monkeypatch.setattr(settings, "SUPABASE_BREAKER_THRESHOLD", 2)
+    monkeypatch.setattr(settings, "SUPABASE_BREAKER_RESET_SECONDS", 30)
+
+    def install(handler):
+        import main
+
+        client = SupabaseClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(auth_service, "supabase_client", client)
+        monkeypatch.setattr(main, "supabase_client", client)
+        return client
+    return install
+
+
+def test_breaker_opens_half_opens_and_closes(stub_supabase, clock):
+    replies = []
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(replies.pop(0), json={})
+
+    client = stub_supabase(handler)
+
+    async def post():
+        return await client.post("/auth/v1/token", json={})
+
+    async def run():
+        replies.extend([503, 503])
+        for _ in range(2):
+            with pytest.raises(SupabaseUnavailable):
+                await post()
+        assert client.stats() == {"state": "open", "consecutive_failures": 2}
+
+        # Open: fail fast without calling Supabase.
+        with pytest.raises(SupabaseUnavailable, match="Circuit open"):
+            await post()
+        assert len(calls) == 2
+
+        # Half-open: exactly one trial goes through; a failed trial reopens.
+        clock.now += 30
+        assert client.stats()["state"] == "half_open"
+        assert client.breaker.allow() and not client.breaker.allow()
+        client.breaker._trial_in_flight = False
+        replies.append(502)
+        with pytest.raises(SupabaseUnavailable, match="502"):
+            await post()
+        assert client.stats()["state"] == "open" and len(calls) == 3
+
+        # A successful trial closes the circuit.
+        clock.now += 30
+        replies.extend([200, 200])
+        assert (await post()).status_code == 200
+        assert client.stats() == {"state": "closed", "consecutive_failures": 0}
+        assert (await post()).status_code == 200
+        await client.close()
+
+    asyncio.run(run())
+    assert len(calls) == 5
+
+
+def test_connection_errors_count_as_failures(stub_supabase, clock):
+    def handler(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    client = stub_supabase(handler)
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(SupabaseUnavailable, match="connection refused"):
+                await client.post("/auth/v1/token", json={})
+        await client.close()
+
+    asyncio.run(run())
+    assert client.stats()["state"] == "open"
+
+
+def test_login_then_validate_token(db, stub_supabase, clock, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_MODE", "supabase")
+    monkeypatch.setattr(settings, "SUPABASE_JWT_SECRET", JWT_SECRET)
+    monkeypatch.setattr(auth_router, "auth_service", auth_service.SupabaseAuthService())
+    auth_service.token_cache.clear()
+    access_token = jwt.encode(
+        {"email": ADMIN_EMAIL, "aud": "authenticated", "exp": int(time.time()) + 3600}, JWT_SECRET, algorithm="HS256"
+    )
+    seen = []
+    down = False
+
+    def handler(request):
+        seen.append((request.url.path, request.url.params.get("grant_type"), request.headers["apikey"]))
+        if down:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"access_token": access_token})
+
+    stub_supabase(handler)
+    from main import app
+
+    with TestClient(app) as client:
+        login = client.post("/api/auth/login", json={"email": ADMIN_EMAIL, "password": "secret"})
+        assert login.status_code == 200, login.text
+        token = login.json()["token"]
+        me = client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+        bad = client.get("/api/auth/me", headers={"Authorization": "Bearer not-a-jwt"})
+
+        down = True
+        statuses = [client.post("/api/auth/login", json={"email": ADMIN_EMAIL, "password": "secret"}).status_code for _ in range(3)]
+        health = client.get("/health/auth").json()
+
+    assert seen[0] == ("/auth/v1/token", "password", "service-key")
+    assert me.status_code == 200 and me.json()["email"] == ADMIN_EMAIL
+    assert bad.status_code == 401
+    assert statuses == [503, 503, 503]
+    assert len(seen) == 3
+    assert health["data"]["supabase"]["state"] == "open"
+    auth_service.token_cache.clear()
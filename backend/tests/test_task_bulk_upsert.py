@@ -0,0 +1,46 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from database import get_connection
+
+
+@pytest.fixture
+def client(db):
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def product_and_position(client):
+    product_id = client.post("/api/products", json={"name": "Bulk", "status": "Approved"}).json()["data"]["id"]
+    position_id = client.post("/api/positions", json={
+        "title": "Engineer", "department": "Engineering", "hourly_cost_min": 50, "hourly_cost_max": 80,
+    }).json()["data"]["id"]
+    return product_id, position_id
+
+
+def test_repeated_external_id_counts_one_creation(client, product_and_position):
+    product_id, position_id = product_and_position
+    new_task = {"external_id": "ext-1", "product_id": product_id, "name": "Build", "position_id": position_id, "estimated_hours": 5}
+    body = [new_task, {"external_id": "ext-1", "product_id": product_id, "estimated_hours": 8}]
+
+    data = client.post("/api/tasks/bulk", json=body).json()["data"]
+
+    assert (data["created"], data["updated"], data["failed"]) == (1, 1, 0)
+    assert [r["action"] for r in data["results"]] == ["created", "updated"]
+    assert data["results"][0]["id"] == data["results"][1]["id"]
+    with get_connection() as conn:
+        assert conn.execute("SELECT estimated_hours FROM tasks WHERE external_id = 'ext-1'").fetchall()[0][0] == 8
+
+
+def test_new_task_with_hours_starts_approved_product(client, product_and_position):
+    product_id, position_id = product_and_position
+    body = [{"external_id": "ext-2", "product_id": product_id, "name": "Build", "position_id": position_id,
+             "estimated_hours": 5, "actual_hours": 1}]
+
+    data = client.post("/api/tasks/bulk", json=body).json()["data"]
+
+    assert data["transitioned_products"] == [product_id]
+    assert client.get(f"/api/products/{product_id}").json()["data"]["status"] == "In Development"
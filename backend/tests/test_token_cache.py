@@ -0,0 +1,131 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import routers.auth_router as auth_router
+import services.auth_service as auth_service
+from config import settings
+from database import get_connection
+from services.auth_service import AuthUser, DevAuthService, TokenCache, token_cache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(auth_service.time, "time", clock.time)
+    return clock
+
+
+def make_user(user_id: int) -> AuthUser:
+    return AuthUser(id=user_id, email=f"user{user_id}@example.com", name=f"User {user_id}", role="viewer", department_id=None)
+
+
+def test_entries_expire_after_ttl_or_token_expiry(clock):
+    cache = TokenCache(max_entries=10, ttl_seconds=60)
+    cache.put("long", make_user(1))
+    cache.put("short", make_user(2), expires_at=clock.now + 10)
+
+    clock.now += 10
+    assert cache.get("short") is None
+    assert cache.get("long").id == 1
+
+    clock.now += 50
+    assert cache.get("long") is None
+    assert cache.stats() == {"entries": 0, "hits": 1, "misses": 2}
+
+
+def test_least_recently_used_entry_is_dropped(clock):
+    cache = TokenCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", make_user(1))
+    cache.put("b", make_user(2))
+    assert cache.get("a") is not None
+
+    cache.put("c", make_user(3))
+
+    assert cache.get("b") is None
+    assert cache.get("a").id == 1 and cache.get("c").id == 3
+    assert cache.stats()["entries"] == 2
+
+
+def test_invalidate_user_drops_only_that_users_tokens(clock):
+    cache = TokenCache(max_entries=10, ttl_seconds=60)
+    cache.put("a1", make_user(1))
+    cache.put("a2", make_user(1))
+    cache.put("b", make_user(2))
+
+    cache.invalidate_user(1)
+
+    assert cache.get("a1") is None and cache.get("a2") is None
+    assert cache.get("b").id == 2
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    from main import app
+
+    monkeypatch.setattr(settings, "AUTH_MODE", "dev")
+    monkeypatch.setattr(auth_router, "auth_service", DevAuthService())
+    token_cache.clear()
+    with TestClient(app) as client:
+        yield client
+    token_cache.clear()
+
+
+def me(client, user_id: int) -> dict:
+    response = client.get("/api/auth/me", headers={"X-User-Id": str(user_id)})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def update_user(user_id: int, **columns):
+    with get_connection() as conn:
+        conn.execute(
+            f"UPDATE users SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = ?",
+            (*columns.values(), user_id)
+        )
+        conn.commit()
+
+
+def test_dev_current_user_is_served_from_cache(client):
+    assert me(client, 1)["name"] == "Admin User"
+    update_user(1, name="Renamed")
+
+    assert me(client, 1)["name"] == "Admin User"
+    assert token_cache.stats()["hits"] >= 1
+
+
+def test_invite_and_password_change_invalidate_cached_user(client):
+    with get_connection() as conn:
+        user_id = conn.execute(
+            "INSERT INTO users (email, name, role, invite_status) VALUES ('new@example.com', 'New User', 'viewer', 'pending')"
+        ).lastrowid
+        conn.commit()
+    assert me(client, user_id)["role"] == "viewer"
+
+    update_user(user_id, role="executive")
+    invite = client.post(f"/api/auth/users/{user_id}/invite", headers={"X-User-Id": "1"})
+    assert invite.status_code == 200, invite.text
+    assert me(client, user_id)["role"] == "executive"
+
+    update_user(user_id, name="Accepted User")
+    invite_token = invite.json()["invite_url"].split("token=")[1]
+    accepted = client.post("/api/auth/accept-invite", json={"token": invite_token, "password": "long-enough"})
+    assert accepted.status_code == 200, accepted.text
+    assert me(client, user_id)["name"] == "Accepted User"
+
+
+def test_clear_all_data_empties_the_cache(client):
+    update_user(1, department_id=5)
+    assert me(client, 1)["department_id"] == 5
+
+    assert client.delete("/api/admin/clear-all-data").status_code == 200
+
+    assert token_cache.stats()["entries"] == 0
+    assert me(client, 1)["department_id"] is None
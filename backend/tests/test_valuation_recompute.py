@@ -0,0 +1,53 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from config import settings
+from database import get_connection, transaction
+
+
+@pytest.fixture
+def client(db):
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+def create_valuation(client, name: str) -> dict:
+    product_id = client.post("/api/products", json={"name": name, "product_type": "Internal"}).json()["data"]["id"]
+    response = client.post("/api/valuations", json={
+        "product_id": product_id, "confidence_level": "Medium",
+        "hours_saved_per_user_per_week": 2, "number_of_affected_users": 40, "average_hourly_cost": 50,
+    })
+    assert response.status_code == 201, response.text
+    return response.json()["data"]
+
+
+def test_recompute_requires_api_key_and_bounds_workers(client, monkeypatch):
+    monkeypatch.setattr(settings, "REQUIRE_API_KEY_IN_DEV", True)
+    headers = {"X-API-Key": settings.TASKFLOW_API_KEY}
+
+    assert client.post("/api/valuations/recompute").status_code == 401
+    too_many = client.post(f"/api/valuations/recompute?workers={settings.VALUATION_MAX_WORKERS + 1}", headers=headers)
+    assert too_many.status_code == 422
+    assert client.post("/api/valuations/recompute", headers=headers).json()["data"]["rows"] == 0
+
+
+def test_recompute_skips_rows_edited_after_they_were_read(client):
+    from routers.valuations import RECOMPUTE_CHUNK_SQL, _write_recomputed
+
+    stale_id = create_valuation(client, "Edited")["id"]
+    fresh_id = create_valuation(client, "Untouched")["id"]
+    with get_connection() as conn:
+        rows = [dict(row) for row in conn.execute(RECOMPUTE_CHUNK_SQL, (0, 10))]
+        conn.execute("UPDATE product_valuations SET updated_at = 'edited' WHERE id = ?", (stale_id,))
+        conn.commit()
+
+    results = [{"final_value_high": 123.0} for _ in rows]
+    with transaction() as conn:
+        assert _write_recomputed(conn.cursor(), rows, results, "now") == 1
+
+    with get_connection() as conn:
+        values = dict(conn.execute("SELECT id, final_value_high FROM product_valuations").fetchall())
+    assert values[fresh_id] == 123.0
+    assert values[stale_id] != 123.0
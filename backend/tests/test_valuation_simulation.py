@@ -0,0 +1,71 @@
+from fastapi.testclient import TestClient
+
+import services.valuation_simulation as valuation_simulation
+from config import settings
+
+
+def test_portfolio_simulation_rejects_too_many_workers(db):
+    from main import app
+
+    with TestClient(app) as client:
+        response = client.post("/api/valuations/simulate/portfolio", json={"workers": settings.VALUATION_MAX_WORKERS + 1})
+    assert response.status_code == 422
+
+
+def test_run_simulations_clamps_workers(monkeypatch):
+    pools = []
+
+    class RecordingPool:
+        def __init__(self, max_workers, mp_context):
+            pools.append(max_workers)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def map(self, fn, items):
+            return [fn(item) for item in items]
+
+    monkeypatch.setattr(valuation_simulation, "ProcessPoolExecutor", RecordingPool)
+    monkeypatch.setattr(valuation_simulation, "simulation_cache", valuation_simulation.SimulationCache(16))
+    monkeypatch.setattr(valuation_simulation, "simulate_valuation", lambda job: {"seed": job["seed"]})
+    monkeypatch.setattr(valuation_simulation, "simulation_key", lambda job: job["seed"])
+    monkeypatch.setattr(settings, "VALUATION_MAX_WORKERS", 2)
+
+    results = valuation_simulation.run_simulations([{"seed": n} for n in range(5)], workers=64)
+
+    assert pools == [2]
+    assert [result["seed"] for result in results] == list(range(5))
+
+
+def test_simulations_require_api_key(db, monkeypatch):
+    from main import app
+
+    monkeypatch.setattr(settings, "REQUIRE_API_KEY_IN_DEV", True)
+    with TestClient(app) as client:
+        product = client.post("/api/valuations/product/1/simulate", json={})
+        portfolio = client.post("/api/valuations/simulate/portfolio", json={})
+        keyed = client.post("/api/valuations/simulate/portfolio", json={}, headers={"X-API-Key": settings.TASKFLOW_API_KEY})
+    assert product.status_code == 401 and portfolio.status_code == 401
+    assert keyed.status_code == 200
+
+
+def test_portfolio_simulation_caps_samples_times_products(db, monkeypatch):
+    from main import app
+
+    products = 3
+    with TestClient(app) as client:
+        for i in range(products):
+            product_id = client.post("/api/products", json={"name": f"P{i}"}).json()["data"]["id"]
+            created = client.post("/api/valuations", json={
+                "product_id": product_id, "confidence_level": "Medium",
+                "hours_saved_per_user_per_week": 2, "number_of_affected_users": 40, "average_hourly_cost": 50,
+            })
+            assert created.status_code == 201, created.text
+        monkeypatch.setattr(settings, "SIMULATION_MAX_TOTAL_SAMPLES", 1000 * products - 1)
+        over = client.post("/api/valuations/simulate/portfolio", json={"samples": 1000})
+        within = client.post("/api/valuations/simulate/portfolio", json={"samples": 300})
+    assert over.status_code == 400 and f"({products} products)" in over.json()["detail"]
+    assert within.status_code == 200 and len(within.json()["data"]) == products
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import time
+
+import config
+import services.webhook_service as webhook_service
+from config import settings
+from database import get_connection
+from services.webhook_service import WebhookOutbox
+
+
+def outbox_rows():
+    with get_connection() as conn:
+        return {row["id"]: dict(row) for row in conn.execute("SELECT * FROM webhook_outbox")}
+
+
+def test_claim_leases_rows_so_other_workers_skip_them(db):
+    first, second = WebhookOutbox(), WebhookOutbox()
+    ids = [first.enqueue("/product", "product.in_development", {"n": n}) for n in range(3)]
+
+    claimed, _ = first._claim_due(set())
+    assert [row["id"] for row in claimed] == ids
+    rows = outbox_rows()
+    assert all(rows[i]["status"] == "sending" and rows[i]["lease_expires_at"] > time.time() for i in ids)
+
+    claimed_again, next_at = second._claim_due(set())
+    assert claimed_again == []
+    assert next_at == rows[ids[0]]["lease_expires_at"]
+
+
+def test_expired_lease_is_reclaimed(db, monkeypatch):
+    first, second = WebhookOutbox(), WebhookOutbox()
+    outbox_id = first.enqueue("/position", "position.created", {"id": 1})
+
+    monkeypatch.setattr(settings, "WEBHOOK_LEASE_SECONDS", -1)
+    assert [row["id"] for row in first._claim_due(set())[0]] == [outbox_id]
+
+    monkeypatch.setattr(settings, "WEBHOOK_LEASE_SECONDS", 60)
+    assert [row["id"] for row in second._claim_due(set())[0]] == [outbox_id]
+    assert second._claim_due(set())[0] == []
+
+
+def test_finishing_a_delivery_clears_the_lease(db):
+    outbox = WebhookOutbox()
+    delivered = outbox.enqueue("/product", "product.in_development", {"id": 1})
+    retried = outbox.enqueue("/product", "product.in_development", {"id": 2})
+    rows = {row["id"]: row for row in outbox._claim_due(set())[0]}
+
+    outbox._mark_delivered(delivered)
+    outbox._mark_failed_attempt(rows[retried], "503 - unavailable", retry=True)
+
+    after = outbox_rows()
+    assert after[delivered]["status"] == "delivered" and after[delivered]["lease_expires_at"] is None
+    assert after[retried]["status"] == "pending" and after[retried]["lease_expires_at"] is None
+    assert outbox.stats()["sending"] == 0
+
+
+def test_send_functions_enqueue_off_the_event_loop(db, monkeypatch):
+    monkeypatch.setattr(config, "TASKFLOW_WEBHOOKS_ENABLED", True)
+    outbox = WebhookOutbox()
+    monkeypatch.setattr(webhook_service, "webhook_outbox", outbox)
+    threads = []
+    enqueue = outbox.enqueue
+
+    def recording_enqueue(*args):
+        threads.append(threading.get_ident())
+        return enqueue(*args)
+
+    monkeypatch.setattr(outbox, "enqueue", recording_enqueue)
+
+    async def run():
+        result = await webhook_service.send_position_webhook(1, "Engineer", 2, "position.created")
+        return result, threading.get_ident()
+
+    result, loop_thread = asyncio.run(run())
+    assert result["queued"] is True and outbox_rows()[result["outbox_id"]]["status"] == "pending"
+    assert threads and threads[0] != loop_thread
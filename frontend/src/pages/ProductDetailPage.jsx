@@ -112,10 +112,10 @@ function OverviewTab({ product, departments }) {
 
 function DocumentsTab({ product }) {
   const DOC_TYPES = [
-    { key: 'raw-valuation-output', label: 'Raw Valuation Output', field: 'raw_valuation_output', updatedField: 'raw_valuation_output_updated_at' },
-    { key: 'user-flow', label: 'User Flow', field: 'user_flow', updatedField: 'user_flow_updated_at' },
-    { key: 'specifications', label: 'Specifications', field: 'specifications', updatedField: 'specifications_updated_at' },
-    { key: 'persona-feedback', label: 'Persona Feedback', field: 'persona_feedback', updatedField: 'persona_feedback_updated_at' },
+    { key: 'raw-valuation-output', label: 'Raw Valuation Output' },
+    { key: 'user-flow', label: 'User Flow' },
+    { key: 'specifications', label: 'Specifications' },
+    { key: 'persona-feedback', label: 'Persona Feedback' },
   ]
 
   const valuationComplete = product?.valuation_complete
@@ -123,8 +123,9 @@ function DocumentsTab({ product }) {
   return (
     <div className="space-y-4">
       {DOC_TYPES.map(doc => {
-        const hasContent = product?.[doc.field]
-        const updatedAt = product?.[doc.updatedField]
+        const summary = product?.documents?.[doc.key]
+        const hasContent = summary?.size_bytes > 0
+        const updatedAt = summary?.updated_at
         const isLocked = doc.key !== 'raw-valuation-output' && !valuationComplete
 
         return (
@@ -247,7 +248,7 @@ function ValuationTab({ product }) {
         </div>
       )}
 
-      {product.valuation_type === 'full' && product.raw_valuation_output && (
+      {product.valuation_type === 'full' && product.documents?.['raw-valuation-output']?.size_bytes > 0 && (
         <div>
           <h3 className="text-sm font-medium text-gray-500 mb-3">Full Valuation Output</h3>
           <Link
@@ -73,13 +73,7 @@ function ValuationTypeBadge({ valuationType }) {
 }
 
 function DocStatusIcon({ product, docType, label }) {
-  const contentMap = {
-    'raw-valuation-output': product.raw_valuation_output,
-    'user-flow': product.user_flow,
-    'specifications': product.specifications,
-    'persona-feedback': product.persona_feedback
-  }
-  const hasContent = contentMap[docType]
+  const hasContent = product.documents?.[docType]?.size_bytes > 0
   const isLocked = !product.valuation_complete && docType !== 'raw-valuation-output'
   
   if (isLocked) {
@@ -112,13 +106,8 @@ function DocStatusIcon({ product, docType, label }) {
 }
 
 function DocsCountBadge({ product }) {
-  const docs = [
-    product.raw_valuation_output,
-    product.user_flow,
-    product.specifications,
-    product.persona_feedback
-  ]
-  const completed = docs.filter(Boolean).length
+  const docTypes = ['raw-valuation-output', 'user-flow', 'specifications', 'persona-feedback']
+  const completed = docTypes.filter(docType => product.documents?.[docType]?.size_bytes > 0).length
   
   if (completed === 0) return <span className="text-gray-400 text-xs">0/4</span>
   if (completed === 4) {
@@ -402,10 +391,10 @@ function DepartmentManager({ productId, onUpdate }) {
 
 function DocumentsManager({ product }) {
   const DOC_TYPES = [
-    { key: 'raw-valuation-output', label: 'Raw Valuation Output', field: 'raw_valuation_output', required: true },
-    { key: 'user-flow', label: 'User Flow', field: 'user_flow' },
-    { key: 'specifications', label: 'Specifications', field: 'specifications' },
-    { key: 'persona-feedback', label: 'Persona Feedback', field: 'persona_feedback' },
+    { key: 'raw-valuation-output', label: 'Raw Valuation Output', required: true },
+    { key: 'user-flow', label: 'User Flow' },
+    { key: 'specifications', label: 'Specifications' },
+    { key: 'persona-feedback', label: 'Persona Feedback' },
   ]
 
   const valuationComplete = product?.valuation_complete
@@ -417,7 +406,7 @@ function DocumentsManager({ product }) {
       </div>
       <div className="divide-y">
         {DOC_TYPES.map(doc => {
-          const hasContent = product?.[doc.field]
+          const hasContent = product?.documents?.[doc.key]?.size_bytes > 0
           const isLocked = !doc.required && !valuationComplete
           
           return (